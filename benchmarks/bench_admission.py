@@ -0,0 +1,52 @@
+"""Benchmark of the admission control under overload.
+
+Sends more vehicles than the grid can serve to a station, without admission control, and with a minimum
+power per session rejecting or queuing the extra starts. Prints the power of the charging sessions and the
+cost of a start.
+
+Run from the root folder with: python -m benchmarks.bench_admission
+"""
+import time
+
+from src.station_components.station import Station
+
+NB_CHARGERS = 100
+GRID_CAPACITY = 3000
+VEHICLE_POWER = 150
+
+
+def station_config(**admission):
+    return {
+        "stationId": "BENCH",
+        "gridCapacity": GRID_CAPACITY,
+        "chargers": [{"id": f"CP{i:04d}", "maxPower": 300, "connectors": 2} for i in range(NB_CHARGERS)],
+        **admission,
+    }
+
+
+def run(station):
+    """Plug a vehicle on every connector, return the results and the time per start."""
+    operations = [
+        {"action": "start", "chargerId": f"CP{i:04d}", "connectorId": connectorId, "powerCapacity": VEHICLE_POWER}
+        for connectorId in (1, 2)
+        for i in range(NB_CHARGERS)
+    ]
+    start = time.perf_counter()
+    results = [station.apply_operations([operation])[0] for operation in operations]
+    return results, (time.perf_counter() - start) / len(operations)
+
+
+if __name__ == "__main__":
+    for name, admission in (
+        ("no admission control", {}),
+        ("min 50 kW, reject", {"minSessionPower": 50}),
+        ("min 50 kW, queue", {"minSessionPower": 50, "admissionPolicy": "queue"}),
+    ):
+        station = Station(station_config(**admission))
+        results, perStart = run(station)
+        powers = [allocation["allocated_power"] for allocation in station.get_allocations()]
+        rejected = sum(result["admission"] == "rejected" for result in results)
+        print(
+            f"{name:<21}: {len(powers)} sessions at {min(powers):.0f} kW, {rejected} rejected, "
+            f"{len(station.waiting_sessions)} queued, {perStart * 1e6:.1f} us/start"
+        )
@@ -0,0 +1,58 @@
+"""Benchmark of the allocation strategies, on stations with 1000+ connectors.
+
+For each strategy, measures the time of a session event (start or stop, with its rebalancing)
+and the share of the grid capacity actually delivered to the vehicles.
+
+Run from the root folder with: python -m benchmarks.bench_allocation
+"""
+import random
+import time
+
+from src.station_components.station import Station
+
+SIZES = [(250, 4), (1000, 4), (2500, 4)]
+NB_EVENTS = 500
+STRATEGIES = ("uniform", "water_filling")
+
+
+def build_station(nbChargers, nbConnectors, strategy, rng):
+    """Build a saturated station, with vehicles asking for very different powers."""
+    station = Station(
+        {
+            "stationId": "BENCH",
+            "gridCapacity": nbChargers * 150,
+            "allocationStrategy": strategy,
+            "chargers": [
+                {"id": f"CP{i:05d}", "maxPower": 300, "connectors": nbConnectors} for i in range(nbChargers)
+            ],
+        }
+    )
+    for i in range(nbChargers):
+        for connectorId in range(1, nbConnectors):
+            station.start_session_on_charger(f"CP{i:05d}", connectorId, rng.choice([11, 50, 150, 350]))
+    return station
+
+
+def bench(nbChargers, nbConnectors, strategy):
+    rng = random.Random(1)
+    station = build_station(nbChargers, nbConnectors, strategy, rng)
+    start = time.perf_counter()
+    for _ in range(NB_EVENTS):
+        chargerId, connectorId = f"CP{rng.randrange(nbChargers):05d}", rng.randint(1, nbConnectors)
+        if station.get_charger(chargerId).is_session_free(connectorId):
+            station.start_session_on_charger(chargerId, connectorId, rng.choice([11, 50, 150, 350]))
+        else:
+            station.stop_session_on_charger(chargerId, connectorId)
+    perEvent = (time.perf_counter() - start) / NB_EVENTS
+    usage = station.get_total_allocated_power() / station.grid_capacity
+    return perEvent, usage
+
+
+if __name__ == "__main__":
+    for nbChargers, nbConnectors in SIZES:
+        for strategy in STRATEGIES:
+            perEvent, usage = bench(nbChargers, nbConnectors, strategy)
+            print(
+                f"{nbChargers * nbConnectors:>6} connectors, {strategy:<13}: "
+                f"{perEvent * 1e6:>9.1f} us/event, {usage:.1%} of the grid capacity delivered"
+            )
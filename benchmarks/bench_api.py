@@ -0,0 +1,164 @@
+"""Load test of the API and microbenchmarks of the Station, checked against a stored baseline.
+
+The app of main.py is driven in process through httpx and its ASGI transport, by concurrent
+clients replaying a mixed workload of status reads, session starts and session stops. It reports
+the p50/p99 latency of each kind of request and the requests per second. The Station methods
+are timed on stations of several sizes.
+
+Run from the root folder with: python -m benchmarks.bench_api
+    --save-baseline   store the results in benchmarks/baseline.json
+    --check           exit with an error if a result regressed against the baseline, beyond the tolerance
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+import httpx
+
+import main
+from src.station_components.fleet import Fleet
+from src.station_components.station import Station
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+NB_CLIENTS = 20
+NB_REQUESTS_PER_CLIENT = 250
+NB_CHARGERS = 20
+# Share of each kind of request in the workload.
+WORKLOAD = {"status": 0.4, "charger": 0.2, "start": 0.2, "stop": 0.2}
+STATION_SIZES = [10, 100, 1000]
+
+
+def station_config(nbChargers):
+    return {
+        "stationId": "BENCH",
+        "gridCapacity": nbChargers * 150,
+        "chargers": [{"id": f"CP{i:04d}", "maxPower": 300, "connectors": 2} for i in range(nbChargers)],
+        "battery": {"initialCapacity": 200, "power": 200},
+    }
+
+
+async def run_client(client, rng, latencies):
+    """Send the requests of a client one after the other, recording their latency by kind."""
+    kinds, weights = list(WORKLOAD), list(WORKLOAD.values())
+    for _ in range(NB_REQUESTS_PER_CLIENT):
+        kind = rng.choices(kinds, weights)[0]
+        chargerId = f"CP{rng.randrange(NB_CHARGERS):04d}"
+        connectorId = rng.randint(1, 2)
+        start = time.perf_counter()
+        if kind == "status":
+            response = await client.get("/station/station_status")
+        elif kind == "charger":
+            response = await client.get(f"/chargers/{chargerId}")
+        elif kind == "start":
+            params = {"chargerId": chargerId, "connectorId": connectorId, "powerCapacity": rng.randint(20, 250)}
+            response = await client.post("/start_session/", params=params)
+        else:
+            response = await client.post("/stop_session/", params={"chargerId": chargerId, "connectorId": connectorId})
+        latencies[kind].append(time.perf_counter() - start)
+        # A start on a busy connector, or a stop on an idle one, is an expected conflict.
+        if response.status_code != 409:
+            response.raise_for_status()
+
+
+async def bench_api():
+    """Replay the mixed workload with concurrent clients, return the latency percentiles and the throughput."""
+    fleet = Fleet([station_config(NB_CHARGERS)])
+    main.fleet, main.station = fleet, fleet.get_station()
+    latencies = {kind: [] for kind in WORKLOAD}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(run_client(client, random.Random(seed), latencies) for seed in range(NB_CLIENTS))
+        )
+        duration = time.perf_counter() - start
+
+    results = {"api_requests_per_second": NB_CLIENTS * NB_REQUESTS_PER_CLIENT / duration}
+    for kind, values in latencies.items():
+        quantiles = statistics.quantiles(values, n=100)
+        results[f"api_{kind}_p50_ms"] = quantiles[49] * 1000
+        results[f"api_{kind}_p99_ms"] = quantiles[98] * 1000
+    return results
+
+
+def time_per_call(function, minDuration=0.2):
+    """Return the mean time of a call of the function in microseconds, over at least minDuration seconds."""
+    nbCalls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < minDuration:
+        function()
+        nbCalls += 1
+    return (time.perf_counter() - start) / nbCalls * 1e6
+
+
+def bench_station():
+    """Time the main Station methods on half-full stations of several sizes."""
+    results = {}
+    for nbChargers in STATION_SIZES:
+        station = Station(station_config(nbChargers))
+        for i in range(nbChargers):
+            station.start_session_on_charger(f"CP{i:04d}", 1, 100 + i % 150)
+        chargerId = f"CP{nbChargers - 1:04d}"
+
+        def start_and_stop():
+            station.start_session_on_charger(chargerId, 2, 150)
+            station.stop_session_on_charger(chargerId, 2)
+
+        results[f"station_{nbChargers}_start_stop_us"] = time_per_call(start_and_stop)
+        results[f"station_{nbChargers}_get_status_us"] = time_per_call(station.get_status)
+        results[f"station_{nbChargers}_export_state_us"] = time_per_call(station.export_state)
+    return results
+
+
+def find_regressions(results, baseline, tolerance):
+    """Return the results worse than the baseline by more than the tolerance (0.5 is 50 % worse).
+    The throughput must stay high, the latencies and the durations low."""
+    regressions = []
+    for name, value in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        if name.endswith("per_second"):
+            regressed = value < reference / (1 + tolerance)
+        else:
+            regressed = value > reference * (1 + tolerance)
+        if regressed:
+            regressions.append(f"{name}: {value:.3f} against {reference:.3f} in the baseline")
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark the API and the Station against a stored baseline.")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="JSON file of the baseline results")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="fail if a result regressed against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="accepted degradation, 0.5 for 50 %%")
+    args = parser.parse_args()
+
+    results = asyncio.run(bench_api())
+    results.update(bench_station())
+    for name, value in results.items():
+        print(f"{name:<40} {value:>12.3f}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"baseline saved in {args.baseline}")
+    if args.check:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("no regression against the baseline")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,31 @@
+"""Benchmark of the audit log on the session hot path.
+
+Measures the time of a session event (start or stop) without audit log, with the audit log buffering
+its events for the background writer, with both overflow policies, and the time of the writer.
+
+Run from the root folder with: python -m benchmarks.bench_audit
+"""
+import tempfile
+import time
+
+from benchmarks.bench_history import run_events, station_config
+from src.services.audit_log import AuditLog
+from src.station_components.fleet import Fleet
+
+if __name__ == "__main__":
+    perEvent = run_events(Fleet([station_config()]).get_station())
+    print(f"without audit log   : {perEvent * 1e6:.1f} us/event")
+
+    for policy, capacity in (("drop", 1_000_000), ("drop", 1000), ("block", 1000)):
+        with tempfile.TemporaryDirectory() as folder:
+            fleet = Fleet([station_config()])
+            audit_log = AuditLog(folder, capacity=capacity, policy=policy, flush_interval=0.01)
+            audit_log.attach(fleet)
+            audit_log.start()
+            perEvent = run_events(fleet.get_station())
+            start = time.perf_counter()
+            audit_log.close()
+            print(
+                f"{policy:<5} (buffer {capacity:>7}): {perEvent * 1e6:.1f} us/event, {audit_log.dropped} dropped, "
+                f"last flush {(time.perf_counter() - start) * 1000:.0f} ms"
+            )
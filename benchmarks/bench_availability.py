@@ -0,0 +1,60 @@
+"""Benchmark of the lookup of a free connector, on large stations.
+
+Compares probing every connector of every charger with the availability index of the station,
+on stations where most connectors are busy.
+
+Run from the root folder with: python -m benchmarks.bench_availability
+"""
+import random
+import time
+
+from src.station_components.station import Station
+
+SIZES = [100, 1000, 10000]
+NB_LOOKUPS = 1000
+
+
+def build_station(nbChargers, rng):
+    """Build a station with a free connector on 1 % of its chargers."""
+    station = Station(
+        {
+            "stationId": "BENCH",
+            "gridCapacity": nbChargers * 150,
+            "chargers": [{"id": f"CP{i:05d}", "maxPower": 300, "connectors": 2} for i in range(nbChargers)],
+        }
+    )
+    for i in range(nbChargers):
+        station.start_session_on_charger(f"CP{i:05d}", 1, rng.randint(20, 250))
+        if rng.random() > 0.01:
+            station.start_session_on_charger(f"CP{i:05d}", 2, rng.randint(20, 250))
+    return station
+
+
+def probe(station):
+    """Find the free connector of the charger with the most headroom, connector by connector."""
+    best = None
+    for chargerId, charger in station.chargers.items():
+        for connectorId in range(1, charger.nb_connectors + 1):
+            if charger.is_session_free(connectorId):
+                headroom = charger.max_power_capacity - charger.max_asked_power
+                if best is None or headroom > best[0]:
+                    best = (headroom, chargerId, connectorId)
+                break
+    return best
+
+
+def bench(function):
+    start = time.perf_counter()
+    for _ in range(NB_LOOKUPS):
+        function()
+    return (time.perf_counter() - start) / NB_LOOKUPS
+
+
+if __name__ == "__main__":
+    for nbChargers in SIZES:
+        station = build_station(nbChargers, random.Random(1))
+        probing = bench(lambda: probe(station))
+        # The first lookup drops the entries outdated while the station was filled.
+        station.find_available_connector()
+        indexed = bench(station.find_available_connector)
+        print(f"{nbChargers:>6} chargers: probing {probing * 1e6:>9.1f} us, index {indexed * 1e6:>6.1f} us per lookup")
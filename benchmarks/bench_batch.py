@@ -0,0 +1,61 @@
+"""Benchmark of the session events throughput, one HTTP call per event versus POST /sessions/batch.
+
+Run from the root folder with: python -m benchmarks.bench_batch
+"""
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+from src.station_components.fleet import Fleet
+
+NB_CHARGERS = 500
+NB_CONNECTORS = 4
+
+
+def reset_fleet():
+    """Serve a single large station, empty."""
+    main.fleet = Fleet(
+        [
+            {
+                "stationId": "BENCH",
+                "gridCapacity": 150 * NB_CHARGERS * NB_CONNECTORS / 2,
+                "chargers": [
+                    {"id": f"CP{i:05d}", "maxPower": 300, "connectors": NB_CONNECTORS}
+                    for i in range(NB_CHARGERS)
+                ],
+            }
+        ]
+    )
+    main.station = main.fleet.get_station()
+
+
+def operations():
+    """Replay of a gateway reconnection: every connector starts, then half of them stop."""
+    slots = [(f"CP{i:05d}", n) for i in range(NB_CHARGERS) for n in range(1, NB_CONNECTORS + 1)]
+    starts = [{"action": "start", "chargerId": c, "connectorId": n, "powerCapacity": 200} for c, n in slots]
+    stops = [{"action": "stop", "chargerId": c, "connectorId": n} for c, n in slots[::2]]
+    return starts + stops
+
+
+def main_bench():
+    client = TestClient(main.app)
+    events = operations()
+
+    reset_fleet()
+    start = time.perf_counter()
+    for event in events:
+        params = {k: v for k, v in event.items() if k != "action"}
+        client.post(f"/{event['action']}_session/", params=params)
+    single = len(events) / (time.perf_counter() - start)
+
+    reset_fleet()
+    start = time.perf_counter()
+    client.post("/sessions/batch", json={"operations": events})
+    batch = len(events) / (time.perf_counter() - start)
+
+    print(f"{len(events)} events: {single:.0f} events/s with single calls, {batch:.0f} events/s with a batch")
+
+
+if __name__ == "__main__":
+    main_bench()
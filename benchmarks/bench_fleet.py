@@ -0,0 +1,61 @@
+"""Benchmark of the fleet registry: requests per second and memory as the station count grows.
+
+Run from the root folder with: python -m benchmarks.bench_fleet
+"""
+import random
+import time
+import tracemalloc
+
+from src.station_components.fleet import Fleet
+
+STATION_COUNTS = [10, 100, 1000, 10000]
+NB_REQUESTS = 20000
+
+
+def synthetic_config(index):
+    """Config of a small station, close to station_config.json."""
+    return {
+        "stationId": f"STATION_{index:05d}",
+        "gridCapacity": 400,
+        "chargers": [
+            {"id": "CP001", "maxPower": 300, "connectors": 2},
+            {"id": "CP002", "maxPower": 300, "connectors": 2},
+        ],
+        "battery": {"initialCapacity": 200, "power": 200},
+    }
+
+
+def run_requests(fleet, stationIds, rng):
+    """Replay a mix of start/stop/status calls routed by station id, return the requests per second."""
+    start = time.perf_counter()
+    for _ in range(NB_REQUESTS):
+        station = fleet.get_station(rng.choice(stationIds))
+        chargerId = rng.choice(("CP001", "CP002"))
+        connectorId = rng.randint(1, 2)
+        action = rng.random()
+        if action < 0.1:
+            station.get_status()
+        elif station.get_charger(chargerId).is_session_free(connectorId):
+            station.start_session_on_charger(chargerId, connectorId, rng.randint(50, 350))
+        else:
+            station.stop_session_on_charger(chargerId, connectorId)
+    return NB_REQUESTS / (time.perf_counter() - start)
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'stations':>10} {'build (s)':>10} {'bytes/station':>14} {'requests/s':>12}")
+    for count in STATION_COUNTS:
+        configs = [synthetic_config(i) for i in range(count)]
+        tracemalloc.start()
+        start = time.perf_counter()
+        fleet = Fleet(configs)
+        build_time = time.perf_counter() - start
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rps = run_requests(fleet, fleet.get_station_ids(), rng)
+        print(f"{count:>10} {build_time:>10.3f} {memory / count:>14.0f} {rps:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
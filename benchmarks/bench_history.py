@@ -0,0 +1,63 @@
+"""Benchmark of the session history, on the session hot path and on the energy queries.
+
+Measures the time of a session event (start or stop) without history, with the history recording it
+in memory, and the time of the background writer and of the queries on the records.
+
+Run from the root folder with: python -m benchmarks.bench_history
+"""
+import os
+import random
+import tempfile
+import time
+
+from src.services.session_history import SessionHistory
+from src.station_components.fleet import Fleet
+
+NB_CHARGERS = 100
+NB_EVENTS = 20000
+
+
+def station_config():
+    return {
+        "stationId": "BENCH",
+        "gridCapacity": NB_CHARGERS * 150,
+        "chargers": [{"id": f"CP{i:04d}", "maxPower": 300, "connectors": 2} for i in range(NB_CHARGERS)],
+    }
+
+
+def run_events(station):
+    """Start or stop random sessions, return the time per event."""
+    rng = random.Random(1)
+    start = time.perf_counter()
+    for _ in range(NB_EVENTS):
+        chargerId, connectorId = f"CP{rng.randrange(NB_CHARGERS):04d}", rng.randint(1, 2)
+        if station.get_charger(chargerId).is_session_free(connectorId):
+            station.start_session_on_charger(chargerId, connectorId, rng.randint(20, 250))
+        else:
+            station.stop_session_on_charger(chargerId, connectorId)
+    return (time.perf_counter() - start) / NB_EVENTS
+
+
+if __name__ == "__main__":
+    perEvent = run_events(Fleet([station_config()]).get_station())
+    print(f"without history : {perEvent * 1e6:.1f} us/event")
+
+    with tempfile.TemporaryDirectory() as folder:
+        fleet = Fleet([station_config()])
+        history = SessionHistory(os.path.join(folder, "history.db"))
+        history.attach(fleet)
+        perEvent = run_events(fleet.get_station())
+        print(f"with history    : {perEvent * 1e6:.1f} us/event, {len(history.pending)} records queued")
+
+        start = time.perf_counter()
+        written = history.flush()
+        print(f"writer          : {written} records in {(time.perf_counter() - start) * 1000:.0f} ms")
+        for name, query in (
+            ("per session", history.get_session_energy),
+            ("per charger", history.get_charger_energy),
+            ("per day", history.get_daily_energy),
+        ):
+            start = time.perf_counter()
+            query()
+            print(f"energy {name:<9}: {(time.perf_counter() - start) * 1000:.0f} ms")
+        history.close()
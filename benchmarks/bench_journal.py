@@ -0,0 +1,75 @@
+"""Benchmark of the durable journal: write overhead per event, and recovery time at startup.
+
+Run from the root folder with: python -m benchmarks.bench_journal
+"""
+import random
+import tempfile
+import time
+
+from src.services.journal import EventJournal
+from src.station_components.fleet import Fleet
+
+NB_STATIONS = 100
+NB_EVENTS = 20000
+
+
+def fleet_configs():
+    return [
+        {
+            "stationId": f"STATION_{i:03d}",
+            "gridCapacity": 400,
+            "chargers": [{"id": f"CP00{c}", "maxPower": 300, "connectors": 2} for c in range(1, 5)],
+            "battery": {"initialCapacity": 200, "power": 200},
+        }
+        for i in range(NB_STATIONS)
+    ]
+
+
+def replay_events(fleet, nbEvents, rng):
+    """Apply random start/stop events on the fleet, return the time spent per event in microseconds."""
+    start = time.perf_counter()
+    for _ in range(nbEvents):
+        station = fleet.get_station(f"STATION_{rng.randrange(NB_STATIONS):03d}")
+        chargerId, connectorId = f"CP00{rng.randint(1, 4)}", rng.randint(1, 2)
+        if station.get_charger(chargerId).is_session_free(connectorId):
+            station.start_session_on_charger(chargerId, connectorId, rng.randint(20, 250))
+        else:
+            station.stop_session_on_charger(chargerId, connectorId)
+    return (time.perf_counter() - start) / nbEvents * 1e6
+
+
+def bench_write_overhead():
+    baseline = replay_events(Fleet(fleet_configs()), NB_EVENTS, random.Random(1))
+    print(f"without journal: {baseline:.1f} us/event")
+    for fsyncEvery in (1, 64, 1024):
+        with tempfile.TemporaryDirectory() as folder:
+            fleet = Fleet(fleet_configs())
+            journal = EventJournal(folder, fsync_every=fsyncEvery)
+            journal.attach(fleet)
+            perEvent = replay_events(fleet, NB_EVENTS, random.Random(1))
+            journal.close()
+        print(f"journal, fsync every {fsyncEvery:>4} events: {perEvent:.1f} us/event (+{perEvent - baseline:.1f})")
+
+
+def bench_recovery():
+    for tailEvents in (0, 1000, 10000, 50000):
+        with tempfile.TemporaryDirectory() as folder:
+            fleet = Fleet(fleet_configs())
+            journal = EventJournal(folder, fsync_every=1024)
+            journal.attach(fleet)
+            rng = random.Random(2)
+            replay_events(fleet, NB_EVENTS, rng)
+            journal.snapshot(fleet)
+            replay_events(fleet, tailEvents, rng) if tailEvents else None
+            journal.close()
+
+            start = time.perf_counter()
+            recovered = Fleet(fleet_configs())
+            replayed = EventJournal(folder).recover(recovered)
+            duration = time.perf_counter() - start
+        print(f"recovery from snapshot + {replayed:>6} events: {duration * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    bench_write_overhead()
+    bench_recovery()
@@ -0,0 +1,73 @@
+"""Memory benchmark, in bytes per active session, measured with tracemalloc.
+
+The "dict-backed" variant subclasses the components without __slots__, so that its objects
+carry a __dict__ as before, and keys the battery boosts by "chargerId_connectorId" strings.
+
+Run from the root folder with: python -m benchmarks.bench_memory
+"""
+import tracemalloc
+
+from src.station_components.battery import Battery
+from src.station_components.charger import Charger
+from src.station_components.session import Session
+from src.station_components.station import Station
+
+NB_CHARGERS = 10000
+NB_CONNECTORS = 4
+
+
+class DictSession(Session):
+    pass
+
+
+class DictCharger(Charger):
+    session_class = DictSession
+
+
+class DictBattery(Battery):
+    def allocate_boost(self, chargerId, connectorId, powerBoost):
+        super().allocate_boost(chargerId, connectorId, powerBoost)
+        boost = self.session_boosts.pop((chargerId, connectorId))
+        self.session_boosts[str(chargerId) + "_" + str(connectorId)] = boost
+
+
+class DictStation(Station):
+    charger_class = DictCharger
+
+    def addBattery(self, battery_config):
+        return DictBattery(battery_config["initialCapacity"], battery_config["power"])
+
+
+def config():
+    return {
+        "stationId": "BENCH",
+        "gridCapacity": 10 ** 9,
+        "chargers": [
+            {"id": f"CP{i:05d}", "maxPower": 300, "connectors": NB_CONNECTORS} for i in range(NB_CHARGERS)
+        ],
+        "battery": {"initialCapacity": 200, "power": 200},
+    }
+
+
+def bytes_per_session(station_class):
+    """Start a session on every connector, and return the memory they take per session."""
+    station = station_class(config())
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for i in range(NB_CHARGERS):
+        for connectorId in range(1, NB_CONNECTORS + 1):
+            station.start_session_on_charger(f"CP{i:05d}", connectorId, 100)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (after - before) / (NB_CHARGERS * NB_CONNECTORS)
+
+
+def main():
+    before = bytes_per_session(DictStation)
+    after = bytes_per_session(Station)
+    print(f"dict-backed objects: {before:.0f} bytes per active session")
+    print(f"__slots__ objects:   {after:.0f} bytes per active session ({(1 - after / before) * 100:.0f}% less)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Microbenchmark of the power rebalancing, on large synthetic stations.
+
+Compares the lazy uniform power level of Station with the previous implementation,
+which walked every session of every charger on each session event. The previous
+loops are reproduced below as a reference.
+
+Run from the root folder with: python -m benchmarks.bench_rebalancing
+"""
+import random
+import time
+
+from src.station_components.station import Station
+
+SIZES = [(10, 2), (100, 4), (1000, 4), (5000, 4)]
+NB_EVENTS = 2000
+
+
+class LegacySession:
+    """Session whose power is written on each rebalance."""
+
+    def __init__(self, power, max_vehicle_power):
+        self.allocated_power = power
+        self.max_vehicle_power = max_vehicle_power
+        self.is_battery_boosted = False
+
+    def set_power(self, power):
+        self.allocated_power = min(power, self.max_vehicle_power)
+
+
+class LegacyCharger:
+    """Charger walking its sessions on each rebalance."""
+
+    def __init__(self, max_power_capacity):
+        self.max_power_capacity = max_power_capacity
+        self.sessions = {}
+        self.max_asked_power = 0
+        self.non_boosted_sessions_count = 0
+
+    def start_non_boosted_session(self, connectorId, vehicleMaxPower):
+        self.max_asked_power += vehicleMaxPower
+        if self.max_asked_power <= self.max_power_capacity:
+            self.sessions[connectorId] = LegacySession(vehicleMaxPower, vehicleMaxPower)
+        else:
+            uniformPower = self.max_power_capacity / (self.non_boosted_sessions_count + 1)
+            self.uniformize(uniformPower)
+            self.sessions[connectorId] = LegacySession(uniformPower, vehicleMaxPower)
+        self.non_boosted_sessions_count += 1
+
+    def remove_session(self, connectorId):
+        self.max_asked_power -= self.sessions[connectorId].max_vehicle_power
+        self.non_boosted_sessions_count -= 1
+        del self.sessions[connectorId]
+
+    def uniformize(self, power):
+        for session in self.sessions.values():
+            if not session.is_battery_boosted:
+                session.set_power(power)
+
+    def reallocate_session_optimally_from_charger(self):
+        if self.non_boosted_sessions_count > 0:
+            if self.max_asked_power > self.max_power_capacity:
+                self.uniformize(self.max_power_capacity / self.non_boosted_sessions_count)
+            else:
+                for session in self.sessions.values():
+                    if not session.is_battery_boosted:
+                        session.set_power(session.max_vehicle_power)
+
+    def set_all_non_boosted_sessions_to(self, power):
+        maxLocalPower = self.max_power_capacity
+        if self.non_boosted_sessions_count > 0:
+            maxLocalPower = self.max_power_capacity / self.non_boosted_sessions_count
+        self.uniformize(min(power, maxLocalPower))
+
+
+class LegacyStation:
+    """Station rebalancing with loops over all the chargers (no battery)."""
+
+    def __init__(self, config):
+        self.grid_capacity = config["gridCapacity"]
+        self.chargers = {c["id"]: LegacyCharger(c["maxPower"]) for c in config["chargers"]}
+        self.max_asked_power = 0
+
+    def start_session_on_charger(self, chargerId, connectorId, maxVehiclePower):
+        self.max_asked_power += maxVehiclePower
+        self.chargers[chargerId].start_non_boosted_session(connectorId, maxVehiclePower)
+        if self.max_asked_power > self.grid_capacity:
+            self.set_all_non_boosted_sessions_to_uniform_power()
+
+    def stop_session_on_charger(self, chargerId, connectorId):
+        charger = self.chargers[chargerId]
+        self.max_asked_power -= charger.sessions[connectorId].max_vehicle_power
+        charger.remove_session(connectorId)
+        if self.max_asked_power > self.grid_capacity:
+            self.set_all_non_boosted_sessions_to_uniform_power()
+        else:
+            [self.chargers[c].reallocate_session_optimally_from_charger() for c in self.chargers]
+
+    def set_all_non_boosted_sessions_to_uniform_power(self):
+        activeSessions = sum(
+            [self.chargers[c].non_boosted_sessions_count for c in self.chargers]
+        )
+        if activeSessions:
+            for c in self.chargers:
+                self.chargers[c].set_all_non_boosted_sessions_to(self.grid_capacity / activeSessions)
+
+
+def synthetic_config(nbChargers, nbConnectors):
+    """Config of a large station, whose grid is saturated once half of the connectors are used."""
+    return {
+        "stationId": "BENCH",
+        "gridCapacity": 150 * nbChargers * nbConnectors / 2,
+        "chargers": [
+            {"id": f"CP{i:05d}", "maxPower": 300, "connectors": nbConnectors}
+            for i in range(nbChargers)
+        ],
+    }
+
+
+def bench(station_class, config, rng):
+    """Fill the station, then time start/stop events on random connectors."""
+    station = station_class(config)
+    slots = [(c["id"], n) for c in config["chargers"] for n in range(1, c["connectors"] + 1)]
+    active = set()
+    for slot in slots[: len(slots) * 3 // 4]:
+        station.start_session_on_charger(slot[0], slot[1], 200)
+        active.add(slot)
+    events = [rng.choice(slots) for _ in range(NB_EVENTS)]
+    start = time.perf_counter()
+    for slot in events:
+        if slot in active:
+            station.stop_session_on_charger(slot[0], slot[1])
+            active.discard(slot)
+        else:
+            station.start_session_on_charger(slot[0], slot[1], 200)
+            active.add(slot)
+    return (time.perf_counter() - start) / NB_EVENTS * 1e6
+
+
+def main():
+    print(f"{'chargers':>9} {'connectors':>10} {'loops (us/event)':>17} {'lazy (us/event)':>16} {'speedup':>8}")
+    for nbChargers, nbConnectors in SIZES:
+        config = synthetic_config(nbChargers, nbConnectors)
+        legacy = bench(LegacyStation, config, random.Random(1))
+        lazy = bench(Station, config, random.Random(1))
+        print(f"{nbChargers:>9} {nbConnectors:>10} {legacy:>17.1f} {lazy:>16.1f} {legacy / lazy:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
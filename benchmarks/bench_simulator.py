@@ -0,0 +1,28 @@
+"""Benchmark of the discrete-event simulator, in events per minute.
+
+Run from the root folder with: python -m benchmarks.bench_simulator
+"""
+import time
+
+from src.simulation.simulator import Simulator, generate_arrivals
+
+CONFIG = {
+    "stationId": "BENCH",
+    "gridCapacity": 600,
+    "chargers": [{"id": f"CP00{i}", "maxPower": 300, "connectors": 2} for i in range(1, 5)],
+    "battery": {"initialCapacity": 200, "power": 200},
+}
+
+
+def main():
+    arrivals = generate_arrivals(hours=24 * 365, arrivals_per_hour=12, seed=0)
+    simulator = Simulator(CONFIG)
+    simulator.load_trace(arrivals)
+    start = time.perf_counter()
+    kpis = simulator.run()
+    duration = time.perf_counter() - start
+    print(f"{kpis['events']} events simulated in {duration:.2f} s: {kpis['events'] / duration * 60:,.0f} events/minute")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Benchmark of the startup of the app, with fleet configs of growing size, checked against a stored baseline.
+
+Each measure runs in a new process, as a cold start would: the import time of main.py reported by
+"python -X importtime", and the time from the start of the process to the answer of its first request,
+with the JSON config and with the binary config cache (STATION_CONFIG_CACHE).
+
+Run from the root folder with: python -m benchmarks.bench_startup
+    --save-baseline   store the results in benchmarks/startup_baseline.json
+    --check           exit with an error if a result regressed against the baseline, beyond the tolerance
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_api import find_regressions
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "startup_baseline.json")
+FLEET_SIZES = [1, 1000, 10000]
+NB_CHARGERS = 10
+NB_RUNS = 3
+FIRST_REQUEST = """
+import asyncio
+import httpx
+import main
+
+async def first_request():
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+        response = await client.get("/station/station_status")
+        response.raise_for_status()
+
+asyncio.run(first_request())
+"""
+
+
+def fleet_configs(nbStations):
+    return [
+        {
+            "stationId": f"STATION_{i:05d}",
+            "gridCapacity": 1000,
+            "chargers": [{"id": f"CP{c:03d}", "maxPower": 300, "connectors": 2} for c in range(NB_CHARGERS)],
+            "battery": {"initialCapacity": 200, "power": 200},
+        }
+        for i in range(nbStations)
+    ]
+
+
+def get_import_time(env):
+    """Return the cumulative import time of main.py in milliseconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"], env=env, capture_output=True, text=True, check=True
+    )
+    for line in result.stderr.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == "main":
+            return int(fields[1]) / 1000
+    raise RuntimeError("main.py not found in the import times")
+
+
+def get_time_to_first_request(env):
+    """Return the time from the start of a process to the answer of its first request, in milliseconds."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", FIRST_REQUEST], env=env, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def bench_startup():
+    """Return the best time of each measure over NB_RUNS runs, for each size of fleet."""
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for nbStations in FLEET_SIZES:
+            configPath = os.path.join(folder, f"fleet_{nbStations}.json")
+            with open(configPath, "w") as f:
+                json.dump(fleet_configs(nbStations), f)
+            env = {**os.environ, "STATION_CONFIG": configPath}
+            cachedEnv = {**env, "STATION_CONFIG_CACHE": configPath + ".cache"}
+            # A first run writes the cache.
+            get_time_to_first_request(cachedEnv)
+            results[f"startup_{nbStations}_import_ms"] = min(get_import_time(env) for _ in range(NB_RUNS))
+            results[f"startup_{nbStations}_first_request_ms"] = min(get_time_to_first_request(env) for _ in range(NB_RUNS))
+            results[f"startup_{nbStations}_first_request_cached_ms"] = min(
+                get_time_to_first_request(cachedEnv) for _ in range(NB_RUNS)
+            )
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark the startup of the app against a stored baseline.")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="JSON file of the baseline results")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="fail if a result regressed against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="accepted degradation, 0.5 for 50 %%")
+    args = parser.parse_args()
+
+    results = bench_startup()
+    for name, value in results.items():
+        print(f"{name:<45} {value:>10.1f}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"baseline saved in {args.baseline}")
+    if args.check:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("no regression against the baseline")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,93 @@
+"""Benchmark of the streaming of the station changes, with thousands of concurrent subscribers.
+
+Measures the cost of a mutation on the write path, the time to fan out the last change to every
+subscriber, and how much the messages of slow subscribers are coalesced.
+
+Run from the root folder with: python -m benchmarks.bench_stream
+"""
+import asyncio
+import random
+import time
+
+from src.services.status_stream import StatusStream
+from src.station_components.station import Station
+
+NB_EVENTS = 5000
+SLOW_SUBSCRIBERS_RATIO = 0.1
+
+
+def station_config():
+    return {
+        "stationId": "STATION_STREAM",
+        "gridCapacity": 1000,
+        "chargers": [{"id": f"CP{c:03d}", "maxPower": 300, "connectors": 2} for c in range(1, 21)],
+        "battery": {"initialCapacity": 200, "power": 200},
+    }
+
+
+async def consume(stream, station, received, delay, done):
+    """Read the messages of the station, sleeping "delay" seconds after each one, until the final version.
+    The fan-out is measured on the fast subscribers only."""
+    async for message in stream.messages(station):
+        received.append(message["version"])
+        if message["version"] == done["version"]:
+            if not delay:
+                done["remaining"] -= 1
+                if done["remaining"] == 0:
+                    done["event"].set()
+            break
+        if delay:
+            await asyncio.sleep(delay)
+
+
+async def run(nbSubscribers):
+    station = Station(station_config())
+    stream = StatusStream()
+    publisher = asyncio.create_task(stream.run())
+    rng = random.Random(1)
+    nbSlow = int(nbSubscribers * SLOW_SUBSCRIBERS_RATIO)
+    done = {"version": None, "remaining": nbSubscribers - nbSlow, "event": asyncio.Event()}
+    receivedBySubscriber = [[] for _ in range(nbSubscribers)]
+    consumers = [
+        asyncio.create_task(consume(stream, station, received, 0.2 if i < nbSlow else 0, done))
+        for i, received in enumerate(receivedBySubscriber)
+    ]
+    await asyncio.sleep(0.1)
+
+    writeTime = 0.0
+    for i in range(NB_EVENTS):
+        chargerId, connectorId = f"CP{rng.randint(1, 20):03d}", rng.randint(1, 2)
+        start = time.perf_counter()
+        if station.get_charger(chargerId).is_session_free(connectorId):
+            station.start_session_on_charger(chargerId, connectorId, rng.randint(20, 250))
+        else:
+            station.stop_session_on_charger(chargerId, connectorId)
+        writeTime += time.perf_counter() - start
+        if i % 50 == 0:
+            await asyncio.sleep(0.001)
+    # A last change that every subscriber waits for.
+    chargerId = next(iter(station.chargers))
+    if not station.get_charger(chargerId).is_session_free(1):
+        station.stop_session_on_charger(chargerId, 1)
+    station.start_session_on_charger(chargerId, 1, 1)
+    done["version"] = station.version
+    lastChange = time.perf_counter()
+    if nbSubscribers:
+        await done["event"].wait()
+    fanOut = time.perf_counter() - lastChange
+
+    publisher.cancel()
+    await asyncio.gather(*consumers)
+    fast = receivedBySubscriber[nbSlow:]
+    slow = receivedBySubscriber[:nbSlow]
+    print(
+        f"{nbSubscribers:>5} subscribers: write path {writeTime / NB_EVENTS * 1e6:.1f} us/event, "
+        f"fan-out of the last change to the fast ones {fanOut * 1000:.1f} ms, "
+        f"messages per fast subscriber {sum(map(len, fast)) / max(len(fast), 1):.0f}, "
+        f"per slow subscriber {sum(map(len, slow)) / max(len(slow), 1):.0f} (for {NB_EVENTS} events)"
+    )
+
+
+if __name__ == "__main__":
+    for nbSubscribers in (0, 100, 1000, 5000):
+        asyncio.run(run(nbSubscribers))
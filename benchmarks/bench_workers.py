@@ -0,0 +1,79 @@
+"""Benchmark of the throughput of the SQLite state backend across worker processes.
+
+Each worker process serves the same fleet, and applies random start/stop operations
+through the shared state, as uvicorn workers would do.
+
+Run from the root folder with: python -m benchmarks.bench_workers
+"""
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from src.services.state_backends import SqliteStateBackend
+from src.station_components.fleet import Fleet
+
+WORKER_COUNTS = [1, 2, 4, 8]
+NB_STATIONS = 50
+NB_OPERATIONS_PER_WORKER = 2000
+
+
+def fleet_configs():
+    return [
+        {
+            "stationId": f"STATION_{i:03d}",
+            "gridCapacity": 400,
+            "chargers": [{"id": f"CP00{c}", "maxPower": 300, "connectors": 2} for c in range(1, 5)],
+            "battery": {"initialCapacity": 200, "power": 200},
+        }
+        for i in range(NB_STATIONS)
+    ]
+
+
+def worker(path, seed, start_event):
+    """Serve the fleet from a worker process."""
+    fleet = Fleet(fleet_configs())
+    backend = SqliteStateBackend(path)
+    rng = random.Random(seed)
+    start_event.wait()
+    for _ in range(NB_OPERATIONS_PER_WORKER):
+        station = fleet.get_station(f"STATION_{rng.randrange(NB_STATIONS):03d}")
+        operation = {
+            "action": rng.choice(["start", "stop"]),
+            "chargerId": f"CP00{rng.randint(1, 4)}",
+            "connectorId": rng.randint(1, 2),
+            "powerCapacity": rng.randint(20, 250),
+        }
+        with backend.write(station):
+            station.apply_operations([operation])
+
+
+def run(nbWorkers):
+    """Return the operations per second of all the workers together."""
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "state.db")
+        SqliteStateBackend(path)
+        start_event = multiprocessing.Event()
+        processes = [
+            multiprocessing.Process(target=worker, args=(path, seed, start_event))
+            for seed in range(nbWorkers)
+        ]
+        for process in processes:
+            process.start()
+        time.sleep(0.5)
+        start = time.perf_counter()
+        start_event.set()
+        for process in processes:
+            process.join()
+        return nbWorkers * NB_OPERATIONS_PER_WORKER / (time.perf_counter() - start)
+
+
+def main():
+    print(f"{'workers':>8} {'operations/s':>13}")
+    for nbWorkers in WORKER_COUNTS:
+        print(f"{nbWorkers:>8} {run(nbWorkers):>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
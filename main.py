@@ -1,70 +1,537 @@
 """Main app of the system, exposing endpoints."""
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+from typing import Annotated, Optional
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
+import asyncio
 import json
+import logging
+import math
+import os
 import time
-from src.station_components.station import Station
+from src.services.metrics import REGISTRY, REQUEST_DURATION, REQUESTS_THROTTLED
+from src.services.rate_limit import create_rate_limiter
+from src.services.state_backends import create_state_backend
+from src.services.status_cache import StatusCache
+from src.services.status_stream import StatusStream
+from src.station_components.fleet import Fleet, get_station_class, load_station_configs
 from src.station_components.statuses_models.models import StationStatus
+from src.station_components.statuses_models.operations import (
+    SessionBatch,
+    SessionBatchResult,
+    SessionResponse,
+    StartSessionRequest,
+    StopSessionRequest,
+)
+
+logger = logging.getLogger(__name__)
+
+# The config file can hold one station, or a list of stations served by the same process.
+config_path = os.environ.get("STATION_CONFIG", "station_config.json")
+# STATION_CONFIG_CACHE=/path/to/config.cache keeps the parsed config in a binary file, read at startup while the config is unchanged.
+config_cache_path = os.environ.get("STATION_CONFIG_CACHE")
+# STATION_BACKEND=numpy stores the sessions in NumPy arrays, which pays off on large stations.
+# The configs are validated at startup, and each station is only built on its first request.
+fleet = Fleet(
+    load_station_configs(config_path, config_cache_path),
+    get_station_class(os.environ.get("STATION_BACKEND", "python")),
+    validated=True,
+)
+
+station = fleet.get_station()
+status_cache = StatusCache()
+status_stream = StatusStream()
+# STATION_STATE_BACKEND=sqlite:///path/to/state.db shares the state of the stations between several workers.
+state_backend = create_state_backend(os.environ.get("STATION_STATE_BACKEND", "memory"))
+
+# STATION_JOURNAL_DIR keeps a durable journal of the sessions, replayed at startup after a restart.
+journal = None
+if os.environ.get("STATION_JOURNAL_DIR"):
+    from src.services.journal import EventJournal
+
+    journal = EventJournal(os.environ["STATION_JOURNAL_DIR"])
+    journal.recover(fleet)
+    journal.attach(fleet)
+# STATION_HISTORY_DB=/path/to/history.db records the power of every session, to query the energy delivered.
+history = None
+if os.environ.get("STATION_HISTORY_DB"):
+    from src.services.session_history import SessionHistory
+
+    history = SessionHistory(os.environ["STATION_HISTORY_DB"])
+    history.attach(fleet)
+# STATION_AUDIT_DIR=/path/to/folder writes the decisions of the stations (sessions, rebalancings, battery) to rotating JSONL files.
+# STATION_AUDIT_POLICY=block makes the stations wait for the writer when its buffer is full, instead of dropping the oldest events.
+audit_log = None
+if os.environ.get("STATION_AUDIT_DIR"):
+    from src.services.audit_log import AuditLog
+
+    audit_log = AuditLog(
+        os.environ["STATION_AUDIT_DIR"],
+        capacity=int(os.environ.get("STATION_AUDIT_CAPACITY", "10000")),
+        policy=os.environ.get("STATION_AUDIT_POLICY", "drop"),
+    )
+    audit_log.attach(fleet)
+# STATION_CLIENT_RATE_LIMIT=50/100 lets each client address send 50 requests per second, in bursts of up to 100,
+# and STATION_CHARGER_RATE_LIMIT limits the same way the session operations on each charger. Beyond them, the app answers 429.
+client_limiter = create_rate_limiter(os.environ.get("STATION_CLIENT_RATE_LIMIT"))
+charger_limiter = create_rate_limiter(os.environ.get("STATION_CHARGER_RATE_LIMIT"))
+snapshot_interval = float(os.environ.get("STATION_SNAPSHOT_INTERVAL", "60"))
+snapshot_max_events = int(os.environ.get("STATION_SNAPSHOT_MAX_EVENTS", "10000"))
+# STATION_CONFIG_WATCH_INTERVAL=2 checks the config every 2 seconds, and reloads it when it changed.
+config_watch_interval = float(os.environ.get("STATION_CONFIG_WATCH_INTERVAL", "0"))
+
+
+def reload_config():
+    """Read the config again and apply it to the live fleet, keeping the active sessions.
+    The journal and the history follow the new stations once they are built."""
+    global station
+    summary = fleet.reload(load_station_configs(config_path, config_cache_path))
+    station = fleet.get_station()
+    return summary
+
+
+def get_config_mtime():
+    """Return the last modification time of the config file, or of the folder of config files."""
+    if os.path.isdir(config_path):
+        paths = [os.path.join(config_path, name) for name in os.listdir(config_path) if name.endswith(".json")]
+        return max([os.path.getmtime(path) for path in paths] + [os.path.getmtime(config_path)])
+    return os.path.getmtime(config_path)
+
+
+async def watch_config():
+    """Reload the config each time it is modified. An invalid config is reported and ignored."""
+    last_mtime = get_config_mtime()
+    while True:
+        await asyncio.sleep(config_watch_interval)
+        try:
+            mtime = get_config_mtime()
+            if mtime != last_mtime:
+                last_mtime = mtime
+                logger.info("Config %s reloaded: %s", config_path, reload_config())
+        except (OSError, ValueError) as e:
+            logger.warning("Config %s not reloaded: %s", config_path, e)
+
+
+async def write_snapshots():
+    """Write a snapshot of the fleet periodically, or sooner when many events were logged,
+    so the log to replay at startup stays short."""
+    last_snapshot = time.monotonic()
+    while True:
+        await asyncio.sleep(1)
+        if journal.get_events_since_snapshot() == 0:
+            continue
+        if (
+            time.monotonic() - last_snapshot >= snapshot_interval
+            or journal.get_events_since_snapshot() >= snapshot_max_events
+        ):
+            await asyncio.to_thread(journal.snapshot, fleet)
+            last_snapshot = time.monotonic()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Runs the background tasks of the app, and flushes the journal, the history and the audit log at shutdown."""
+    snapshot_task = asyncio.create_task(write_snapshots()) if journal else None
+    stream_task = asyncio.create_task(status_stream.run())
+    watch_task = asyncio.create_task(watch_config()) if config_watch_interval > 0 else None
+    if history:
+        history.start()
+    if audit_log:
+        audit_log.start()
+    yield
+    stream_task.cancel()
+    if watch_task:
+        watch_task.cancel()
+    if journal:
+        snapshot_task.cancel()
+        journal.snapshot(fleet)
+        journal.close()
+    if history:
+        history.close()
+    if audit_log:
+        audit_log.close()
+
 
 app = FastAPI(title="Electra station management system",
-              description="API for managing sessions, chargers and battery in a simplified Electra Station")
-with open("station_config.json", "r") as f:
-    config_dict = json.load(f)
+              description="API for managing sessions, chargers and battery in a simplified Electra Station",
+              lifespan=lifespan,
+              default_response_class=ORJSONResponse)
+
+
+async def run_state_backend(function, *args):
+    """Run a call going through the state backend. With a backend waiting for the other workers (SQLite),
+    it runs in a thread so the event loop keeps serving the other requests, and a backend still busy
+    after its timeout is answered with a 503."""
+    try:
+        if state_backend.blocking:
+            return await asyncio.to_thread(function, *args)
+        return function(*args)
+    except TimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers=get_retry_after(1))
+
+
+async def get_station_or_404(stationId):
+    """Return the station routed by its id, the default station being used when no id is given.
+    The station is synchronized with the shared state first."""
+    selected_station = fleet.get_station(stationId)
+    if selected_station is None:
+        raise HTTPException(
+            status_code=404, detail=f"there is no station with id {stationId} in the fleet"
+        )
+    await run_state_backend(state_backend.read, selected_station)
+    return selected_station
+
+
+async def apply_operations(station, operations):
+    """Apply operations on a station through the state backend, see write_operations."""
+    return await run_state_backend(write_operations, station, operations)
+
+
+def write_operations(station, operations):
+    """Apply operations on a station through the state backend, so they are seen by every worker.
+
+    Return the results, the allocation of every session affected and the new version of the station.
+    The sessions affected are all of them when the power is shared between the chargers, before or
+    after the operations, else only the sessions of the chargers operated, including the chargers of
+    the waiting sessions admitted and of the boosts released by the operations."""
+    events = []
+
+    def collect(station, event):
+        if event["type"] not in ("queued", "cancelled"):
+            events.append(event)
+
+    with state_backend.write(station), station.lock:
+        shared = station.is_power_shared()
+        station.add_listener(collect)
+        try:
+            results = station.apply_operations(operations)
+        finally:
+            station.remove_listener(collect)
+        chargerIds = [result["chargerId"] for result in results]
+        for event in events:
+            eventChargerIds = station.get_event_charger_ids(event)
+            chargerIds = None if chargerIds is None or eventChargerIds is None else chargerIds + eventChargerIds
+        chargerIds = station.get_affected_charger_ids(chargerIds, shared)
+        return results, station.get_allocations(chargerIds), station.version
+
+
+def get_charger_or_404(station, chargerId):
+    """Return the charger of the station, or answer a 404."""
+    charger = station.get_charger(chargerId)
+    if charger is None:
+        raise HTTPException(
+            status_code=404, detail=f"there is no charger with id {chargerId} in the station"
+        )
+    return charger
+
+
+def get_charger_status_or_404(station, chargerId):
+    """Return the status of a charger from its last published snapshot, or answer a 404."""
+    status = status_cache.get_charger_status(station, chargerId)
+    if status is None:
+        raise HTTPException(
+            status_code=404, detail=f"there is no charger with id {chargerId} in the station"
+        )
+    return status
+
+
+def check_connector_or_404(station, chargerId, connectorId):
+    """Answer a 404 if the station has no such charger, or the charger no such connector."""
+    if not get_charger_or_404(station, chargerId).has_connector(connectorId):
+        raise HTTPException(
+            status_code=404, detail=f"there is no connector {connectorId} on charger {chargerId}"
+        )
+
+
+def get_retry_after(wait):
+    """Return the Retry-After header of a 429, in whole seconds."""
+    return {"Retry-After": str(max(1, math.ceil(wait)))}
+
+
+def check_charger_rate_or_429(station, chargerIds):
+    """Take a token for each operation on a charger, or answer a 429 if a charger gets too many of them.
+    The auto-assigned starts share the bucket of the station."""
+    if charger_limiter is None:
+        return
+    costs = {}
+    for chargerId in chargerIds:
+        costs[(station.name, chargerId)] = costs.get((station.name, chargerId), 0) + 1
+    wait = charger_limiter.acquire(costs)
+    if wait:
+        REQUESTS_THROTTLED.labels("charger").inc()
+        raise HTTPException(
+            status_code=429, detail="too many session operations on this charger", headers=get_retry_after(wait)
+        )
+
+
+async def session_response(station, operation):
+    """Apply a single start or stop, and answer with its allocations, or a 409 if the connector is not
+    in the expected state. A start the station cannot guarantee its minimum power is answered with a 503
+    when rejected, or a 202 when queued. The payload is serialized by orjson directly, without validation."""
+    results, allocations, version = await apply_operations(station, [operation])
+    result = results[0]
+    if result["admission"] == "rejected":
+        raise HTTPException(status_code=503, detail=result["message"])
+    if not result["success"]:
+        raise HTTPException(status_code=409, detail=result["message"])
+    return ORJSONResponse(
+        {
+            "action": result["action"],
+            "chargerId": result["chargerId"],
+            "connectorId": result["connectorId"],
+            "allocated_power": result["allocated_power"],
+            "version": version,
+            "allocations": allocations,
+            "admission": result["admission"],
+        },
+        status_code=202 if result["admission"] == "queued" else 200,
+    )
+
+
+def project(status, fields):
+    """Keep only the comma-separated "fields" of a status, so the payload matches what the client asks for."""
+    if fields is None:
+        return status.model_dump()
+    selected_fields = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown_fields = selected_fields - set(type(status).model_fields)
+    if unknown_fields:
+        raise HTTPException(
+            status_code=400, detail=f"unknown fields: {', '.join(sorted(unknown_fields))}"
+        )
+    return status.model_dump(include=selected_fields)
 
-station = Station(config_dict)
+
+@app.middleware("http")
+async def limit_client_rate(request: Request, call_next):
+    """Middleware answering a 429 to a client sending more requests than its rate limit. /metrics is not limited."""
+    if client_limiter is not None and request.url.path != "/metrics":
+        wait = client_limiter.acquire({request.client.host if request.client else None: 1})
+        if wait:
+            REQUESTS_THROTTLED.labels("client").inc()
+            return ORJSONResponse({"detail": "too many requests"}, status_code=429, headers=get_retry_after(wait))
+    return await call_next(request)
 
 
 @app.middleware("http")
 async def measure_time(request: Request, call_next):
-    """Middleware that will print the time taken by each HTTP Call to be answered."""
-    start_time = time.time()
+    """Middleware recording the time taken by each HTTP Call to be answered, in the latency histogram
+    of its endpoint. The route template is used as label, so ids in the path do not create new series."""
+    start_time = time.perf_counter()
     response = await call_next(request)
-    end_time = time.time()
-    duration = end_time - start_time
-    print(f"Endpoint {request.url.path} executed in {duration:.3f} seconds")
+    duration = time.perf_counter() - start_time
+    route = request.scope.get("route")
+    REQUEST_DURATION.labels(request.method, route.path if route else "unmatched").observe(duration)
     return response
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Metrics of the app in the Prometheus text format: latency of the endpoints,
+    duration of the station operations, rebalancings, boosts and capped sessions."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/admin/reload_config")
+async def reload_station_config():
+    """Reload the config of the stations without restart: the chargers, the grid capacity and the battery
+    are changed in place, the active sessions are kept and each changed station is rebalanced once.
+    Only the stations whose config changed are updated."""
+    try:
+        return reload_config()
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=409, detail=f"config not reloaded: {e}")
+
+
 @app.get("/")
 async def root():
     """Base endpoint, just to display the name of the station."""
     return {"message": f"Monitoring of Electra station {station.name}"}
 
 
+@app.get("/stations")
+async def get_stations():
+    """List the ids of the stations served by the app."""
+    return {"stations": fleet.get_station_ids()}
+
+
 @app.get("/station/station_status", response_model=StationStatus)
-async def get_station_status():
-    """Displays the status of the whole station."""
-    return station.get_status()
+async def get_station_status(request: Request, stationId: Optional[str] = None):
+    """Displays the status of the whole station.
 
+    The status is served from a cache pre-rendered as JSON, with an ETag: a client sending
+    it back in If-None-Match gets a 304 as long as the station has not changed.
+    """
+    snapshot = status_cache.get_snapshot(await get_station_or_404(stationId))
+    headers = {"ETag": snapshot.etag}
+    if snapshot.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
 
-@app.post("/start_session/")
-async def start_session(chargerId, connectorId, powerCapacity):
-    """Start a new session on a specified charger and connector, if possible."""
-    charger = station.get_charger(chargerId)
-    if not charger:
-        return {"message": f"there is no charger with id {chargerId} in the station"}
-    if charger.is_session_free(int(connectorId)):
-        station.start_session_on_charger(
-            chargerId, int(connectorId), int(powerCapacity)
+
+@app.get("/station/events")
+async def stream_station_events(stationId: Optional[str] = None):
+    """Server-sent events with the changes of the station: the whole state first, then only
+    the sessions whose allocated power changed and the changes of the battery."""
+    station = await get_station_or_404(stationId)
+
+    async def events():
+        messages = status_stream.messages(station)
+        try:
+            async for message in messages:
+                yield f"data: {json.dumps(message)}\n\n"
+        finally:
+            await messages.aclose()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.websocket("/station/ws")
+async def stream_station_websocket(websocket: WebSocket, stationId: Optional[str] = None):
+    """Same messages as /station/events, over a WebSocket."""
+    station = fleet.get_station(stationId)
+    if station is None:
+        await websocket.close(code=1008, reason=f"there is no station with id {stationId} in the fleet")
+        return
+    await websocket.accept()
+    messages = status_stream.messages(station)
+    try:
+        async for message in messages:
+            await websocket.send_json(message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await messages.aclose()
+
+
+@app.get("/chargers/{chargerId}")
+async def get_charger_status(chargerId: str, stationId: Optional[str] = None, fields: Optional[str] = None):
+    """Displays the status of a single charger. "fields" selects the fields to return, e.g. fields=max_asked_power."""
+    return project(get_charger_status_or_404(await get_station_or_404(stationId), chargerId), fields)
+
+
+@app.get("/chargers/{chargerId}/connectors/{connectorId}")
+async def get_connector_status(
+    chargerId: str, connectorId: int, stationId: Optional[str] = None, fields: Optional[str] = None
+):
+    """Displays the status of a single connector of a charger, with its session if active."""
+    status = get_charger_status_or_404(await get_station_or_404(stationId), chargerId)
+    if not 1 <= connectorId <= len(status.connectors):
+        raise HTTPException(
+            status_code=404, detail=f"there is no connector {connectorId} on charger {chargerId}"
         )
-        return {
-            "message": f"Session started on charger {chargerId} and connector {connectorId} with power {charger.get_session(int(connectorId)).get_power()}"
-        }
-    else:
-        return {
-            "message": f"Session {connectorId} on charger {chargerId} is already active with another vehicle !! "
-        }
-
-
-@app.post("/stop_session/")
-async def stop_session(chargerId, connectorId):
-    """Stop a session on a specified charger and connector, if possible."""
-    charger = station.get_charger(chargerId)
-    if not charger:
-        return {"message": f"there is no charger with id {chargerId} in the station"}
-    if charger.is_session_free(int(connectorId)):
-        return {
-            "message": f"Cannot stop session {connectorId} as it is already inactive"
-        }
-
-    station.stop_session_on_charger(chargerId, int(connectorId))
-    return {"message": f"Session {connectorId} has been removed on charger {chargerId}"}
+    return project(status.connectors[connectorId - 1], fields)
+
+
+@app.get("/battery")
+async def get_battery_status(stationId: Optional[str] = None, fields: Optional[str] = None):
+    """Displays the status of the battery of the station."""
+    station = await get_station_or_404(stationId)
+    status = status_cache.get_battery_status(station)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"station {station.name} has no battery")
+    return project(status, fields)
+
+
+SESSION_ERRORS = {
+    202: {"description": "Start queued until the station can guarantee its minimum power", "model": SessionResponse},
+    404: {"description": "Unknown charger or connector"},
+    409: {"description": "Connector busy or idle"},
+    429: {"description": "Too many requests from the client, or operations on the charger"},
+    503: {"description": "Start rejected, the station cannot guarantee its minimum power"},
+}
+
+
+@app.get("/available")
+async def get_available_connectors(stationId: Optional[str] = None, limit: int = Query(10, ge=1)):
+    """Chargers with a free connector, the one with the most headroom (power not asked yet) first."""
+    freeConnectors, chargers = status_cache.get_availability(await get_station_or_404(stationId))
+    return {"free_connectors": freeConnectors, "chargers": chargers[:limit]}
+
+
+@app.post("/start_session/", response_model=SessionResponse, responses=SESSION_ERRORS)
+async def start_session(request: Annotated[StartSessionRequest, Query()]):
+    """Start a new session on a specified charger and connector, if possible. Without connectorId, the session
+    is auto-assigned to a free connector of the charger, or of the charger with the most headroom.
+    Answers with the power allocated to the new session and to every session affected by it."""
+    station = await get_station_or_404(request.stationId)
+    if request.connectorId is not None and request.chargerId is None:
+        raise HTTPException(status_code=422, detail="chargerId is required with a connectorId")
+    if request.connectorId is not None:
+        check_connector_or_404(station, request.chargerId, request.connectorId)
+    elif request.chargerId is not None:
+        get_charger_or_404(station, request.chargerId)
+    check_charger_rate_or_429(station, [request.chargerId])
+    return await session_response(
+        station,
+        {
+            "action": "start",
+            "chargerId": request.chargerId,
+            "connectorId": request.connectorId,
+            "powerCapacity": request.powerCapacity,
+        },
+    )
+
+
+@app.post("/stop_session/", response_model=SessionResponse, responses=SESSION_ERRORS)
+async def stop_session(request: Annotated[StopSessionRequest, Query()]):
+    """Stop a session on a specified charger and connector, if possible.
+    Answers with the power allocated to every session affected by the stop."""
+    station = await get_station_or_404(request.stationId)
+    check_connector_or_404(station, request.chargerId, request.connectorId)
+    check_charger_rate_or_429(station, [request.chargerId])
+    return await session_response(
+        station, {"action": "stop", "chargerId": request.chargerId, "connectorId": request.connectorId}
+    )
+
+
+@app.post("/sessions/batch", response_model=SessionBatchResult)
+async def apply_session_batch(batch: SessionBatch, stationId: Optional[str] = None):
+    """Apply a list of start/stop operations in order, with a single rebalancing at the end.
+    Answers with the result of each operation and the allocation of every session affected."""
+    station = await get_station_or_404(stationId)
+    for operation in batch.operations:
+        if operation.action == "start" and operation.powerCapacity is None:
+            raise HTTPException(status_code=422, detail="powerCapacity is required to start a session")
+    check_charger_rate_or_429(station, [operation.chargerId for operation in batch.operations])
+    operations = [operation.model_dump() for operation in batch.operations]
+    results, allocations, _ = await apply_operations(station, operations)
+    return SessionBatchResult(results=results, allocations=allocations)
+
+
+def get_history_or_404():
+    """Return the session history, or answer a 404 if it is disabled."""
+    if history is None:
+        raise HTTPException(status_code=404, detail="the session history is disabled, see STATION_HISTORY_DB")
+    return history
+
+
+@app.get("/history/sessions")
+async def get_session_history(
+    stationId: Optional[str] = None,
+    chargerId: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+):
+    """Energy delivered to each session in kWh, between the timestamps "since" and "until" if given."""
+    sessions = await asyncio.to_thread(get_history_or_404().get_session_energy, stationId, chargerId, since, until)
+    return {"sessions": sessions}
+
+
+@app.get("/history/chargers")
+async def get_charger_history(stationId: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None):
+    """Energy delivered by each charger in kWh, with its number of sessions."""
+    chargers = await asyncio.to_thread(get_history_or_404().get_charger_energy, stationId, since, until)
+    return {"chargers": chargers}
+
+
+@app.get("/history/days")
+async def get_daily_history(
+    stationId: Optional[str] = None,
+    chargerId: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+):
+    """Energy delivered each day (UTC) in kWh."""
+    days = await asyncio.to_thread(get_history_or_404().get_daily_energy, stationId, chargerId, since, until)
+    return {"days": days}
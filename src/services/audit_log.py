@@ -0,0 +1,255 @@
+"""Audit log of the decisions of the stations, as a stream of structured events in rotating JSONL files.
+
+A station listener turns each event of a station into audit events: the start (with its boost decision),
+stop and queuing of the sessions, the rebalancings with the power of each affected session before and after,
+and the transitions of the battery. The events go through a bounded ring buffer and are written by a
+background thread, so the requests never wait for the disk. When the buffer is full, the "drop" policy
+drops the oldest event (and counts it), and the "block" policy makes the station wait for the writer.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+import orjson
+
+from .metrics import AUDIT_EVENTS_DROPPED
+
+AUDIT_FILE = "audit.jsonl"
+OVERFLOW_POLICIES = ("drop", "block")
+
+
+def get_battery_state(battery):
+    """Return what the battery is doing: "discharging" for boosts, "charging", "full", "reserve" when it is
+    too low to boost new sessions, or "idle"."""
+    if battery.discharge_power > 0:
+        return "discharging"
+    if battery.state_of_charge >= 100:
+        return "full"
+    if battery.charge_power > 0:
+        return "charging"
+    return "reserve" if battery.get_power() == 0 else "idle"
+
+
+class AuditLog:
+    """Structured events of the stations of a fleet, written to a folder of rotating JSONL files."""
+
+    def __init__(
+        self,
+        folder,
+        capacity=10000,
+        policy="drop",
+        max_bytes=10_000_000,
+        backup_count=5,
+        flush_interval=1.0,
+        block_timeout=1.0,
+        clock=None,
+    ):
+        """capacity bounds the events waiting in memory. A file over max_bytes is rotated, and only
+        backup_count old files are kept. block_timeout bounds the wait of the "block" policy."""
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"unknown overflow policy {policy}, expected one of {list(OVERFLOW_POLICIES)}")
+        self.folder = folder
+        self.capacity = capacity
+        self.policy = policy
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self.clock = clock or time.time
+        self.buffer = deque()
+        self.condition = threading.Condition()
+        self.write_lock = threading.Lock()
+        self.wake_up = threading.Event()
+        self.thread = None
+        self.stopping = False
+        self.dropped = 0
+        self.file = None
+        # By station and charger: the power of each active session by connector, after the last event.
+        self.powers = {}
+        # By station: whether its power was shared between the chargers after the last event.
+        self.shared = {}
+        # By station: the state of its battery after the last event.
+        self.battery_states = {}
+        os.makedirs(folder, exist_ok=True)
+
+    def attach(self, fleet):
+        """Start auditing every station of the fleet, including the ones built later."""
+        fleet.on_station(self.attach_station)
+
+    def attach_station(self, station):
+        """Start auditing a station, from its current sessions and battery."""
+        with station.lock:
+            self.powers[station.name] = {
+                chargerId: charger.get_session_powers() for chargerId, charger in station.chargers.items()
+            }
+            self.shared[station.name] = station.is_power_shared()
+            if station.battery is not None:
+                self.battery_states[station.name] = get_battery_state(station.battery)
+            station.add_listener(self.record)
+
+    def record(self, station, event):
+        """Station listener, emitting the audit events of a station event."""
+        now = self.clock()
+        if event["type"] == "start":
+            self.emit(
+                {
+                    "time": now,
+                    "type": "session_start",
+                    "stationId": station.name,
+                    "chargerId": event["chargerId"],
+                    "connectorId": event["connectorId"],
+                    "power": event["power"],
+                    "boosted": event["boosted"],
+                    "boost": event["boost"],
+                }
+            )
+        elif event["type"] == "stop":
+            self.emit(
+                {
+                    "time": now,
+                    "type": "session_stop",
+                    "stationId": station.name,
+                    "chargerId": event["chargerId"],
+                    "connectorId": event["connectorId"],
+                }
+            )
+        elif event["type"] == "config":
+            self.emit({"time": now, "type": "config", "stationId": station.name, "changes": event["changes"]})
+        elif event["type"] in ("queued", "cancelled"):
+            # A session waiting for power does not change the others.
+            self.emit({"time": now, **event, "type": "session_" + event["type"], "stationId": station.name})
+            return
+        self.record_rebalance(station, event, now)
+        self.record_battery(station, now)
+
+    def record_rebalance(self, station, event, now):
+        """Emit the sessions whose power changed with the event, with their power before and after it.
+        Only the sessions of the operated chargers are compared, unless the power is shared before or after."""
+        powers = self.powers.setdefault(station.name, {})
+        wasShared = self.shared.get(station.name)
+        chargerIds = station.get_affected_charger_ids(station.get_event_charger_ids(event), wasShared)
+        self.shared[station.name] = station.is_power_shared()
+        if chargerIds is None:
+            # The chargers removed by a new config are compared too, their sessions being gone.
+            chargerIds = list(dict.fromkeys([*station.chargers, *powers]))
+        sessions = []
+        for chargerId in chargerIds:
+            charger = station.chargers.get(chargerId)
+            before = powers.get(chargerId, {})
+            after = charger.get_session_powers() if charger else {}
+            if after == before:
+                continue
+            for connectorId in sorted(before.keys() | after.keys()):
+                if before.get(connectorId) != after.get(connectorId):
+                    sessions.append(
+                        {
+                            "chargerId": chargerId,
+                            "connectorId": connectorId,
+                            "before": before.get(connectorId),
+                            "after": after.get(connectorId),
+                        }
+                    )
+            powers[chargerId] = after
+        if sessions:
+            self.emit(
+                {
+                    "time": now,
+                    "type": "rebalance",
+                    "stationId": station.name,
+                    "strategy": type(station.allocation_strategy).__name__,
+                    "sessions": sessions,
+                }
+            )
+
+    def record_battery(self, station, now):
+        """Emit the transitions of the battery, seen after each event of the station."""
+        if station.battery is None:
+            return
+        state = get_battery_state(station.battery)
+        previous = self.battery_states.get(station.name)
+        if state != previous:
+            self.battery_states[station.name] = state
+            self.emit(
+                {
+                    "time": now,
+                    "type": "battery",
+                    "stationId": station.name,
+                    "before": previous,
+                    "after": state,
+                    "state_of_charge": station.battery.state_of_charge,
+                    "charge_power": station.battery.charge_power,
+                    "discharge_power": station.battery.discharge_power,
+                }
+            )
+
+    def emit(self, event):
+        """Add an event to the ring buffer, applying the overflow policy when it is full."""
+        with self.condition:
+            if len(self.buffer) >= self.capacity and self.policy == "block" and not self.stopping:
+                self.wake_up.set()
+                self.condition.wait_for(lambda: len(self.buffer) < self.capacity, self.block_timeout)
+            if len(self.buffer) >= self.capacity:
+                self.buffer.popleft()
+                self.dropped += 1
+                AUDIT_EVENTS_DROPPED.inc()
+            self.buffer.append(event)
+            if len(self.buffer) * 2 >= self.capacity:
+                self.wake_up.set()
+
+    def start(self):
+        """Start the background writer."""
+        self.stopping = False
+        self.thread = threading.Thread(target=self.run, name="audit-log", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """Loop of the background writer."""
+        while not self.stopping:
+            self.wake_up.wait(self.flush_interval)
+            self.wake_up.clear()
+            self.flush()
+
+    def flush(self):
+        """Write the buffered events to the current file, rotating it when it is full. Return the number written."""
+        with self.write_lock:
+            with self.condition:
+                events = list(self.buffer)
+                self.buffer.clear()
+                self.condition.notify_all()
+            if not events:
+                return 0
+            if self.file is None:
+                self.file = open(os.path.join(self.folder, AUDIT_FILE), "ab")
+            self.file.write(b"".join(orjson.dumps(event, option=orjson.OPT_APPEND_NEWLINE) for event in events))
+            self.file.flush()
+            if self.file.tell() >= self.max_bytes:
+                self.rotate()
+            return len(events)
+
+    def rotate(self):
+        """Rename the current file to audit.jsonl.1, shifting the older ones and deleting the oldest."""
+        self.file.close()
+        self.file = None
+        path = os.path.join(self.folder, AUDIT_FILE)
+        for index in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f"{path}.{index}"):
+                os.replace(f"{path}.{index}", f"{path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(path, f"{path}.1")
+        else:
+            os.remove(path)
+
+    def close(self):
+        """Stop the background writer and write the last events."""
+        self.stopping = True
+        self.wake_up.set()
+        with self.condition:
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,201 @@
+"""Durable journal of the stations: an append-only event log, plus periodic compact snapshots.
+
+Every session start, stop and vehicle power change applied by a station is appended to the current log segment,
+and the log is fsync-ed by batches. A snapshot writes the state of every station in a binary
+file and starts a new log segment, so older segments can be deleted. At startup, the fleet
+is restored from the latest snapshot, then the events logged after it are replayed.
+"""
+import json
+import os
+import pickle
+import threading
+import time
+
+# Events of the stations written in the log. The config of the stations is read from its file at startup.
+JOURNALED_EVENTS = ("start", "stop", "power")
+SNAPSHOT_PREFIX = "snapshot-"
+LOG_PREFIX = "journal-"
+
+
+class EventJournal:
+    """Write-ahead log of the session events of a fleet, stored in a folder."""
+
+    def __init__(self, folder, fsync_every=64, fsync_interval=1.0):
+        """fsync_every and fsync_interval bound how many events, or how much time, can be lost on a crash of the machine."""
+        self.folder = folder
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.lock = threading.Lock()
+        self.sequence = 0
+        self.snapshot_sequence = 0
+        self.last_sequences = {}
+        self.unsynced_events = 0
+        self.last_fsync = time.monotonic()
+        self.log_file = None
+        self.replaying = False
+        os.makedirs(folder, exist_ok=True)
+
+    def list_files(self, prefix, extension):
+        """Return the (sequence, path) of the journal files with this prefix, in order."""
+        files = []
+        for fileName in os.listdir(self.folder):
+            if fileName.startswith(prefix) and fileName.endswith(extension):
+                sequence = int(fileName[len(prefix):-len(extension)])
+                files.append((sequence, os.path.join(self.folder, fileName)))
+        return sorted(files)
+
+    def recover(self, fleet):
+        """Restore the stations of the fleet from the latest snapshot and the log written after it.
+
+        The events are replayed at the time they were logged, so the batteries are charged and
+        discharged as they were. Return the number of replayed events. Must be called before attach.
+        """
+        snapshotSequences = {}
+        snapshots = self.list_files(SNAPSHOT_PREFIX, ".bin")
+        if snapshots:
+            self.sequence, path = snapshots[-1]
+            self.snapshot_sequence = self.sequence
+            with open(path, "rb") as f:
+                snapshot = pickle.load(f)
+            for stationId, (sequence, state) in snapshot.items():
+                station = fleet.get_station(stationId)
+                if station is not None:
+                    station.restore_state(state)
+                    snapshotSequences[stationId] = sequence
+        self.last_sequences = dict(snapshotSequences)
+
+        replayed = 0
+        replayTime = {"time": time.time()}
+        # Clocks of the batteries and of the boost schedulers replaced by the replay time, the stations being
+        # built as the log needs them.
+        clocks = {}
+        self.replaying = True
+        try:
+            for _, path in self.list_files(LOG_PREFIX, ".log"):
+                for event in self.read_log(path):
+                    self.sequence = max(self.sequence, event["seq"])
+                    replayTime["time"] = event["time"]
+                    station = fleet.get_station(event["stationId"])
+                    if station is None or event["seq"] <= snapshotSequences.get(event["stationId"], 0):
+                        continue
+                    for clocked in (station.battery, station.boost_scheduler):
+                        if hasattr(clocked, "clock") and clocked not in clocks:
+                            clocks[clocked] = clocked.clock
+                            clocked.clock = lambda: replayTime["time"]
+                    if station.check_operation(event["type"], event["chargerId"], event["connectorId"]):
+                        continue
+                    if event["type"] == "start":
+                        # The boost decision logged is applied, the scheduler may not take it again.
+                        station.start_session_on_charger(
+                            event["chargerId"], event["connectorId"], event["power"], event.get("boost")
+                        )
+                    elif event["type"] == "power":
+                        station.change_vehicle_power(event["chargerId"], event["connectorId"], event["power"])
+                    else:
+                        station.stop_session_on_charger(event["chargerId"], event["connectorId"])
+                    self.last_sequences[event["stationId"]] = event["seq"]
+                    replayed += 1
+        finally:
+            self.replaying = False
+            for clocked, clock in clocks.items():
+                clocked.clock = clock
+        return replayed
+
+    def read_log(self, path):
+        """Yield the events of a log segment. A torn last line, left by a crash, is ignored."""
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    return
+
+    def attach(self, fleet):
+        """Start logging the events of every station of the fleet, including the ones built later."""
+        fleet.on_station(self.attach_station)
+        self.open_segment()
+
+    def attach_station(self, station):
+        """Start logging the events of a station."""
+        station.add_listener(self.append)
+
+    def open_segment(self):
+        """Start a new log segment after the last event."""
+        with self.lock:
+            self.rotate()
+
+    def rotate(self):
+        """Close the current log segment and open the next one. Called with the lock held."""
+        if self.log_file is not None:
+            self.fsync()
+            self.log_file.close()
+        path = os.path.join(self.folder, f"{LOG_PREFIX}{self.sequence + 1:012d}.log")
+        self.log_file = open(path, "ab")
+        return self.sequence + 1
+
+    def append(self, station, event):
+        """Station listener, appending the event to the log.
+
+        The event is handed to the OS right away, so it survives a crash of the process,
+        while the fsync protecting it from a crash of the machine is done by batches.
+        """
+        if self.replaying or event["type"] not in JOURNALED_EVENTS:
+            return
+        with self.lock:
+            self.sequence += 1
+            self.last_sequences[station.name] = self.sequence
+            record = {"seq": self.sequence, "stationId": station.name, "time": time.time(), **event}
+            self.log_file.write(json.dumps(record, separators=(",", ":")).encode() + b"\n")
+            self.log_file.flush()
+            self.unsynced_events += 1
+            if (
+                self.unsynced_events >= self.fsync_every
+                or time.monotonic() - self.last_fsync >= self.fsync_interval
+            ):
+                self.fsync()
+
+    def fsync(self):
+        """Flush the logged events to the disk. Called with the lock held."""
+        self.log_file.flush()
+        os.fsync(self.log_file.fileno())
+        self.unsynced_events = 0
+        self.last_fsync = time.monotonic()
+
+    def snapshot(self, fleet):
+        """Write the state of every station in a binary snapshot, then drop the older log segments.
+
+        Each station is exported under its own lock, with the sequence of the last event applied
+        to it, so the snapshot stays consistent while the stations keep being used.
+        """
+        with self.lock:
+            segmentStart = self.rotate()
+        snapshot = {}
+        for station in list(fleet.stations.values()):
+            with station.lock:
+                snapshot[station.name] = (self.last_sequences.get(station.name, 0), station.export_state())
+        path = os.path.join(self.folder, f"{SNAPSHOT_PREFIX}{segmentStart - 1:012d}.bin")
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        self.snapshot_sequence = segmentStart - 1
+
+        for sequence, oldPath in self.list_files(LOG_PREFIX, ".log"):
+            if sequence < segmentStart:
+                os.remove(oldPath)
+        for sequence, oldPath in self.list_files(SNAPSHOT_PREFIX, ".bin"):
+            if oldPath != path:
+                os.remove(oldPath)
+
+    def get_events_since_snapshot(self):
+        """Return the number of events that would be replayed by a recovery."""
+        return self.sequence - self.snapshot_sequence
+
+    def close(self):
+        """Flush and close the current log segment."""
+        with self.lock:
+            if self.log_file is not None:
+                self.fsync()
+                self.log_file.close()
+                self.log_file = None
@@ -0,0 +1,257 @@
+"""Metrics of the app, exposed in the Prometheus text format by GET /metrics.
+
+Each thread increments its own shard of a metric, so recording a value takes no lock and
+no syscall: a few attribute lookups and additions. The shards are only summed when the
+metrics are scraped.
+"""
+import functools
+import threading
+from abc import ABC, abstractmethod
+import time
+from bisect import bisect_left
+
+# Upper bounds, in seconds, of the buckets of the latency histograms.
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0
+)
+
+
+class ShardedValues:
+    """Fixed-size list of values, with one shard per thread, summed on read."""
+
+    def __init__(self, size):
+        self.size = size
+        self.local = threading.local()
+        self.shards = []
+        self.lock = threading.Lock()
+
+    def get_shard(self):
+        """Return the shard of the current thread. The lock is only taken the first time a thread records a value."""
+        try:
+            return self.local.shard
+        except AttributeError:
+            shard = [0.0] * self.size
+            with self.lock:
+                self.shards.append(shard)
+            self.local.shard = shard
+            return shard
+
+    def read(self):
+        """Return the sum of the shards of all the threads."""
+        with self.lock:
+            shards = list(self.shards)
+        return [sum(values) for values in zip(*shards)] if shards else [0.0] * self.size
+
+
+class CounterValue:
+    """Value of a counter, for one set of labels."""
+
+    def __init__(self):
+        self.values = ShardedValues(1)
+
+    def inc(self, amount=1):
+        """Add to the counter."""
+        self.values.get_shard()[0] += amount
+
+    def get(self):
+        """Return the current value of the counter."""
+        return self.values.read()[0]
+
+
+class HistogramValue:
+    """Buckets, count and sum of a histogram, for one set of labels."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # One count per bucket, one for the values above the last bucket, then the sum.
+        self.values = ShardedValues(len(buckets) + 2)
+
+    def observe(self, value):
+        """Record a value in its bucket."""
+        shard = self.values.get_shard()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def get(self):
+        """Return the cumulative counts of the buckets, the count and the sum of the recorded values."""
+        values = self.values.read()
+        cumulative = []
+        count = 0
+        for bucketCount in values[:-1]:
+            count += bucketCount
+            cumulative.append(count)
+        return cumulative, count, values[-1]
+
+
+class Metric(ABC):
+    """Metric with a name, a help text and label names, holding a value per set of labels."""
+
+    kind = None
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.children = {}
+        self.lock = threading.Lock()
+
+    def labels(self, *label_values):
+        """Return the value of the metric for these labels, created on first use."""
+        child = self.children.get(label_values)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(label_values, self.new_value())
+        return child
+
+    @abstractmethod
+    def new_value(self):
+        """Return a new value, for a new set of labels."""
+
+    @abstractmethod
+    def render_value(self, label_values, child):
+        """Return the lines of the value of a set of labels in the Prometheus text format."""
+
+    def format_labels(self, label_values, extra=()):
+        """Format the labels of a sample, such as {method="GET",path="/"}."""
+        pairs = list(zip(self.label_names, label_values)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in pairs) + "}"
+
+    def render(self):
+        """Return the lines of the metric in the Prometheus text format."""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for label_values, child in sorted(self.children.items()):
+            lines.extend(self.render_value(label_values, child))
+        return lines
+
+
+class Counter(Metric):
+    """Counter, only going up."""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, label_names=()):
+        super().__init__(name, help_text, label_names)
+        if not self.label_names:
+            self.default = self.labels()
+
+    def new_value(self):
+        return CounterValue()
+
+    def inc(self, amount=1):
+        """Add to the counter without labels."""
+        self.default.inc(amount)
+
+    def get(self):
+        """Return the value of the counter without labels."""
+        return self.default.get()
+
+    def render_value(self, label_values, child):
+        return [f"{self.name}{self.format_labels(label_values)} {format_number(child.get())}"]
+
+
+class Histogram(Metric):
+    """Distribution of values in fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, help_text, label_names)
+
+    def new_value(self):
+        return HistogramValue(self.buckets)
+
+    def render_value(self, label_values, child):
+        cumulative, count, total = child.get()
+        bounds = [format_number(bound) for bound in self.buckets] + ["+Inf"]
+        lines = [
+            f"{self.name}_bucket{self.format_labels(label_values, [('le', bound)])} {format_number(bucketCount)}"
+            for bound, bucketCount in zip(bounds, cumulative)
+        ]
+        lines.append(f"{self.name}_count{self.format_labels(label_values)} {format_number(count)}")
+        lines.append(f"{self.name}_sum{self.format_labels(label_values)} {format_number(total)}")
+        return lines
+
+
+def escape_label(value):
+    """Escape the backslashes, quotes and newlines of a label value."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_number(value):
+    """Format a value as Prometheus does, integers without decimals."""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Registry:
+    """Set of metrics rendered together."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        """Add a metric to the registry, and return it."""
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Return all the metrics in the Prometheus text format."""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_DURATION = REGISTRY.register(
+    Histogram("http_request_duration_seconds", "Time taken to answer HTTP requests.", ("method", "path"))
+)
+OPERATION_DURATION = REGISTRY.register(
+    Histogram("station_operation_duration_seconds", "Time taken by the operations of the stations.", ("operation",))
+)
+REBALANCES = REGISTRY.register(Counter("station_rebalances_total", "Rebalancings of the power of the sessions."))
+BOOSTS_GRANTED = REGISTRY.register(
+    Counter("station_boosts_granted_total", "Sessions started with a battery boost.")
+)
+BOOSTS_DENIED = REGISTRY.register(
+    Counter("station_boosts_denied_total", "Sessions exceeding the grid capacity, for which the battery could not boost.")
+)
+BOOSTS_RESERVED = REGISTRY.register(
+    Counter("station_boosts_reserved_total", "Sessions not boosted, to keep the battery for a forecast peak.")
+)
+SESSIONS_CAPPED = REGISTRY.register(
+    Counter("station_sessions_capped_total", "Sessions started with less power than the vehicle asked for.")
+)
+SESSIONS_REJECTED = REGISTRY.register(
+    Counter("station_sessions_rejected_total", "Sessions rejected because the station could not guarantee their minimum power.")
+)
+SESSIONS_QUEUED = REGISTRY.register(
+    Counter("station_sessions_queued_total", "Sessions queued until the station could guarantee their minimum power.")
+)
+REQUESTS_THROTTLED = REGISTRY.register(
+    Counter("http_requests_throttled_total", "Requests answered with a 429 by the rate limits.", ("scope",))
+)
+AUDIT_EVENTS_DROPPED = REGISTRY.register(
+    Counter("audit_events_dropped_total", "Audit events dropped because the buffer of the audit log was full.")
+)
+
+
+def timed(operation):
+    """Decorator recording the duration of each call of a function in OPERATION_DURATION."""
+    histogram = OPERATION_DURATION.labels(operation)
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
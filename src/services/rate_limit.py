@@ -0,0 +1,66 @@
+"""Token-bucket rate limits of the requests, by client and by charger.
+
+Each key (a client address, a charger) has a bucket of "burst" tokens, refilled at "rate" tokens per
+second. A request takes a token, or is refused with the time to wait for one. The buckets are not
+refilled by ticks: the tokens earned since the last request are added lazily, so a check costs O(1).
+"""
+import threading
+import time
+
+
+class RateLimiter:
+    """Token buckets of a set of keys, sharing the same rate and burst."""
+
+    def __init__(self, rate, burst=None, max_keys=100000, clock=None):
+        """rate is in requests per second, and burst is the size of the buckets (rate by default, at least 1).
+        Beyond max_keys buckets, the full ones are forgotten, a new bucket being full anyway."""
+        self.rate = rate
+        self.burst = max(1, rate if burst is None else burst)
+        self.max_keys = max_keys
+        self.clock = clock or time.monotonic
+        self.lock = threading.Lock()
+        # By key: [tokens, time of the last refill].
+        self.buckets = {}
+
+    def refill(self, key, now):
+        """Return the bucket of a key, with the tokens earned since its last refill."""
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if len(self.buckets) >= self.max_keys:
+                self.prune(now)
+            bucket = self.buckets[key] = [self.burst, now]
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        return bucket
+
+    def acquire(self, costs):
+        """Take tokens from the buckets of several keys, given as {key: number of tokens}, all or none.
+        Return 0 if they were taken, else the seconds to wait before retrying. A key costs at most a full bucket."""
+        with self.lock:
+            now = self.clock()
+            buckets = [(self.refill(key, now), min(cost, self.burst)) for key, cost in costs.items()]
+            wait = max((cost - bucket[0] for bucket, cost in buckets), default=0)
+            if wait > 0:
+                return wait / self.rate if self.rate > 0 else float("inf")
+            for bucket, cost in buckets:
+                bucket[0] -= cost
+            return 0
+
+    def prune(self, now):
+        """Forget the buckets full again."""
+        self.buckets = {
+            key: bucket
+            for key, bucket in self.buckets.items()
+            if bucket[0] + (now - bucket[1]) * self.rate < self.burst
+        }
+
+
+def create_rate_limiter(setting):
+    """Return a rate limiter from a "rate" or "rate/burst" setting, or None if the setting is empty or 0."""
+    if not setting:
+        return None
+    rate, _, burst = setting.partition("/")
+    if float(rate) <= 0:
+        return None
+    return RateLimiter(float(rate), float(burst) if burst else None)
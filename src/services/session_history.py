@@ -0,0 +1,259 @@
+"""History of the sessions: an append-only SQLite store of the power delivered to every session over time.
+
+A station listener records, after each event, the sessions whose power changed: the sessions of the
+operated charger, or all of them when the power is shared through the grid. The records are queued
+in memory and written by a background thread, one transaction per batch, so the sessions never wait
+for the disk. The energy delivered is integrated from the records, per session, per charger or per day.
+"""
+import datetime
+import itertools
+import sqlite3
+import threading
+import time
+from collections import deque
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id INTEGER PRIMARY KEY,
+    station_id TEXT NOT NULL,
+    charger_id TEXT NOT NULL,
+    connector_id INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    stopped_at REAL
+);
+CREATE TABLE IF NOT EXISTS allocations (
+    session_id INTEGER NOT NULL,
+    time REAL NOT NULL,
+    power REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS allocations_by_session ON allocations (session_id, time);
+CREATE INDEX IF NOT EXISTS sessions_by_charger ON sessions (station_id, charger_id);
+"""
+
+# Each segment is a constant power delivered to a session, between "time" and "end_time" (NULL while it lasts).
+SEGMENTS_QUERY = """
+SELECT s.session_id, s.station_id, s.charger_id, s.connector_id, s.started_at, s.stopped_at, a.time, a.power,
+       COALESCE(LEAD(a.time) OVER (PARTITION BY a.session_id ORDER BY a.time, a.rowid), s.stopped_at)
+FROM allocations a JOIN sessions s ON s.session_id = a.session_id
+"""
+
+
+def get_day_end(timestamp):
+    """Return the timestamp of the UTC midnight following "timestamp"."""
+    day = datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).date() + datetime.timedelta(days=1)
+    return datetime.datetime(day.year, day.month, day.day, tzinfo=datetime.timezone.utc).timestamp()
+
+
+class SessionHistory:
+    """Recorder of the power of the sessions of a fleet, and queries of the energy they were delivered.
+
+    The power of a session is its share of the grid, or the power of its vehicle when the battery boosts it,
+    in kW, and the energy is in kWh.
+    """
+
+    def __init__(self, path, flush_interval=1.0, batch_size=1000, clock=None):
+        """flush_interval bounds the time a record waits in memory, batch_size wakes the writer up sooner."""
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.clock = clock or time.time
+        self.pending = deque()
+        self.write_lock = threading.Lock()
+        self.wake_up = threading.Event()
+        self.connections = threading.local()
+        self.thread = None
+        self.stopping = False
+        # By station: the [session id, last power recorded] of each active (chargerId, connectorId).
+        self.open_sessions = {}
+        # By station: whether its power was shared between the chargers after the last event.
+        self.shared = {}
+        connection = self.get_connection()
+        connection.executescript(SCHEMA)
+        (lastSessionId,) = connection.execute("SELECT COALESCE(MAX(session_id), 0) FROM sessions").fetchone()
+        self.session_ids = itertools.count(lastSessionId + 1)
+
+    def get_connection(self):
+        """Return the connection of the current thread, SQLite connections cannot be shared by threads."""
+        connection = getattr(self.connections, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.connections.connection = connection
+        return connection
+
+    def attach(self, fleet):
+        """Start recording the sessions of every station of the fleet, including the ones built later."""
+        fleet.on_station(self.attach_station)
+
+    def attach_station(self, station):
+        """Start recording the sessions of a station. After a restart, the sessions still open in the
+        store go on if the station recovered them on the same connector, the others are closed."""
+        self.flush()
+        with station.lock:
+            openSessions = self.open_sessions.setdefault(station.name, {})
+            rows = self.get_connection().execute(
+                "SELECT session_id, charger_id, connector_id FROM sessions WHERE station_id = ? AND stopped_at IS NULL",
+                (station.name,),
+            )
+            for sessionId, chargerId, connectorId in rows:
+                openSessions[(chargerId, connectorId)] = [sessionId, None]
+            now = self.clock()
+            activeSessions = {(a["chargerId"], a["connectorId"]) for a in station.get_allocations()}
+            for key in set(openSessions) - activeSessions:
+                self.close_session(station.name, key, now)
+            self.shared[station.name] = station.is_power_shared()
+            self.record_allocations(station, None, now)
+            station.add_listener(self.record)
+
+    def record(self, station, event):
+        """Station listener, queuing the changes of power of the sessions affected by the event."""
+        if event["type"] in ("queued", "cancelled"):
+            return
+        now = self.clock()
+        wasShared = self.shared.get(station.name)
+        chargerIds = station.get_affected_charger_ids(station.get_event_charger_ids(event), wasShared)
+        self.shared[station.name] = station.is_power_shared()
+        if event["type"] == "stop":
+            self.close_session(station.name, (event["chargerId"], event["connectorId"]), now)
+        self.record_allocations(station, chargerIds, now)
+
+    def record_allocations(self, station, chargerIds, now):
+        """Queue the power of the sessions of the chargers that changed since the last record."""
+        openSessions = self.open_sessions.setdefault(station.name, {})
+        if chargerIds is None:
+            chargers = station.chargers.values()
+        else:
+            chargers = [station.chargers[chargerId] for chargerId in chargerIds if chargerId in station.chargers]
+        for charger in chargers:
+            for connectorId, power in charger.get_session_powers().items():
+                key = (charger.label_id, connectorId)
+                session = openSessions.get(key)
+                if session is None:
+                    session = openSessions[key] = [next(self.session_ids), None]
+                    self.queue(("start", session[0], station.name, key[0], key[1], now))
+                if session[1] != power:
+                    session[1] = power
+                    self.queue(("power", session[0], now, power))
+
+    def close_session(self, stationId, key, now):
+        """Queue the end of a session."""
+        session = self.open_sessions[stationId].pop(key, None)
+        if session is not None:
+            self.queue(("stop", session[0], now))
+
+    def queue(self, record):
+        """Add a record to the next batch, waking the writer up when the batch is full."""
+        self.pending.append(record)
+        if len(self.pending) >= self.batch_size:
+            self.wake_up.set()
+
+    def start(self):
+        """Start the background writer."""
+        self.stopping = False
+        self.thread = threading.Thread(target=self.run, name="session-history", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """Loop of the background writer, flushing the pending records by batches."""
+        while not self.stopping:
+            self.wake_up.wait(self.flush_interval)
+            self.wake_up.clear()
+            self.flush()
+
+    def flush(self):
+        """Write the pending records in a single transaction. Return the number of records written."""
+        with self.write_lock:
+            records = []
+            while self.pending:
+                records.append(self.pending.popleft())
+            if not records:
+                return 0
+            with self.get_connection() as connection:
+                connection.executemany(
+                    "INSERT INTO sessions (session_id, station_id, charger_id, connector_id, started_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [record[1:] for record in records if record[0] == "start"],
+                )
+                connection.executemany(
+                    "INSERT INTO allocations (session_id, time, power) VALUES (?, ?, ?)",
+                    [record[1:] for record in records if record[0] == "power"],
+                )
+                connection.executemany(
+                    "UPDATE sessions SET stopped_at = ? WHERE session_id = ?",
+                    [(record[2], record[1]) for record in records if record[0] == "stop"],
+                )
+            return len(records)
+
+    def close(self):
+        """Stop the background writer and write the last records."""
+        self.stopping = True
+        self.wake_up.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.flush()
+
+    def get_segments(self, stationId=None, chargerId=None, since=None, until=None):
+        """Yield the segments of constant power of the sessions, as (session row, start, end, power),
+        clipped to [since, until]. The records still pending are written first."""
+        self.flush()
+        conditions, parameters = [], []
+        for condition, value in (
+            ("s.station_id = ?", stationId),
+            ("s.charger_id = ?", chargerId),
+            ("(s.stopped_at IS NULL OR s.stopped_at > ?)", since),
+            ("s.started_at < ?", until),
+        ):
+            if value is not None:
+                conditions.append(condition)
+                parameters.append(value)
+        query = SEGMENTS_QUERY + (" WHERE " + " AND ".join(conditions) if conditions else "")
+        now = self.clock()
+        for *session, start, power, end in self.get_connection().execute(query, parameters):
+            start = start if since is None else max(start, since)
+            end = now if end is None else end
+            end = end if until is None else min(end, until)
+            if end > start:
+                yield tuple(session), start, end, power
+
+    def get_session_energy(self, stationId=None, chargerId=None, since=None, until=None):
+        """Return the sessions with the energy they were delivered in kWh, ordered by id."""
+        sessions = {}
+        for session, start, end, power in self.get_segments(stationId, chargerId, since, until):
+            sessions[session] = sessions.get(session, 0) + power * (end - start) / 3600
+        return [
+            {
+                "session_id": session[0],
+                "station_id": session[1],
+                "charger_id": session[2],
+                "connector_id": session[3],
+                "started_at": session[4],
+                "stopped_at": session[5],
+                "energy": energy,
+            }
+            for session, energy in sorted(sessions.items())
+        ]
+
+    def get_charger_energy(self, stationId=None, since=None, until=None):
+        """Return the energy delivered by each charger in kWh, with its number of sessions."""
+        chargers = {}
+        for session in self.get_session_energy(stationId, None, since, until):
+            charger = chargers.setdefault(
+                (session["station_id"], session["charger_id"]),
+                {"station_id": session["station_id"], "charger_id": session["charger_id"], "energy": 0, "sessions": 0},
+            )
+            charger["energy"] += session["energy"]
+            charger["sessions"] += 1
+        return [chargers[key] for key in sorted(chargers)]
+
+    def get_daily_energy(self, stationId=None, chargerId=None, since=None, until=None):
+        """Return the energy delivered each UTC day in kWh, a segment over midnight being split between its days."""
+        days = {}
+        for _, start, end, power in self.get_segments(stationId, chargerId, since, until):
+            while start < end:
+                dayEnd = min(get_day_end(start), end)
+                day = datetime.datetime.fromtimestamp(start, datetime.timezone.utc).date().isoformat()
+                days[day] = days.get(day, 0) + power * (dayEnd - start) / 3600
+                start = dayEnd
+        return [{"day": day, "energy": energy} for day, energy in sorted(days.items())]
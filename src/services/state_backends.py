@@ -0,0 +1,124 @@
+"""State backends, sharing the state of the stations between the worker processes of the app.
+
+Every mutation goes through "backend.write(station)" and every read through "backend.read(station)".
+With the in-process backend the state only lives in the memory of the process. With the SQLite
+backend, several uvicorn workers serve the same fleet: a write holds the SQLite write lock, first
+loads the last shared state of the station, then publishes the new one. A backend whose calls wait
+for the other workers is "blocking": the app runs its calls in a thread, and they raise a TimeoutError
+when the other workers hold the database for too long.
+"""
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class InProcessStateBackend:
+    """Default backend, the state of the stations lives in the memory of the process only."""
+
+    blocking = False
+
+    def read(self, station):
+        """Nothing to synchronize, the station in memory is the reference."""
+
+    @contextmanager
+    def write(self, station):
+        """Hold the lock of the station during a mutation."""
+        with station.lock:
+            yield
+
+
+class SqliteStateBackend:
+    """Backend sharing the state of the stations through a SQLite database in WAL mode.
+
+    Each station is a row holding its exported state and a shared version. Reads only
+    query the version, and restore the state when another worker changed it.
+    """
+
+    blocking = True
+
+    def __init__(self, path, timeout=5.0):
+        """timeout is the time in seconds to wait for the database locked by another worker."""
+        self.path = path
+        self.timeout = timeout
+        self.connections = threading.local()
+        self.synced_versions = {}
+        with self.get_connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS station_state "
+                "(station_id TEXT PRIMARY KEY, version INTEGER NOT NULL, state TEXT NOT NULL)"
+            )
+
+    def get_connection(self):
+        """Return the connection of the current thread, SQLite connections cannot be shared by threads."""
+        connection = getattr(self.connections, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.connections.connection = connection
+        return connection
+
+    def sync(self, station, connection):
+        """Restore the shared state of the station if another worker changed it, return the shared version."""
+        row = connection.execute(
+            "SELECT version FROM station_state WHERE station_id = ?", (station.name,)
+        ).fetchone()
+        version = row[0] if row else 0
+        with station.lock:
+            if version != self.synced_versions.get(station.name, 0):
+                (state,) = connection.execute(
+                    "SELECT state FROM station_state WHERE station_id = ?", (station.name,)
+                ).fetchone()
+                station.restore_state(json.loads(state))
+                self.synced_versions[station.name] = version
+        return version
+
+    def read(self, station):
+        """Make the station up to date with the shared state, before serving a read."""
+        with self.raise_timeout():
+            self.sync(station, self.get_connection())
+
+    @contextmanager
+    def raise_timeout(self):
+        """Turn the error of a database still locked by another worker after the timeout into a TimeoutError."""
+        try:
+            yield
+        except sqlite3.OperationalError as e:
+            if "locked" in str(e) or "busy" in str(e):
+                raise TimeoutError(
+                    f"the shared state is locked by another worker for more than {self.timeout} s"
+                ) from e
+            raise
+
+    @contextmanager
+    def write(self, station):
+        """Apply a mutation on the last shared state of the station, then publish the new state."""
+        connection = self.get_connection()
+        with self.raise_timeout():
+            connection.execute("BEGIN IMMEDIATE")
+        try:
+            version = self.sync(station, connection)
+            with station.lock:
+                localVersion = station.version
+                yield
+                if station.version != localVersion:
+                    connection.execute(
+                        "INSERT INTO station_state (station_id, version, state) VALUES (?, ?, ?) "
+                        "ON CONFLICT(station_id) DO UPDATE SET version = excluded.version, state = excluded.state",
+                        (station.name, version + 1, json.dumps(station.export_state())),
+                    )
+                    self.synced_versions[station.name] = version + 1
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+
+def create_state_backend(url):
+    """Build a state backend from its url: "memory" (default) or "sqlite:///path/to/state.db"."""
+    if not url or url == "memory":
+        return InProcessStateBackend()
+    if url.startswith("sqlite:///"):
+        return SqliteStateBackend(url.removeprefix("sqlite:///"))
+    raise ValueError(f"unknown state backend {url}")
@@ -0,0 +1,125 @@
+"""Cache of the pre-rendered statuses of the stations, served by GET /station/station_status, and of the
+statuses of their chargers, battery and available connectors, each part being rendered on its own."""
+import hashlib
+
+
+class StatusSnapshot:
+    """Status of a station rendered as JSON bytes, at a given status key of the station."""
+
+    def __init__(self, station, key, body):
+        self.station = station
+        self.key = key
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+
+    def matches(self, if_none_match):
+        """Checks if the snapshot is the one already held by the client, from its If-None-Match header."""
+        if not if_none_match:
+            return False
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or self.etag in tags
+
+
+class PartSnapshot:
+    """Status of a part of a station (a charger, its battery, its available connectors), at a given key."""
+
+    def __init__(self, station, key, status):
+        self.station = station
+        self.key = key
+        self.status = status
+
+
+def get_version(station):
+    """Key of the parts changed by the events only: the version of the station."""
+    return station.version
+
+
+def render_status(station):
+    """Return the snapshot of the status of a station, read under its lock."""
+    return StatusSnapshot(station, station.get_status_key(), station.get_status().model_dump_json().encode())
+
+
+def render_charger(station, chargerId):
+    """Return the status of a charger of a station, or None if it was removed."""
+    charger = station.get_charger(chargerId)
+    return charger.get_status() if charger else None
+
+
+def render_battery(station):
+    """Return the status of the battery of a station, or None if it was removed."""
+    return station.battery.get_status() if station.battery else None
+
+
+def render_availability(station):
+    """Return the number of free connectors of a station, and its chargers with a free connector."""
+    return station.availability.free_connectors_count, station.get_available_connectors(len(station.chargers))
+
+
+class StatusCache:
+    """Keeps the last rendered status of each station, until the version of the station changes.
+
+    The key is the mutation counter of the station with the displayed state of charge of its
+    battery, so reading the status of an unchanged station does not rebuild nor serialize the
+    pydantic models again.
+    Snapshots are immutable and readers never wait on writers : if the station is locked
+    by a writer, the last published snapshot is served until the writer is done.
+    The parts of a station (a charger, the battery, the available connectors) have their own snapshots,
+    so reading one of them after an event renders only this part, not the whole station.
+    """
+
+    def __init__(self):
+        self.snapshots = {}
+        # By station name and part: the last snapshot of the part.
+        self.parts = {}
+
+    def get_snapshot(self, station):
+        """Return the snapshot of the current status of the station, rendering it if outdated."""
+        snapshot = self.snapshots.get(station.name)
+        if snapshot is not None and snapshot.station is station and snapshot.key == station.get_status_key():
+            return snapshot
+        snapshot = self.render(station, snapshot, render_status)
+        self.snapshots[station.name] = snapshot
+        return snapshot
+
+    def get_part(self, station, part, get_key, render):
+        """Return the status of a part of the station, from its last snapshot if the key of the station
+        did not change, else rendered by "render" alone."""
+        snapshot = self.parts.get((station.name, part))
+        if snapshot is not None and snapshot.station is station and snapshot.key == get_key(station):
+            return snapshot.status
+        snapshot = self.render(
+            station, snapshot, lambda station: PartSnapshot(station, get_key(station), render(station))
+        )
+        self.parts[(station.name, part)] = snapshot
+        return snapshot.status
+
+    def get_charger_status(self, station, chargerId):
+        """Return the status of a charger of the station, or None if the station has no such charger."""
+        if station.get_charger(chargerId) is None:
+            return None
+        return self.get_part(
+            station, ("charger", chargerId), get_version, lambda station: render_charger(station, chargerId)
+        )
+
+    def get_battery_status(self, station):
+        """Return the status of the battery of the station, or None if it has no battery."""
+        if station.battery is None:
+            return None
+        return self.get_part(station, "battery", lambda station: station.get_status_key(), render_battery)
+
+    def get_availability(self, station):
+        """Return the number of free connectors of the station, and its chargers with a free connector,
+        the most headroom first."""
+        return self.get_part(station, "availability", get_version, render_availability)
+
+    @staticmethod
+    def render(station, snapshot, render):
+        """Render a snapshot of the station under its lock. The last snapshot of a known station is returned
+        instead of waiting for a writer holding the lock, only the first one of a station waits."""
+        is_known_station = snapshot is not None and snapshot.station is station
+        if not station.lock.acquire(blocking=not is_known_station):
+            return snapshot
+        try:
+            return render(station)
+        finally:
+            station.lock.release()
@@ -0,0 +1,171 @@
+"""Push of the changes of the stations to subscribers, served by the SSE and WebSocket endpoints.
+
+A mutation of a station only wakes up the publisher, once per burst of mutations. The publisher
+then computes the changes since the last published state (the allocated power of each session,
+the state of charge and the boosts of the battery), and merges them in the pending changes of
+every subscriber. A slow subscriber never blocks the publisher nor the writers : its pending
+changes are coalesced, a key changed several times is sent once with its last value, so the
+memory held for a subscriber is bounded by the size of the station.
+"""
+import asyncio
+import threading
+
+VERSION = ("version",)
+STATE_OF_CHARGE = ("state_of_charge",)
+
+
+def get_stream_state(station):
+    """Return the streamed state of the station, as a flat dict. Called with the lock of the station held."""
+    state = {VERSION: station.version}
+    for chargerId, charger in station.chargers.items():
+        for connectorId, session in charger.sessions.items():
+            state[("session", chargerId, connectorId)] = session.get_power()
+    if station.battery is not None:
+        state[STATE_OF_CHARGE] = station.battery.get_displayed_state_of_charge()
+        for (chargerId, connectorId), boost in station.battery.session_boosts.items():
+            state[("boost", chargerId, connectorId)] = boost.power_boost
+    return state
+
+
+def get_changes(old_state, new_state):
+    """Return the keys whose value changed between two states, the removed keys having the value None."""
+    changes = {key: value for key, value in new_state.items() if old_state.get(key) != value}
+    for key in old_state:
+        if key not in new_state:
+            changes[key] = None
+    return changes
+
+
+def render_changes(station_name, changes):
+    """Render changes as a message, such as
+    {"stationId": ..., "version": 12, "sessions": {"CP001": {"1": 75.0, "2": null}}, "battery": {...}}."""
+    message = {"stationId": station_name, "version": changes.get(VERSION)}
+    for key, value in changes.items():
+        if key[0] == "session":
+            message.setdefault("sessions", {}).setdefault(key[1], {})[str(key[2])] = value
+        elif key == STATE_OF_CHARGE:
+            message.setdefault("battery", {})["state_of_charge"] = value
+        elif key[0] == "boost":
+            message.setdefault("battery", {}).setdefault("session_boosts", {})[f"{key[1]}_{key[2]}"] = value
+    return message
+
+
+class Subscriber:
+    """Pending changes of a subscriber, coalesced until it reads them."""
+
+    def __init__(self):
+        self.pending = {}
+        self.event = asyncio.Event()
+
+    def push(self, changes):
+        """Merge changes in the pending ones, never waiting for the subscriber."""
+        self.pending.update(changes)
+        self.event.set()
+
+    async def get(self):
+        """Wait for changes, and return all the ones pending since the last read."""
+        await self.event.wait()
+        self.event.clear()
+        changes, self.pending = self.pending, {}
+        return changes
+
+
+class StatusStream:
+    """Publisher of the changes of the stations to their subscribers, running in the event loop."""
+
+    def __init__(self, min_interval=0.05):
+        """min_interval is the time waited after a mutation, so a burst of mutations is published at once."""
+        self.min_interval = min_interval
+        self.subscribers = {}
+        self.states = {}
+        self.loop = None
+        self.loop_thread = None
+        self.wakeup = None
+        self.wakeup_pending = False
+
+    def on_station_event(self, station, event):
+        """Station listener, waking up the publisher. It does nothing when a wakeup is already pending."""
+        if self.wakeup_pending or self.loop is None or station not in self.subscribers:
+            return
+        self.wakeup_pending = True
+        if threading.get_ident() == self.loop_thread:
+            self.wakeup.set()
+        else:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    async def run(self):
+        """Publish the changes of the stations each time they mutate, until cancelled."""
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.wakeup = asyncio.Event()
+        if self.wakeup_pending:
+            self.wakeup.set()
+        while True:
+            await self.wakeup.wait()
+            await asyncio.sleep(self.min_interval)
+            self.wakeup.clear()
+            self.wakeup_pending = False
+            self.publish()
+
+    def publish(self):
+        """Send the changes of every station with subscribers since its last published state.
+
+        A station locked by a writer is skipped, and published at the next wakeup."""
+        for station, subscribers in list(self.subscribers.items()):
+            version, state = self.states[station]
+            if station.version == version:
+                continue
+            if not station.lock.acquire(blocking=False):
+                self.wake_up()
+                continue
+            try:
+                newState = get_stream_state(station)
+            finally:
+                station.lock.release()
+            changes = get_changes(state, newState)
+            self.states[station] = (newState[VERSION], newState)
+            # The version always changes, there is nothing to send if nothing else did.
+            if len(changes) > 1:
+                for subscriber in subscribers:
+                    subscriber.push(changes)
+
+    def wake_up(self):
+        """Make the publisher run again, from the event loop."""
+        self.wakeup_pending = True
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    def subscribe(self, station):
+        """Register a subscriber to the station. Its first message is the whole state of the station."""
+        if station not in self.subscribers:
+            if self.on_station_event not in station.listeners:
+                station.add_listener(self.on_station_event)
+            with station.lock:
+                self.states[station] = (station.version, get_stream_state(station))
+            self.subscribers[station] = set()
+        version, state = self.states[station]
+        if station.version != version:
+            self.wake_up()
+        subscriber = Subscriber()
+        subscriber.push(state)
+        self.subscribers[station].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, station, subscriber):
+        """Remove a subscriber. The state of a station without subscribers is not kept."""
+        subscribers = self.subscribers.get(station)
+        if subscribers is None:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self.subscribers[station]
+            del self.states[station]
+
+    async def messages(self, station):
+        """Yield the messages of a new subscriber to the station, until the generator is closed."""
+        subscriber = self.subscribe(station)
+        try:
+            while True:
+                yield render_changes(station.name, await subscriber.get())
+        finally:
+            self.unsubscribe(station, subscriber)
@@ -0,0 +1,242 @@
+"""Discrete-event simulator of a station, driving it with arrival and departure traces.
+
+The simulator keeps the events in a heap ordered by time (in hours). Between two events the
+powers of the station are constant, so the energy delivered, the time spent capped and the
+charge of the battery are integrated exactly, and an event is scheduled when the battery runs empty
+to move its boosts back to the grid. It is meant to size grid capacity and batteries offline.
+
+Run it from the root folder with:
+    python -m src.simulation.simulator --config station_config.json --trace trace.json
+"""
+import argparse
+import heapq
+import json
+import random
+
+from ..station_components.station import Station
+
+# At the same time, departures are processed first so that their connector is free for an arrival.
+DEPARTURE = 0
+BATTERY_EMPTY = 1
+POWER_CHANGE = 2
+ARRIVAL = 3
+
+
+class SimulatedStation(Station):
+    """Station whose battery is charged and discharged over the simulated time by the simulator,
+    instead of over the time of the machine. Its boost scheduler learns on the simulated time too."""
+
+    def __init__(self, config):
+        # Simulated time in hours, set by the simulator before each event.
+        self.time = 0.0
+        super().__init__(config, clock=lambda: 0.0)
+        if hasattr(self.boost_scheduler, "clock"):
+            self.boost_scheduler.clock = lambda: self.time * 3600
+
+    def recharge_battery_if_possible(self):
+        """The battery is charged from the grid headroom by the simulator, between events. The boosts of
+        an empty battery are moved back to the grid, as in the station."""
+        if self.battery and self.release_depleted_boosts():
+            self.set_all_non_boosted_sessions_to_uniform_power()
+
+
+class Simulator:
+    """Heap-based event scheduler driving a station.
+
+    An arrival is a dict with "time" and "duration" in hours, the max power of the vehicle
+    ("power", in kW) or its charging curve ("powerCurve", a list of [hours since arrival, power]),
+    and optionally the "chargerId" and "connectorId" to use. Otherwise the vehicle takes the
+    first free connector, and is counted as rejected if there is none.
+    """
+
+    def __init__(self, config):
+        self.station = SimulatedStation(config)
+        self.slots = [
+            (chargerId, connectorId)
+            for chargerId, charger in self.station.chargers.items()
+            for connectorId in range(1, charger.nb_connectors + 1)
+        ]
+        self.queue = []
+        self.order = 0
+        self.time = 0.0
+        self.grid_power = 0.0
+        self.boost_power = 0.0
+        self.is_capped = False
+        # Order of the scheduled BATTERY_EMPTY event still valid, the older ones being ignored.
+        self.empty_check = None
+        self.kpis = {
+            "events": 0,
+            "sessions": 0,
+            "rejected_arrivals": 0,
+            "boosted_sessions": 0,
+            "energy_delivered_kwh": 0.0,
+            "grid_energy_kwh": 0.0,
+            "battery_energy_kwh": 0.0,
+            "capped_hours": 0.0,
+            "peak_grid_power": 0.0,
+        }
+
+    def schedule(self, time, kind, data):
+        """Add an event to the heap. The order breaks ties between events at the same time."""
+        heapq.heappush(self.queue, (time, kind, self.order, data))
+        self.order += 1
+
+    def load_trace(self, arrivals):
+        """Schedule the arrivals of a trace."""
+        for arrival in arrivals:
+            self.schedule(arrival["time"], ARRIVAL, arrival)
+
+    def measure(self):
+        """Read the powers of the station after an event, they stay constant until the next one."""
+        gridPower = 0.0
+        boostPower = 0.0
+        isCapped = False
+        for charger in self.station.chargers.values():
+            for session in charger.sessions.values():
+                if session.is_battery_boosted:
+                    boostPower += session.max_vehicle_power
+                else:
+                    power = session.get_power()
+                    gridPower += power
+                    isCapped = isCapped or power < session.max_vehicle_power
+        self.grid_power = gridPower
+        self.boost_power = boostPower
+        self.is_capped = isCapped
+        self.kpis["peak_grid_power"] = max(self.kpis["peak_grid_power"], gridPower)
+        # The boosts are released when the battery runs empty, even if no other event happens before.
+        self.empty_check = None
+        netPower = self.get_battery_net_power()
+        if netPower < 0:
+            self.empty_check = self.order
+            self.schedule(self.time + self.station.battery.energy / -netPower, BATTERY_EMPTY, self.order)
+
+    def get_battery_net_power(self):
+        """Return the power charged into the battery minus the power of its boosts, 0 without battery."""
+        battery = self.station.battery
+        if battery is None:
+            return 0.0
+        chargePower = max(0.0, self.station.grid_capacity - self.grid_power)
+        chargedPower = min(chargePower, battery.max_charge_power) * battery.efficiency
+        return chargedPower - min(self.boost_power, battery.max_power)
+
+    def advance_to(self, time):
+        """Integrate the energies and the battery from the current time to "time"."""
+        hours = time - self.time
+        if hours <= 0:
+            return
+        battery = self.station.battery
+        # The boosts get their full power until the battery runs empty, charged from the grid headroom meanwhile.
+        boostHours = hours
+        if battery is not None:
+            netPower = self.get_battery_net_power()
+            if netPower < 0:
+                boostHours = min(hours, battery.energy / -netPower)
+            battery.advance(hours, max(0.0, self.station.grid_capacity - self.grid_power), self.boost_power)
+        self.kpis["grid_energy_kwh"] += self.grid_power * hours
+        self.kpis["battery_energy_kwh"] += self.boost_power * boostHours
+        self.kpis["energy_delivered_kwh"] += self.grid_power * hours + self.boost_power * boostHours
+        if self.is_capped:
+            self.kpis["capped_hours"] += hours
+        else:
+            # The boosted sessions get no power once the battery is empty.
+            self.kpis["capped_hours"] += hours - boostHours
+        self.time = time
+        self.station.time = time
+
+    def arrive(self, arrival):
+        """Start the session of an arriving vehicle, and schedule its power changes and departure."""
+        slot = self.find_slot(arrival)
+        if slot is None:
+            self.kpis["rejected_arrivals"] += 1
+            return
+        chargerId, connectorId = slot
+        curve = arrival.get("powerCurve") or [[0, arrival["power"]]]
+        self.station.start_session_on_charger(chargerId, connectorId, curve[0][1])
+        self.kpis["sessions"] += 1
+        if self.station.get_charger(chargerId).get_session(connectorId).is_battery_boosted:
+            self.kpis["boosted_sessions"] += 1
+        departure = self.time + arrival["duration"]
+        for offset, power in curve[1:]:
+            if self.time + offset < departure:
+                self.schedule(self.time + offset, POWER_CHANGE, (chargerId, connectorId, power))
+        self.schedule(departure, DEPARTURE, (chargerId, connectorId))
+
+    def find_slot(self, arrival):
+        """Return the connector asked by the vehicle if free, or the first free connector."""
+        if "chargerId" in arrival:
+            slot = (arrival["chargerId"], arrival["connectorId"])
+            return slot if self.station.get_charger(slot[0]).is_session_free(slot[1]) else None
+        for chargerId, connectorId in self.slots:
+            if self.station.get_charger(chargerId).is_session_free(connectorId):
+                return chargerId, connectorId
+        return None
+
+    def run(self, until=None):
+        """Process the events in time order, up to "until" hours if given. Return the KPIs."""
+        while self.queue and (until is None or self.queue[0][0] <= until):
+            time, kind, _, data = heapq.heappop(self.queue)
+            if kind == BATTERY_EMPTY and data != self.empty_check:
+                continue
+            self.advance_to(time)
+            if kind == BATTERY_EMPTY:
+                # The battery is empty at this time by construction, up to the rounding of the times.
+                self.station.battery.energy = 0.0
+                self.station.recharge_battery_if_possible()
+            elif kind == ARRIVAL:
+                self.arrive(data)
+            elif kind == POWER_CHANGE:
+                self.station.change_vehicle_power(*data)
+            else:
+                self.station.stop_session_on_charger(*data)
+            self.measure()
+            if kind != BATTERY_EMPTY:
+                self.kpis["events"] += 1
+        if until is not None:
+            self.advance_to(until)
+        return self.get_kpis()
+
+    def get_kpis(self):
+        """Return the KPIs of the simulation so far."""
+        kpis = dict(self.kpis)
+        kpis["hours"] = self.time
+        kpis["state_of_charge"] = self.station.battery.state_of_charge if self.station.battery else None
+        return kpis
+
+
+def generate_arrivals(hours, arrivals_per_hour, seed=0, mean_duration=0.5, powers=(50, 100, 150, 250)):
+    """Generate a Poisson trace of arrivals, with tapering charging curves (full power, then half power)."""
+    rng = random.Random(seed)
+    arrivals = []
+    time = rng.expovariate(arrivals_per_hour)
+    while time < hours:
+        power = rng.choice(powers)
+        duration = rng.expovariate(1 / mean_duration)
+        arrivals.append(
+            {"time": time, "duration": duration, "powerCurve": [[0, power], [duration * 0.7, power / 2]]}
+        )
+        time += rng.expovariate(arrivals_per_hour)
+    return arrivals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a station driven by a trace of arrivals.")
+    parser.add_argument("--config", default="station_config.json", help="config of the station")
+    parser.add_argument("--trace", help="JSON file with the list of arrivals, a random trace is generated otherwise")
+    parser.add_argument("--hours", type=float, default=24, help="duration of the simulation")
+    parser.add_argument("--arrivals-per-hour", type=float, default=10, help="rate of the generated trace")
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = json.load(f)
+    if args.trace:
+        with open(args.trace, "r") as f:
+            arrivals = json.load(f)
+    else:
+        arrivals = generate_arrivals(args.hours, args.arrivals_per_hour)
+    simulator = Simulator(config)
+    simulator.load_trace(arrivals)
+    print(json.dumps(simulator.run(until=args.hours), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Parallel sweep of what-if station configurations, simulated with the same trace of arrivals.
+
+The scenarios of a parameter grid are fanned out over a process pool. The trace is packed once
+in shared memory and decoded once by each worker, instead of being pickled for every scenario.
+The KPIs of each scenario are streamed as soon as it is done.
+
+Run it from the root folder with:
+    python -m src.simulation.sweep --config station_config.json --grid gridCapacity=300,400,500 --grid batteryPower=0,200
+"""
+import argparse
+import copy
+import itertools
+import json
+import multiprocessing
+from array import array
+from multiprocessing import shared_memory
+
+from .simulator import Simulator, generate_arrivals
+
+SWEEP_PARAMETERS = ("gridCapacity", "maxPower", "connectors", "batteryPower", "batteryCapacity")
+
+# Values of each arrival in a packed trace.
+ROW_SIZE = 6
+# Trace decoded by each worker of the pool, from the shared memory.
+worker_arrivals = None
+
+
+def build_config(base_config, params):
+    """Apply the parameters of a scenario to a copy of the base config. A battery power of 0 removes the battery."""
+    config = copy.deepcopy(base_config)
+    for name, value in params.items():
+        if name == "gridCapacity":
+            config["gridCapacity"] = value
+        elif name in ("maxPower", "connectors"):
+            for charger in config["chargers"]:
+                charger[name] = int(value) if name == "connectors" else value
+        elif name == "batteryPower" and not value:
+            config.pop("battery", None)
+        elif name in ("batteryPower", "batteryCapacity"):
+            battery = config.setdefault("battery", {"initialCapacity": 0, "power": 0})
+            battery["power" if name == "batteryPower" else "initialCapacity"] = value
+        else:
+            raise ValueError(f"unknown sweep parameter {name}, expected one of {SWEEP_PARAMETERS}")
+    return config
+
+
+def expand_grid(grid):
+    """Return the parameters of every scenario of the grid, a dict of parameter name to values."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def encode_trace(arrivals, chargerIds=()):
+    """Pack a trace in a flat array of doubles: the counts, then one row per arrival (time, duration,
+    index and length of its curve, index of its charger in chargerIds and its connector, -1 and 0 if
+    it takes any free connector), then the points of the curves."""
+    chargerIndexes = {chargerId: index for index, chargerId in enumerate(chargerIds)}
+    rows = array("d")
+    points = array("d")
+    for arrival in arrivals:
+        curve = arrival.get("powerCurve") or [[0, arrival["power"]]]
+        chargerIndex, connectorId = -1, 0
+        if "chargerId" in arrival:
+            if arrival["chargerId"] not in chargerIndexes:
+                raise ValueError(f"the trace uses charger {arrival['chargerId']}, which is not in the config")
+            chargerIndex, connectorId = chargerIndexes[arrival["chargerId"]], arrival["connectorId"]
+        rows.extend((arrival["time"], arrival["duration"], len(points) // 2, len(curve), chargerIndex, connectorId))
+        for offset, power in curve:
+            points.extend((offset, power))
+    return array("d", (len(arrivals), len(points) // 2)) + rows + points
+
+
+def decode_trace(buffer, chargerIds=()):
+    """Rebuild the list of arrivals from a packed trace, with the chargerIds it was packed with."""
+    values = memoryview(buffer).cast("d")
+    nbArrivals = int(values[0])
+    pointsStart = 2 + ROW_SIZE * nbArrivals
+    arrivals = []
+    for i in range(nbArrivals):
+        row = values[2 + ROW_SIZE * i: 2 + ROW_SIZE * (i + 1)]
+        time, duration, curveIndex, curveLength, chargerIndex, connectorId = row
+        start = pointsStart + 2 * int(curveIndex)
+        curve = [
+            [values[start + 2 * j], values[start + 2 * j + 1]] for j in range(int(curveLength))
+        ]
+        arrival = {"time": time, "duration": duration, "powerCurve": curve}
+        if chargerIndex >= 0:
+            arrival["chargerId"] = chargerIds[int(chargerIndex)]
+            arrival["connectorId"] = int(connectorId)
+        arrivals.append(arrival)
+    values.release()
+    return arrivals
+
+
+def init_worker(shared_memory_name, size, chargerIds):
+    """Decode the trace from the shared memory, once per worker."""
+    global worker_arrivals
+    memory = shared_memory.SharedMemory(name=shared_memory_name)
+    try:
+        worker_arrivals = decode_trace(memory.buf[:size], chargerIds)
+    finally:
+        memory.close()
+
+
+def run_scenario(task):
+    """Simulate a scenario with the trace of the worker, return its parameters and KPIs."""
+    params, config, until = task
+    simulator = Simulator(config)
+    simulator.load_trace(worker_arrivals)
+    return params, simulator.run(until=until)
+
+
+def sweep(base_config, grid, arrivals, until=None, processes=None):
+    """Simulate every scenario of the grid over the trace, yield (params, kpis) as they complete."""
+    tasks = [(params, build_config(base_config, params), until) for params in expand_grid(grid)]
+    # The sweep parameters never change the ids of the chargers, the arrivals pinned to one are packed by its index.
+    chargerIds = [charger["id"] for charger in base_config["chargers"]]
+    packed = encode_trace(arrivals, chargerIds).tobytes()
+    memory = shared_memory.SharedMemory(create=True, size=max(len(packed), 1))
+    try:
+        memory.buf[: len(packed)] = packed
+        with multiprocessing.Pool(processes, initializer=init_worker, initargs=(memory.name, len(packed), chargerIds)) as pool:
+            yield from pool.imap_unordered(run_scenario, tasks)
+    finally:
+        memory.close()
+        memory.unlink()
+
+
+def parse_grid(values):
+    """Parse the --grid arguments, such as gridCapacity=300,400."""
+    grid = {}
+    for value in values:
+        name, _, options = value.partition("=")
+        grid[name] = [float(option) for option in options.split(",")]
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a grid of station configurations over the same trace.")
+    parser.add_argument("--config", default="station_config.json", help="base config of the station")
+    parser.add_argument("--trace", help="JSON file with the list of arrivals, a random trace is generated otherwise")
+    parser.add_argument("--hours", type=float, default=24 * 7, help="duration of each simulation")
+    parser.add_argument("--arrivals-per-hour", type=float, default=10, help="rate of the generated trace")
+    parser.add_argument(
+        "--grid", action="append", default=[], help=f"parameter=value1,value2 with parameter in {SWEEP_PARAMETERS}"
+    )
+    parser.add_argument("--processes", type=int, help="size of the process pool, all the cores by default")
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = json.load(f)
+    if args.trace:
+        with open(args.trace, "r") as f:
+            arrivals = json.load(f)
+    else:
+        arrivals = generate_arrivals(args.hours, args.arrivals_per_hour)
+    for params, kpis in sweep(config, parse_grid(args.grid), arrivals, args.hours, args.processes):
+        print(json.dumps({"params": params, "kpis": kpis}), flush=True)
+
+
+if __name__ == "__main__":
+    main()
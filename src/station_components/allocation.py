@@ -0,0 +1,102 @@
+"""Strategies allocating the grid capacity of a station to its non-boosted sessions.
+
+A strategy is called by the station to rebalance after each change of its sessions, and gives the
+power level of each charger : a session draws the min of this level and the max power of its vehicle.
+The strategy of a station is set by "allocationStrategy" in its config.
+"""
+import math
+
+
+def get_charger_level(charger, uniform_power):
+    """Return the power level of a charger under the uniform strategy, "uniform_power" being
+    the power shared by the station when its grid capacity is exceeded, or None."""
+    if charger.non_boosted_sessions_count == 0:
+        return charger.max_power_capacity
+    chargerLevel = charger.max_power_capacity / charger.non_boosted_sessions_count
+    if uniform_power is not None:
+        return min(uniform_power, chargerLevel)
+    if charger.max_asked_power > charger.max_power_capacity:
+        return chargerLevel
+    return math.inf
+
+
+def get_water_level(demands, capacity):
+    """Return the level L such that sum(min(demand, L)) equals the capacity, or inf if all the demands fit in it.
+
+    The demands are sorted, then filled from the lowest one: O(n log n)."""
+    remaining = capacity
+    count = len(demands)
+    for i, demand in enumerate(sorted(demands)):
+        if demand * (count - i) >= remaining:
+            return remaining / (count - i)
+        remaining -= demand
+    return math.inf
+
+
+class UniformAllocation:
+    """Default strategy : when the grid capacity is exceeded, every non-boosted session gets the
+    same uniform power. Otherwise, each charger splits its capacity evenly between its sessions
+    if they ask for more than it. A rebalancing costs O(1)."""
+
+    def rebalance(self, station):
+        """Update the uniform power of the station from its counters."""
+        if station.max_asked_power > station.grid_capacity and station.non_boosted_sessions_count > 0:
+            station.uniform_power = station.grid_capacity / station.non_boosted_sessions_count
+        else:
+            station.uniform_power = None
+
+    def get_power_level(self, charger):
+        """Return the power level of a charger of the station."""
+        return get_charger_level(charger, charger.station.uniform_power)
+
+    def is_shared(self, station):
+        """Checks if the power of a session depends on the sessions of the other chargers: only when the grid is saturated."""
+        return station.uniform_power is not None
+
+
+class WaterFillingAllocation:
+    """Max-min fair strategy : the power of the sessions is raised together, a session stops at the
+    max power of its vehicle, the sessions of a charger stop when its capacity is reached, and all
+    sessions stop when the grid capacity is reached. The power a vehicle cannot use goes to the others.
+
+    This gives each charger a level t, filling its own capacity, and the station a level L,
+    filling the grid with the sessions capped by their charger level. A session draws min(vehicle max power, t, L).
+    A rebalancing costs O(n log n) in the number of sessions.
+    """
+
+    def __init__(self):
+        self.levels = {}
+
+    def rebalance(self, station):
+        """Compute the level of each charger, then the level of the station."""
+        chargerLevels = {}
+        cappedDemands = []
+        for chargerId, charger in station.chargers.items():
+            if charger.non_boosted_sessions_count == 0:
+                continue
+            demands = [
+                session.max_vehicle_power for session in charger.sessions.values() if not session.is_battery_boosted
+            ]
+            level = get_water_level(demands, charger.max_power_capacity)
+            chargerLevels[chargerId] = level
+            cappedDemands.extend(min(demand, level) for demand in demands)
+        gridLevel = get_water_level(cappedDemands, station.grid_capacity)
+        self.levels = {chargerId: min(level, gridLevel) for chargerId, level in chargerLevels.items()}
+
+    def get_power_level(self, charger):
+        """Return the power level of a charger of the station, computed at the last rebalancing."""
+        return self.levels.get(charger.label_id, charger.max_power_capacity)
+
+    def is_shared(self, station):
+        """Checks if the power of a session depends on the sessions of the other chargers: always, through the grid level."""
+        return True
+
+
+ALLOCATION_STRATEGIES = {"uniform": UniformAllocation, "water_filling": WaterFillingAllocation}
+
+
+def create_allocation_strategy(name):
+    """Return a new allocation strategy from its name in the config: "uniform" (default) or "water_filling"."""
+    if name not in ALLOCATION_STRATEGIES:
+        raise ValueError(f"unknown allocation strategy {name}, expected one of {sorted(ALLOCATION_STRATEGIES)}")
+    return ALLOCATION_STRATEGIES[name]()
@@ -0,0 +1,159 @@
+"""Array-backed variant of the station, keeping its sessions in contiguous NumPy arrays.
+
+NumPy is an optional dependency of the project, installed with "poetry install --extras numpy".
+The ArrayStation exposes the same API as Station, and gives the same powers.
+"""
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError(
+        "The numpy backend needs numpy, install it with: poetry install --extras numpy"
+    ) from e
+
+from .allocation import UniformAllocation
+from .charger import Charger
+from .session import Session
+from .station import Station
+
+
+class ArraySession(Session):
+    """View on the row of a session in the arrays of its station, with the API of Session."""
+
+    __slots__ = ("index",)
+
+    def reset(self, label_id, max_vehicle_power):
+        """Write the new session in the arrays of the station."""
+        self.label_id = label_id
+        self.index = (self.charger.index, label_id - 1)
+        station = self.charger.station
+        station.active[self.index] = True
+        station.max_vehicle_powers[self.index] = max_vehicle_power
+        station.boosted[self.index] = False
+        station.boosted_powers[self.index] = 0
+
+    @property
+    def allocated_power(self):
+        """Power allocated to the session, read from the vectorized allocation of the station."""
+        return float(self.charger.station.get_allocated_powers()[self.index])
+
+    @property
+    def max_vehicle_power(self):
+        return float(self.charger.station.max_vehicle_powers[self.index])
+
+    @max_vehicle_power.setter
+    def max_vehicle_power(self, power):
+        self.charger.station.max_vehicle_powers[self.index] = power
+
+    @property
+    def is_battery_boosted(self):
+        return bool(self.charger.station.boosted[self.index])
+
+    @property
+    def boosted_power(self):
+        return float(self.charger.station.boosted_powers[self.index])
+
+    def flag_as_boosted(self, boostedPower):
+        """Flag the session as boosted."""
+        self.charger.station.boosted[self.index] = True
+        self.charger.station.boosted_powers[self.index] = boostedPower
+
+    def flag_as_non_boosted(self):
+        """Flag the session as drawing its power from the grid again."""
+        self.charger.station.boosted[self.index] = False
+        self.charger.station.boosted_powers[self.index] = 0
+
+
+class ArrayCharger(Charger):
+    """Charger whose sessions are rows of the arrays of its station."""
+
+    __slots__ = ("index",)
+
+    session_class = ArraySession
+
+    def remove_session(self, session_number):
+        """Remove a session from the charger, and free its row in the arrays."""
+        if session_number in self.sessions:
+            index = self.sessions[session_number].index
+            super().remove_session(session_number)
+            self.station.active[index] = False
+            self.station.max_vehicle_powers[index] = 0
+            self.station.boosted[index] = False
+            self.station.boosted_powers[index] = 0
+
+
+class ArrayStation(Station):
+    """Station storing allocated power, vehicle max power, boosted flag and boost amount
+    in arrays indexed by (charger, connector), so the rebalancing is a single vectorized clamp."""
+
+    charger_class = ArrayCharger
+
+    def addChargers(self, chargersConfig):
+        """Add the chargers to the station, and allocate the arrays holding their sessions."""
+        chargers = super().addChargers(chargersConfig)
+        self.allocate_arrays(chargers)
+        return chargers
+
+    def allocate_arrays(self, chargers):
+        """Index the chargers, and allocate empty arrays for their sessions."""
+        for index, charger in enumerate(chargers.values()):
+            charger.index = index
+        shape = (len(chargers), max((c.nb_connectors for c in chargers.values()), default=0))
+        self.max_power_capacities = np.array(
+            [c.max_power_capacity for c in chargers.values()], dtype=float
+        )
+        self.active = np.zeros(shape, dtype=bool)
+        self.max_vehicle_powers = np.zeros(shape)
+        self.boosted = np.zeros(shape, dtype=bool)
+        self.boosted_powers = np.zeros(shape)
+        self.allocated_powers = None
+
+    def rebuild_chargers(self):
+        """Allocate the arrays again for the new chargers, and write the active sessions in them."""
+        sessions = [
+            (session, session.max_vehicle_power, session.is_battery_boosted, session.boosted_power)
+            for charger in self.chargers.values()
+            for session in charger.sessions.values()
+        ]
+        self.allocate_arrays(self.chargers)
+        for session, maxVehiclePower, isBoosted, boostedPower in sessions:
+            session.reset(session.label_id, maxVehiclePower)
+            if isBoosted:
+                session.flag_as_boosted(boostedPower)
+
+    def set_all_non_boosted_sessions_to_uniform_power(self):
+        """Update the uniform power of the station, and drop the cached allocation."""
+        super().set_all_non_boosted_sessions_to_uniform_power()
+        self.allocated_powers = None
+
+    def get_allocated_powers(self):
+        """Return the powers allocated to every (charger, connector), computed for all sessions at once.
+
+        The power level of each charger follows Charger.get_power_level, then it is clamped
+        by the max power of each vehicle. The result is cached until the next rebalancing.
+        The levels of the uniform strategy are vectorized, the ones of other strategies are read from them.
+        """
+        if self.allocated_powers is None:
+            nonBoosted = self.active & ~self.boosted
+            if not isinstance(self.allocation_strategy, UniformAllocation):
+                levels = np.array([charger.get_power_level() for charger in self.chargers.values()], dtype=float)
+                self.allocated_powers = np.where(
+                    nonBoosted, np.minimum(self.max_vehicle_powers, levels[:, None]), 0.0
+                )
+                return self.allocated_powers
+            nbNonBoosted = nonBoosted.sum(axis=1)
+            maxAskedPowers = np.where(self.active, self.max_vehicle_powers, 0).sum(axis=1)
+            chargerLevels = self.max_power_capacities / np.maximum(nbNonBoosted, 1)
+            if self.uniform_power is not None:
+                levels = np.minimum(chargerLevels, self.uniform_power)
+            else:
+                levels = np.where(
+                    maxAskedPowers > self.max_power_capacities, chargerLevels, np.inf
+                )
+            self.allocated_powers = np.where(
+                nonBoosted, np.minimum(self.max_vehicle_powers, levels[:, None]), 0.0
+            )
+        return self.allocated_powers
+
+    def get_total_allocated_power(self):
+        """Return the power drawn from the grid by all the sessions of the station."""
+        return float(self.get_allocated_powers().sum())
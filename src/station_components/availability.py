@@ -0,0 +1,88 @@
+"""Index of the free connectors of a station, to pick where a new vehicle should plug in.
+
+Each charger has a bitset of its free connectors, bit i being connector i + 1. The chargers with a
+free connector are kept in a heap sorted by headroom, the power of the charger not asked yet by its
+sessions. The heap is not updated in place: a charger is pushed again each time it changes, and the
+outdated entries are dropped when they reach the top (lazy deletion).
+"""
+import heapq
+
+
+class AvailabilityIndex:
+    """Free connectors of the chargers of a station, updated by the station after each event."""
+
+    def __init__(self, chargers):
+        # By charger: the bitset of its connectors taken by a session waiting for power.
+        self.reserved = {}
+        self.rebuild(chargers)
+
+    def rebuild(self, chargers):
+        """Index all the chargers again, after a new config or a restore of the station."""
+        self.chargers = chargers
+        self.free_masks = {}
+        self.headrooms = {}
+        self.heap = []
+        self.free_connectors_count = 0
+        for charger in chargers.values():
+            self.update(charger)
+
+    def update(self, charger):
+        """Index the charger again after one of its sessions started, stopped or changed: O(log n)."""
+        chargerId = charger.label_id
+        mask = (1 << charger.nb_connectors) - 1
+        for connectorId in charger.sessions:
+            mask &= ~(1 << (connectorId - 1))
+        mask &= ~self.reserved.get(chargerId, 0)
+        headroom = charger.max_power_capacity - charger.max_asked_power
+        # An entry still matching the charger is already in the heap.
+        isIndexed = self.free_masks.get(chargerId) and self.headrooms[chargerId] == headroom
+        self.free_connectors_count += mask.bit_count() - self.free_masks.get(chargerId, 0).bit_count()
+        self.free_masks[chargerId] = mask
+        self.headrooms[chargerId] = headroom
+        if mask and not isIndexed:
+            heapq.heappush(self.heap, (-headroom, chargerId))
+        if len(self.heap) > 2 * len(self.chargers) + 16:
+            self.compact()
+
+    def reserve(self, chargerId, connectorId):
+        """Take a connector without a session, for a session waiting for power."""
+        self.reserved[chargerId] = self.reserved.get(chargerId, 0) | 1 << (connectorId - 1)
+        self.update(self.chargers[chargerId])
+
+    def release(self, chargerId, connectorId):
+        """Free a connector taken by reserve."""
+        self.reserved[chargerId] = self.reserved.get(chargerId, 0) & ~(1 << (connectorId - 1))
+        if chargerId in self.chargers:
+            self.update(self.chargers[chargerId])
+
+    def compact(self):
+        """Drop the outdated entries of the heap."""
+        self.heap = [(-self.headrooms[chargerId], chargerId) for chargerId, mask in self.free_masks.items() if mask]
+        heapq.heapify(self.heap)
+
+    def is_current(self, entry):
+        """Checks if an entry of the heap still matches its charger."""
+        headroom, chargerId = entry
+        return self.free_masks.get(chargerId) and self.headrooms[chargerId] == -headroom
+
+    def get_free_connector(self, chargerId):
+        """Return the free connector of the charger with the lowest id, or None."""
+        mask = self.free_masks.get(chargerId, 0)
+        return (mask & -mask).bit_length() or None
+
+    def get_free_connectors(self, chargerId):
+        """Return the ids of the free connectors of the charger."""
+        mask = self.free_masks.get(chargerId, 0)
+        return [i + 1 for i in range(mask.bit_length()) if mask >> i & 1]
+
+    def get_best_charger(self):
+        """Return the id of the charger with a free connector and the most headroom, or None."""
+        while self.heap and not self.is_current(self.heap[0]):
+            heapq.heappop(self.heap)
+        return self.heap[0][1] if self.heap else None
+
+    def get_available(self, limit):
+        """Return the ids of the chargers with a free connector, the most headroom first, at most "limit" of them."""
+        # A charger back to an older headroom can have several current entries.
+        entries = set(filter(self.is_current, self.heap))
+        return [chargerId for _, chargerId in heapq.nsmallest(limit, entries)]
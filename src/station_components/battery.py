@@ -1,16 +1,63 @@
+import threading
+import time
+
 from .session_boost import SessionBoost
 from .statuses_models.models import BatteryStatus
 
+# Below this state of charge (in %), the battery keeps its energy and does not boost new sessions.
+MIN_STATE_OF_CHARGE = 20
+
 
 class Battery:
-    """Modelize the battery used to avoid peak shaving."""
+    """Modelize the battery used to avoid peak shaving.
+
+    The battery holds energy in kWh, "initial_capacity" being its capacity. It is charged with the
+    charge power set by the station (limited by max_charge_power, with an efficiency), and discharged
+    by the boosts of the sessions, which share its max_power. The energy is not updated by ticks :
+    it is integrated lazily from the time of the last update each time the battery is changed, and computed
+    without being stored when it is only read, so the readers do not need the lock of the station.
+    """
+
+    __slots__ = (
+        "initial_capacity",
+        "max_power",
+        "max_charge_power",
+        "efficiency",
+        "energy",
+        "charge_power",
+        "discharge_power",
+        "updated_at",
+        "clock",
+        "session_boosts",
+        "update_lock",
+    )
 
-    def __init__(self, initial_capacity, power):
-        """Constructor of the battery, called at init."""
+    def __init__(self, initial_capacity, power, charge_power=None, efficiency=1.0, initial_state_of_charge=0, clock=None):
+        """Constructor of the battery, called at init. The clock returns the time in seconds, time.time by default."""
         self.initial_capacity = initial_capacity
         self.max_power = power
-        self.state_of_charge = 0
+        self.max_charge_power = power if charge_power is None else charge_power
+        self.efficiency = efficiency
+        self.clock = clock or time.time
+        self.energy = initial_capacity * initial_state_of_charge / 100
+        self.charge_power = 0
+        self.discharge_power = 0
+        self.updated_at = self.clock()
         self.session_boosts = {}
+        # Keeps the energy and its time consistent for the readers, which do not hold the lock of the station.
+        self.update_lock = threading.Lock()
+
+    @property
+    def state_of_charge(self):
+        """State of charge of the battery in %, at the current time. Reading it does not change the battery."""
+        if self.initial_capacity <= 0:
+            return 0
+        return self.get_energy() / self.initial_capacity * 100
+
+    @state_of_charge.setter
+    def state_of_charge(self, stateOfCharge):
+        self.update()
+        self.energy = self.initial_capacity * stateOfCharge / 100
 
     def get_status(self):
         """Method used in the GET endpoint to display battery's status."""
@@ -19,29 +66,106 @@ class Battery:
             sessionBoosts.append(self.session_boosts[boost].get_status())
         return BatteryStatus(
             max_power=self.max_power,
-            state_of_charge=self.state_of_charge,
+            state_of_charge=self.get_displayed_state_of_charge(),
             session_boosts=sessionBoosts,
         )
 
+    def get_displayed_state_of_charge(self):
+        """Return the state of charge rounded to 0.1 %, as displayed in the status."""
+        return round(self.state_of_charge, 1)
+
     def get_power(self):
-        "Returns the available power of the battery, if usable."
-        if self.state_of_charge >= 20:
-            return self.max_power
+        "Returns the power the battery can still give to new boosts, if usable."
+        if self.state_of_charge >= MIN_STATE_OF_CHARGE:
+            return max(0, self.max_power - self.discharge_power)
         return 0
 
+    def reconfigure(self, initial_capacity, power, charge_power=None, efficiency=1.0):
+        """Apply a new config to the battery, keeping its energy and its boosts. Return True if it changed."""
+        chargePower = power if charge_power is None else charge_power
+        config = (initial_capacity, power, chargePower, efficiency)
+        if config == (self.initial_capacity, self.max_power, self.max_charge_power, self.efficiency):
+            return False
+        self.update()
+        self.initial_capacity, self.max_power, self.max_charge_power, self.efficiency = config
+        self.energy = min(self.energy, initial_capacity)
+        return True
+
+    def get_energy(self):
+        """Return the energy of the battery at the current time, integrated since the last update
+        without storing it."""
+        with self.update_lock:
+            hours = (self.clock() - self.updated_at) / 3600
+            if hours <= 0:
+                return self.energy
+            return self.integrate(hours, self.charge_power, self.discharge_power)
+
+    def update(self):
+        """Integrate the charge and the discharge of the battery since the last update."""
+        with self.update_lock:
+            now = self.clock()
+            hours = (now - self.updated_at) / 3600
+            if hours > 0:
+                self.advance(hours, self.charge_power, self.discharge_power)
+            self.updated_at = now
+
+    def set_charge_power(self, power):
+        """Set the power available to charge the battery from now on, such as the free power of the grid."""
+        self.update()
+        self.charge_power = max(0, power)
+
     def allocate_boost(self, chargerId, connectorId, powerBoost):
-        """Adds a session boost to the state of the battery. Will be used in display."""
-        sessionKey = str(chargerId) + "_" + str(connectorId)
-        self.session_boosts[sessionKey] = SessionBoost(
-            str(chargerId) + "_" + str(connectorId), powerBoost
+        """Adds a session boost to the battery, discharging it from now on."""
+        self.update()
+        self.session_boosts[(chargerId, connectorId)] = SessionBoost(
+            chargerId, connectorId, powerBoost
         )
-        self.state_of_charge = 0
+        self.discharge_power += powerBoost
 
-    def recharge(self):
-        """Increments the state of charge of the battery."""
-        if self.state_of_charge <= 90:
-            self.state_of_charge += 10
+    def advance(self, hours, charge_power, discharge_power):
+        """Charge and discharge the battery during "hours", the capacity being initial_capacity in kWh."""
+        if self.initial_capacity <= 0:
+            return
+        self.energy = self.integrate(hours, charge_power, discharge_power)
+
+    def integrate(self, hours, charge_power, discharge_power):
+        """Return the energy of the battery after charging and discharging it during "hours"."""
+        chargedEnergy = min(charge_power, self.max_charge_power) * self.efficiency * hours
+        dischargedEnergy = min(discharge_power, self.max_power) * hours
+        return min(self.initial_capacity, max(0, self.energy + chargedEnergy - dischargedEnergy))
 
     def remove_battery_boost(self, chargerId, connectorId):
         """Remove a session boost when the session is closed."""
-        del self.session_boosts[str(chargerId) + "_" + str(connectorId)]
+        self.update()
+        boost = self.session_boosts.pop((chargerId, connectorId))
+        self.discharge_power = max(0, self.discharge_power - boost.power_boost)
+
+    def export_state(self):
+        """Return the state of the battery as plain data, to be shared or persisted."""
+        self.update()
+        return {
+            "energy": self.energy,
+            "charge_power": self.charge_power,
+            "updated_at": self.updated_at,
+            "session_boosts": [
+                [boost.charger_id, boost.connector_id, boost.power_boost]
+                for boost in self.session_boosts.values()
+            ],
+        }
+
+    def restore_state(self, state):
+        """Replace the state of the battery by an exported one.
+        States exported before the energy model, with a "state_of_charge", are accepted too."""
+        with self.update_lock:
+            if "energy" in state:
+                self.energy = state["energy"]
+                self.charge_power = state["charge_power"]
+                self.updated_at = state["updated_at"]
+            else:
+                self.energy = self.initial_capacity * state["state_of_charge"] / 100
+                self.updated_at = self.clock()
+        self.session_boosts = {
+            (chargerId, connectorId): SessionBoost(chargerId, connectorId, powerBoost)
+            for chargerId, connectorId, powerBoost in state["session_boosts"]
+        }
+        self.discharge_power = sum(boost.power_boost for boost in self.session_boosts.values())
@@ -0,0 +1,139 @@
+"""Schedulers deciding which sessions starting above the grid capacity are boosted by the battery.
+
+A scheduler is asked by the station at each start with a deficit, and is told about each start and
+stop so it can learn from them. The scheduler of a station is set by "boostScheduler" in its config.
+"""
+import time
+
+from .battery import MIN_STATE_OF_CHARGE
+
+# Duration of a session assumed until the first sessions are observed, in hours.
+DEFAULT_SESSION_HOURS = 0.5
+
+
+class GreedyBoostScheduler:
+    """Default scheduler: a session is boosted whenever the battery has enough free power for it."""
+
+    def should_boost(self, station, maxVehiclePower, deficit):
+        """Checks if a session starting with this deficit on the grid should be boosted."""
+        return deficit > 0 and bool(station.can_use_total_battery_boost(maxVehiclePower))
+
+    def observe(self, station, event):
+        """Called after each start and stop of a session of the station."""
+
+
+class DemandForecaster:
+    """Online forecast of the deficit of a station (power asked beyond its grid capacity) for each time
+    bucket of the day, and of the duration of its sessions.
+
+    The peak deficit of each bucket is averaged over the days with an EWMA, so an observation costs O(1).
+    """
+
+    def __init__(self, bucket_seconds=900, alpha=0.3):
+        self.bucket_seconds = bucket_seconds
+        self.alpha = alpha
+        self.nb_buckets = max(1, 86400 // bucket_seconds)
+        self.forecasts = [None] * self.nb_buckets
+        self.current_bucket = None
+        self.current_peak = 0
+        self.last_deficit = 0
+        self.session_hours = None
+        self.started_at = {}
+
+    def fold(self, bucket, peak):
+        """Average the peak deficit of a bucket that ended into the forecast of its time of day."""
+        index = bucket % self.nb_buckets
+        forecast = self.forecasts[index]
+        self.forecasts[index] = peak if forecast is None else self.alpha * peak + (1 - self.alpha) * forecast
+
+    def observe_deficit(self, now, deficit):
+        """Record the deficit of the station after a change. The buckets passed without any change
+        had the last deficit all along, at most a day of them is folded."""
+        bucket = int(now // self.bucket_seconds)
+        if self.current_bucket is None:
+            self.current_bucket, self.current_peak = bucket, deficit
+        elif bucket > self.current_bucket:
+            self.fold(self.current_bucket, self.current_peak)
+            for skipped in range(max(self.current_bucket + 1, bucket - self.nb_buckets), bucket):
+                self.fold(skipped, self.last_deficit)
+            self.current_bucket, self.current_peak = bucket, max(self.last_deficit, deficit)
+        else:
+            self.current_peak = max(self.current_peak, deficit)
+        self.last_deficit = deficit
+
+    def observe_start(self, key, now):
+        """Record the start of a session, to learn its duration at its stop."""
+        self.started_at[key] = now
+
+    def observe_stop(self, key, now):
+        """Average the duration of the stopped session into the expected duration of the sessions."""
+        startedAt = self.started_at.pop(key, None)
+        if startedAt is None:
+            return
+        hours = max(0.0, now - startedAt) / 3600
+        self.session_hours = hours if self.session_hours is None else self.alpha * hours + (1 - self.alpha) * self.session_hours
+
+    def get_session_hours(self):
+        """Return the expected duration of a session in hours."""
+        return DEFAULT_SESSION_HOURS if self.session_hours is None else self.session_hours
+
+    def predict_peak(self, now, horizon_seconds):
+        """Return the highest deficit forecast in the buckets starting within the horizon, after the current one."""
+        bucket = int(now // self.bucket_seconds)
+        nbBuckets = min(self.nb_buckets, max(1, int(horizon_seconds // self.bucket_seconds)))
+        return max(self.forecasts[(bucket + i) % self.nb_buckets] or 0 for i in range(1, nbBuckets + 1))
+
+
+class PredictiveBoostScheduler:
+    """Scheduler keeping battery energy for the peaks forecast within its horizon.
+
+    Without a higher peak coming, a session is boosted like with the greedy scheduler. Before a
+    higher peak, a boost is only granted if the usable energy left after it (for the expected
+    duration of a session) still covers the boosts of the peak, so the battery is not drained by
+    the first arrivals and its power is shared by the sessions of the peak.
+    """
+
+    def __init__(self, clock=None, bucket_seconds=900, horizon_seconds=7200, alpha=0.3):
+        self.clock = clock or time.time
+        self.horizon_seconds = horizon_seconds
+        self.forecaster = DemandForecaster(bucket_seconds, alpha)
+
+    def get_reserved_energy(self, station, now, deficit):
+        """Return the battery energy in kWh kept for the peak forecast within the horizon."""
+        peak = self.forecaster.predict_peak(now, self.horizon_seconds)
+        if peak <= deficit:
+            return 0
+        return min(peak, station.battery.max_power) * self.forecaster.get_session_hours()
+
+    def should_boost(self, station, maxVehiclePower, deficit):
+        """Checks if a session starting with this deficit on the grid should be boosted, keeping the reserve."""
+        if deficit <= 0 or not station.can_use_total_battery_boost(maxVehiclePower):
+            return False
+        battery = station.battery
+        usableEnergy = (battery.state_of_charge - MIN_STATE_OF_CHARGE) / 100 * battery.initial_capacity
+        boostEnergy = maxVehiclePower * self.forecaster.get_session_hours()
+        return usableEnergy - boostEnergy >= self.get_reserved_energy(station, self.clock(), deficit)
+
+    def observe(self, station, event):
+        """Learn the deficits of the station and the duration of its sessions from its starts and stops."""
+        if event["type"] not in ("start", "stop", "power"):
+            return
+        now = self.clock()
+        key = (event["chargerId"], event["connectorId"])
+        if event["type"] == "start":
+            self.forecaster.observe_start(key, now)
+        elif event["type"] == "stop":
+            self.forecaster.observe_stop(key, now)
+        self.forecaster.observe_deficit(now, max(0, station.max_asked_power - station.grid_capacity))
+
+
+BOOST_SCHEDULERS = {"greedy": GreedyBoostScheduler, "predictive": PredictiveBoostScheduler}
+
+
+def create_boost_scheduler(name, clock=None):
+    """Return a new boost scheduler from its name in the config: "greedy" (default) or "predictive"."""
+    if name not in BOOST_SCHEDULERS:
+        raise ValueError(f"unknown boost scheduler {name}, expected one of {sorted(BOOST_SCHEDULERS)}")
+    if name == "predictive":
+        return PredictiveBoostScheduler(clock)
+    return GreedyBoostScheduler()
@@ -1,3 +1,4 @@
+from .allocation import get_charger_level
 from .session import Session
 from .statuses_models.models import ChargerStatus, ConnectorStatus
 
@@ -5,8 +6,22 @@ from .statuses_models.models import ChargerStatus, ConnectorStatus
 class Charger:
     """Modelizes the fast charger of Electra."""
 
-    def __init__(self, label_id, max_power_capacity, nb_connectors):
-        """Basic constructor, called at init."""
+    __slots__ = (
+        "label_id",
+        "max_power_capacity",
+        "nb_connectors",
+        "sessions",
+        "max_asked_power",
+        "non_boosted_sessions_count",
+        "boosted_sessions_count",
+        "station",
+        "session_pool",
+    )
+
+    session_class = Session
+
+    def __init__(self, label_id, max_power_capacity, nb_connectors, station=None):
+        """Basic constructor, called at init. The station is None for a standalone charger."""
         self.label_id = label_id
         self.max_power_capacity = max_power_capacity
         self.nb_connectors = nb_connectors
@@ -14,6 +29,8 @@ class Charger:
         self.max_asked_power = 0
         self.non_boosted_sessions_count = 0
         self.boosted_sessions_count = 0
+        self.station = station
+        self.session_pool = []
 
     def get_session(self, connectorId):
         """Return the session with id "connectorId"."""
@@ -31,70 +48,56 @@ class Charger:
             else:
                 self.non_boosted_sessions_count -= 1
             del self.sessions[session_number]
+            self.session_pool.append(session)
 
-    def reallocate_session_optimally_from_charger(self):
-        """Allocates maximum power possible in charger, either with uniformization, 
-        or by allocating the maximum demand for each session.
+    def get_power_level(self):
+        """Return the power each non-boosted session of the charger can draw, before the cap of its vehicle.
+
+        The level is given by the allocation strategy of the station, so sessions read it
+        lazily instead of being updated one by one.
         """
-        if self.non_boosted_sessions_count > 0:
-            if self.max_asked_power > self.max_power_capacity:
-                newUniformPower = (
-                    self.max_power_capacity / self.non_boosted_sessions_count
-                )
-                self.uniformize_powers_on_non_boosted_sessions(newUniformPower)
-            else:
-                self.for_each_non_boosted_session_allocate_max_power()
+        if self.station is None:
+            return get_charger_level(self, None)
+        return self.station.allocation_strategy.get_power_level(self)
+
+    def get_session_powers(self):
+        """Return the power drawn by each session of the charger, by connector. The level is read once,
+        a non-boosted session drawing min(level, its vehicle power) from the grid, and a boosted session
+        the power of its vehicle from the battery, as the battery discharges it."""
+        if not self.sessions:
+            return {}
+        level = self.get_power_level()
+        return {
+            connectorId: session.max_vehicle_power if session.is_battery_boosted else min(session.max_vehicle_power, level)
+            for connectorId, session in self.sessions.items()
+        }
+
+    def new_session(self, connectorId, vehicleMaxPower):
+        """Return a session for a new vehicle, reusing a closed session of the charger if any."""
+        if self.session_pool:
+            session = self.session_pool.pop()
+            session.reset(connectorId, vehicleMaxPower)
+            return session
+        return self.session_class(connectorId, vehicleMaxPower, self)
 
     def start_non_boosted_session(self, connectorId, vehicleMaxPower):
         """Start a usual session of the charger, with no use to the battery of the station."""
         self.max_asked_power += vehicleMaxPower
-        if self.max_asked_power <= self.max_power_capacity:
-            self.sessions[connectorId] = Session(
-                connectorId, vehicleMaxPower, vehicleMaxPower
-            )
-
-        else:
-            currentNbNonBoostedSessions = self.non_boosted_sessions_count
-            currentNbNonBoostedSessions += 1
-            uniformPower = self.max_power_capacity / currentNbNonBoostedSessions
-            self.uniformize_powers_on_non_boosted_sessions(uniformPower)
-
-            self.sessions[connectorId] = Session(
-                connectorId, uniformPower, vehicleMaxPower
-            )
+        self.sessions[connectorId] = self.new_session(connectorId, vehicleMaxPower)
         self.non_boosted_sessions_count += 1
 
     def start_boosted_session(self, connectorId, vehicleMaxPower, boost):
         """Start a session making use of the capacity of the battery."""
-        self.sessions[connectorId] = Session(connectorId, 0, vehicleMaxPower)
+        self.sessions[connectorId] = self.new_session(connectorId, vehicleMaxPower)
         self.set_session_boosted(connectorId, boost)
         self.boosted_sessions_count += 1
         self.max_asked_power += vehicleMaxPower
 
-    def uniformize_powers_on_non_boosted_sessions(self, power):
-        """Apply the same power capacity to all non-boosted sessions."""
-        for session in self.sessions:
-            if not self.sessions[session].is_battery_boosted:
-                self.sessions[session].set_power(power)
-                
-    def for_each_non_boosted_session_allocate_max_power(self):
-        """Reallocates the max power demanded by the vehicle to each non-boosted session."""
-        for session in self.sessions:
-            sessionObject = self.sessions[session]
-            if not self.sessions[session].is_battery_boosted:
-                sessionObject.set_power(sessionObject.get_max_vehicle_power())
-
     def get_status(self):
         """Helper method used to display the status of the charger in the get status endpont."""
         connectors_status = []
         for i in range(1, self.nb_connectors + 1):
-            if i in self.sessions:
-                session_status = self.sessions[i].get_status()
-            else:
-                session_status = None
-            connectors_status.append(
-                ConnectorStatus(connector_id=i, session=session_status)
-            )
+            connectors_status.append(self.get_connector_status(i))
         return ChargerStatus(
             charger_id=self.label_id,
             max_power=self.max_power_capacity,
@@ -102,27 +105,33 @@ class Charger:
             connectors=connectors_status,
         )
 
+    def get_connector_status(self, connectorId):
+        """Return the status of a single connector, with its session if active."""
+        if connectorId in self.sessions:
+            session_status = self.sessions[connectorId].get_status()
+        else:
+            session_status = None
+        return ConnectorStatus(connector_id=connectorId, session=session_status)
+
+    def has_connector(self, connectorId):
+        """Checks if the charger has a connector with id "connectorId"."""
+        return 1 <= connectorId <= self.nb_connectors
+
     def is_session_free(self, connectorId):
         """Checks if a session is already active."""
         return connectorId not in self.sessions
 
-    def set_all_non_boosted_sessions_to(self, power):
-        """Set all non-boosted sessions to "power" or the max possible. """
-        maxLocalPower = 0
-        if self.non_boosted_sessions_count > 0:
-            maxLocalPower = self.max_power_capacity / self.non_boosted_sessions_count
-        else:
-            maxLocalPower = self.max_power_capacity
-        for s in self.sessions:
-            session = self.sessions[s]
-            if not session.is_battery_boosted:
-                session.set_power(min(power, maxLocalPower))
-
     def set_session_boosted(self, connectorId, boost):
         """Flag a session with id "connectorId" as boosted."""
         session = self.sessions[connectorId]
         session.flag_as_boosted(boost)
 
+    def set_session_non_boosted(self, connectorId):
+        """Move a boosted session with id "connectorId" back to the grid."""
+        self.sessions[connectorId].flag_as_non_boosted()
+        self.boosted_sessions_count -= 1
+        self.non_boosted_sessions_count += 1
+
     def get_non_boosted_sessions_count(self):
         """Return the count of non-boosted sessions."""
         return self.non_boosted_sessions_count
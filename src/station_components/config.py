@@ -0,0 +1,68 @@
+"""Validation of the station configs, in a single pass over each config.
+
+The configs are checked once when they are loaded, so the stations can then be built from them
+lazily, without checking them again.
+"""
+from .allocation import ALLOCATION_STRATEGIES
+from .boost_scheduler import BOOST_SCHEDULERS
+
+ADMISSION_POLICIES = ("reject", "queue")
+BATTERY_KEYS = {"initialCapacity": True, "power": True, "chargePower": False, "efficiency": False, "initialStateOfCharge": False}
+
+
+def is_number(value):
+    """Checks if a value of the config is a number, JSON booleans being excluded.
+    The exact types are compared, which is much faster than the numbers ABC on large fleets."""
+    return type(value) is int or type(value) is float
+
+
+def get_config_error(config):
+    """Return the reason why a station config is invalid, or None if it is valid."""
+    if not isinstance(config, dict):
+        return "the config of a station must be an object"
+    stationId = config.get("stationId")
+    if not isinstance(stationId, str):
+        return "the config of a station needs a stationId"
+    if not is_number(config.get("gridCapacity")) or config["gridCapacity"] < 0:
+        return f"station {stationId} needs a positive gridCapacity"
+    if not isinstance(config.get("chargers"), list):
+        return f"station {stationId} needs a list of chargers"
+    chargerIds = set()
+    for charger in config["chargers"]:
+        if not isinstance(charger, dict) or not isinstance(charger.get("id"), str):
+            return f"a charger of station {stationId} has no id"
+        if charger["id"] in chargerIds:
+            return f"charger {charger['id']} is configured twice in station {stationId}"
+        chargerIds.add(charger["id"])
+        if not is_number(charger.get("maxPower")) or charger["maxPower"] < 0:
+            return f"charger {charger['id']} of station {stationId} needs a positive maxPower"
+        if type(charger.get("connectors")) is not int or charger["connectors"] < 1:
+            return f"charger {charger['id']} of station {stationId} needs at least one connector"
+    battery = config.get("battery")
+    if battery is not None:
+        if not isinstance(battery, dict):
+            return f"the battery of station {stationId} must be an object"
+        for key, required in BATTERY_KEYS.items():
+            if (required or key in battery) and (not is_number(battery.get(key)) or battery[key] < 0):
+                return f"the battery of station {stationId} needs a positive {key}"
+    if config.get("allocationStrategy", "uniform") not in ALLOCATION_STRATEGIES:
+        return f"unknown allocation strategy {config['allocationStrategy']}"
+    if config.get("boostScheduler", "greedy") not in BOOST_SCHEDULERS:
+        return f"unknown boost scheduler {config['boostScheduler']}"
+    if "minSessionPower" in config and (not is_number(config["minSessionPower"]) or config["minSessionPower"] < 0):
+        return f"station {stationId} needs a positive minSessionPower"
+    if config.get("admissionPolicy", "reject") not in ADMISSION_POLICIES:
+        return f"unknown admission policy {config['admissionPolicy']}, expected one of {list(ADMISSION_POLICIES)}"
+    return None
+
+
+def validate_station_configs(configs):
+    """Check every station config and the uniqueness of their ids, raise a ValueError on the first error."""
+    stationIds = set()
+    for config in configs:
+        error = get_config_error(config)
+        if error:
+            raise ValueError(error)
+        if config["stationId"] in stationIds:
+            raise ValueError(f"station {config['stationId']} is configured twice")
+        stationIds.add(config["stationId"])
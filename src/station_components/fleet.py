@@ -0,0 +1,207 @@
+"""Module containing the fleet registry, used to serve many stations from a single process."""
+import gc
+import json
+import os
+import pickle
+import threading
+
+from .config import get_config_error, validate_station_configs
+from .station import Station
+
+
+def get_station_class(backend="python"):
+    """Return the station class of a backend: "python" (default) or "numpy" (array-backed, needs numpy)."""
+    if backend == "numpy":
+        from .array_station import ArrayStation
+
+        return ArrayStation
+    if backend != "python":
+        raise ValueError(f"unknown station backend {backend}")
+    return Station
+
+
+def get_config_key(path):
+    """Return what the configs read from a path depend on: the size and the modification time of its files."""
+    if os.path.isdir(path):
+        fileNames = sorted(fileName for fileName in os.listdir(path) if fileName.endswith(".json"))
+        return [(fileName, *get_config_key(os.path.join(path, fileName))) for fileName in fileNames]
+    stat = os.stat(path)
+    return [(stat.st_size, stat.st_mtime_ns)]
+
+
+def read_station_configs(path):
+    """Read the station configs from a JSON file, or from a folder of JSON files."""
+    if os.path.isdir(path):
+        configs = []
+        for fileName in sorted(os.listdir(path)):
+            if fileName.endswith(".json"):
+                configs.extend(read_station_configs(os.path.join(path, fileName)))
+        return configs
+
+    with open(path, "r") as f:
+        content = json.load(f)
+    if isinstance(content, dict) and "stations" in content:
+        return list(content["stations"])
+    if isinstance(content, dict):
+        return [content]
+    return list(content)
+
+
+def load_station_configs(path, cache_path=None):
+    """Read the station configs from a JSON file, or from a folder of JSON files, and validate them.
+
+    A file can contain a single station config, a list of configs or a dict
+    with a "stations" key holding that list. With a cache_path, the validated configs
+    are kept in a binary cache, read instead of the JSON as long as the files are unchanged,
+    so a restart neither parses nor validates them again.
+    The garbage collector is paused meanwhile: the configs hold no cycle, and the collections
+    triggered by their many dicts would double the loading time of a large fleet.
+    """
+    gcEnabled = gc.isenabled()
+    gc.disable()
+    try:
+        if cache_path is None:
+            configs = read_station_configs(path)
+            validate_station_configs(configs)
+            return configs
+        return load_cached_station_configs(path, cache_path)
+    finally:
+        if gcEnabled:
+            gc.enable()
+
+
+def load_cached_station_configs(path, cache_path):
+    """Read the validated configs from the cache if it matches the config files, else from the JSON and write the cache."""
+    key = get_config_key(path)
+    try:
+        with open(cache_path, "rb") as f:
+            cache = pickle.load(f)
+        if cache["path"] == os.path.abspath(path) and cache["key"] == key:
+            return cache["configs"]
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, KeyError, TypeError):
+        pass
+    configs = read_station_configs(path)
+    validate_station_configs(configs)
+    with open(cache_path + ".tmp", "wb") as f:
+        pickle.dump({"path": os.path.abspath(path), "key": key, "configs": configs}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(cache_path + ".tmp", cache_path)
+    return configs
+
+
+class Fleet:
+    """Registry of the stations served by the app, indexed by their stationId.
+
+    Stations are kept in a dict keyed by stationId, so routing a call to its
+    station costs the same whether the fleet holds 10 or 10,000 stations.
+    The configs are validated up front, but a station is only built the first time it is
+    used: "stations" holds the stations built so far, "configs" every station of the fleet.
+    """
+
+    def __init__(self, configs, station_class=Station, validated=False):
+        """Validate the configs of the fleet in a single pass, unless they are already "validated"
+        by load_station_configs. The stations are built on first use."""
+        configs = list(configs)
+        if not validated:
+            validate_station_configs(configs)
+        self.station_class = station_class
+        self.stations = {}
+        self.configs = {config["stationId"]: config for config in configs}
+        self.default_station_id = next(iter(self.configs), None)
+        self.station_hooks = []
+        self.lock = threading.Lock()
+
+    def on_station(self, hook):
+        """Call the hook with each station of the fleet: now for the stations already built,
+        and the others as soon as they are built."""
+        self.station_hooks.append(hook)
+        for station in list(self.stations.values()):
+            hook(station)
+
+    def add_station(self, config):
+        """Build a station from its config and register it in the fleet."""
+        error = get_config_error(config)
+        if error:
+            raise ValueError(error)
+        return self.register_station(self.station_class(config), config)
+
+    def register_station(self, station, config):
+        """Register a station built from its config in the fleet."""
+        if station.name in self.configs:
+            raise ValueError(f"station {station.name} is already registered in the fleet")
+        self.configs[station.name] = config
+        self.publish_station(station)
+        if self.default_station_id is None:
+            self.default_station_id = station.name
+        return station
+
+    def publish_station(self, station):
+        """Make a built station visible in the fleet, then pass it to the hooks."""
+        self.stations[station.name] = station
+        for hook in self.station_hooks:
+            hook(station)
+
+    def remove_station(self, stationId):
+        """Unregister a station from the fleet."""
+        self.stations.pop(stationId, None)
+        del self.configs[stationId]
+        if stationId == self.default_station_id:
+            self.default_station_id = next(iter(self.configs), None)
+
+    def reload(self, configs):
+        """Apply new configs to the live fleet, keeping the active sessions.
+
+        Only the stations whose config changed are updated in place, new stations are added and
+        the stations missing from the configs are removed. Every config is checked before any change
+        is applied, a station with active sessions cannot be removed. Return the ids of the
+        "added", "removed" and "updated" stations. The stations not built yet only get their new config.
+        """
+        configs = list(configs)
+        validate_station_configs(configs)
+        newConfigs = {config["stationId"]: config for config in configs}
+        for stationId, station in self.stations.items():
+            if stationId not in newConfigs:
+                if station.has_active_sessions():
+                    raise ValueError(f"station {stationId} has active sessions and cannot be removed")
+            elif newConfigs[stationId] != self.configs[stationId]:
+                error = station.check_config(newConfigs[stationId])
+                if error:
+                    raise ValueError(error)
+
+        summary = {"added": [], "removed": [], "updated": []}
+        with self.lock:
+            for stationId in [stationId for stationId in self.configs if stationId not in newConfigs]:
+                self.remove_station(stationId)
+                summary["removed"].append(stationId)
+            for stationId, config in newConfigs.items():
+                if stationId not in self.configs:
+                    self.configs[stationId] = config
+                    summary["added"].append(stationId)
+                elif config != self.configs[stationId]:
+                    if stationId in self.stations:
+                        self.stations[stationId].apply_config(config)
+                    self.configs[stationId] = config
+                    summary["updated"].append(stationId)
+            if self.default_station_id is None:
+                self.default_station_id = next(iter(self.configs), None)
+        return summary
+
+    def get_station(self, stationId=None):
+        """Return the station with a specific Id, or the default one if no Id is given.
+        The station is built the first time it is asked for."""
+        if stationId is None:
+            stationId = self.default_station_id
+        station = self.stations.get(stationId)
+        if station is None and stationId in self.configs:
+            with self.lock:
+                station = self.stations.get(stationId)
+                if station is None and stationId in self.configs:
+                    station = self.station_class(self.configs[stationId])
+                    self.publish_station(station)
+        return station
+
+    def get_station_ids(self):
+        """Return the ids of all the stations of the fleet."""
+        return list(self.configs)
+
+    def __len__(self):
+        return len(self.configs)
@@ -4,20 +4,29 @@ from .statuses_models.models import SessionStatus
 class Session:
     """Component modelizing the active connections 
     between a charger and a vehicle."""
-    def __init__(self, label_id, power, max_vehicle_power):
+
+    __slots__ = ("label_id", "max_vehicle_power", "charger", "is_battery_boosted", "boosted_power")
+
+    def __init__(self, label_id, max_vehicle_power, charger=None):
         """Basic constructor."""
+        self.charger = charger
+        self.reset(label_id, max_vehicle_power)
+
+    def reset(self, label_id, max_vehicle_power):
+        """Reinitialize the session for a new vehicle, so the object can be reused by its charger."""
         self.label_id = label_id
-        self.allocated_power = power
         self.max_vehicle_power = max_vehicle_power
         self.is_battery_boosted = False
         self.boosted_power = 0
 
-    def set_power(self, power):
-        """Set the power allocated to a session."""
-        if power > self.max_vehicle_power:
-            self.allocated_power = self.max_vehicle_power
-        else:
-            self.allocated_power = power
+    @property
+    def allocated_power(self):
+        """Power allocated to the session, read lazily from the power level of its charger."""
+        if self.is_battery_boosted:
+            return 0
+        if self.charger is None:
+            return self.max_vehicle_power
+        return min(self.max_vehicle_power, self.charger.get_power_level())
 
     def get_power(self):
         """Return the power allocated to a session."""
@@ -41,5 +50,9 @@ class Session:
     def flag_as_boosted(self, boostedPower):
         """Flag the session as boosted."""
         self.is_battery_boosted = True
-        self.allocated_power = 0
         self.boosted_power = boostedPower
+
+    def flag_as_non_boosted(self):
+        """Flag the session as drawing its power from the grid again."""
+        self.is_battery_boosted = False
+        self.boosted_power = 0
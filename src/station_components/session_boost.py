@@ -3,9 +3,18 @@ from .statuses_models.models import SessionBoostStatus
 
 class SessionBoost:
     """Helper class to modelize the boost allocated from BESS to a session."""
-    def __init__(self, session_id, power_boost):
+
+    __slots__ = ("charger_id", "connector_id", "power_boost")
+
+    def __init__(self, charger_id, connector_id, power_boost):
+        self.charger_id = charger_id
+        self.connector_id = connector_id
         self.power_boost = power_boost
-        self.session_id = session_id
+
+    @property
+    def session_id(self):
+        """Id of the boosted session, "chargerId_connectorId", only built for display."""
+        return f"{self.charger_id}_{self.connector_id}"
 
     def get_status(self):
         """Method called to display the status of the boost, in GET endpoint."""
@@ -1,4 +1,20 @@
+import threading
+
+from ..services.metrics import (
+    BOOSTS_DENIED,
+    BOOSTS_GRANTED,
+    BOOSTS_RESERVED,
+    REBALANCES,
+    SESSIONS_CAPPED,
+    SESSIONS_QUEUED,
+    SESSIONS_REJECTED,
+    timed,
+)
+from .allocation import create_allocation_strategy
+from .availability import AvailabilityIndex
 from .battery import Battery
+from .boost_scheduler import create_boost_scheduler
+from .config import get_config_error
 from .charger import Charger
 from .statuses_models.models import StationStatus
 
@@ -6,20 +22,49 @@ from .statuses_models.models import StationStatus
 class Station:
     """Class to modelizes an Electra station."""
 
-    def __init__(self, config):
-        """Basic constructor."""
+    charger_class = Charger
+
+    def __init__(self, config, clock=None):
+        """Basic constructor. The clock of the battery is time.time by default."""
         self.name = config["stationId"]
+        self.clock = clock
         if "battery" in config:
             self.battery = self.addBattery(config["battery"])
         else:
             self.battery = None
         self.chargers = self.addChargers(config["chargers"])
+        self.availability = AvailabilityIndex(self.chargers)
         self.grid_capacity = config["gridCapacity"]
         self.max_asked_power = 0
+        self.non_boosted_sessions_count = 0
+        self.uniform_power = None
+        self.allocation_strategy = create_allocation_strategy(config.get("allocationStrategy", "uniform"))
+        self.boost_scheduler = create_boost_scheduler(config.get("boostScheduler", "greedy"), clock)
+        # Admission control: power guaranteed to each non-boosted session (0 to disable it), and what
+        # happens to a start that would break it, "reject" or "queue" until enough power is freed.
+        self.min_session_power = config.get("minSessionPower", 0)
+        self.admission_policy = config.get("admissionPolicy", "reject")
+        # Starts waiting for power, in arrival order: (chargerId, connectorId) -> power of the vehicle.
+        self.waiting_sessions = {}
+        self.version = 0
+        self.rebalance_deferred = False
+        # Boosted sessions moved back to the grid since the last event, as (chargerId, connectorId).
+        self.released_boosts = []
+        self.lock = threading.RLock()
+        self.listeners = []
+        self.recharge_battery_if_possible()
 
     def addBattery(self, battery_config):
-        """Add a BESS battery to the status at initialization."""
-        return Battery(battery_config["initialCapacity"], battery_config["power"])
+        """Add a BESS battery to the status at initialization. "initialCapacity" is its capacity in kWh,
+        "power" its max discharge power, and "chargePower", "efficiency" and "initialStateOfCharge" are optional."""
+        return Battery(
+            battery_config["initialCapacity"],
+            battery_config["power"],
+            charge_power=battery_config.get("chargePower"),
+            efficiency=battery_config.get("efficiency", 1.0),
+            initial_state_of_charge=battery_config.get("initialStateOfCharge", 0),
+            clock=self.clock,
+        )
 
     def addChargers(self, chargersConfig):
         """Add the chargers configurations to the station, at initialization."""
@@ -28,10 +73,105 @@ class Station:
             chargerId = config["id"]
             capacity = config["maxPower"]
             nbConnectors = config["connectors"]
-            chargers[chargerId] = Charger(chargerId, capacity, nbConnectors)
+            chargers[chargerId] = self.charger_class(chargerId, capacity, nbConnectors, self)
 
         return chargers
 
+    def check_config(self, config):
+        """Return the reason why a new config cannot be applied to the live station, or None if it can.
+        Chargers, connectors and the battery can only be removed if no session uses them."""
+        error = get_config_error(config)
+        if error:
+            return error
+        if config["stationId"] != self.name:
+            return f"the config of station {config['stationId']} cannot be applied to station {self.name}"
+        newChargers = {chargerConfig["id"]: chargerConfig for chargerConfig in config["chargers"]}
+        for chargerId, charger in self.chargers.items():
+            if not charger.sessions:
+                continue
+            if chargerId not in newChargers:
+                return f"charger {chargerId} has active sessions and cannot be removed"
+            if max(charger.sessions) > newChargers[chargerId]["connectors"]:
+                return f"connector {max(charger.sessions)} of charger {chargerId} has an active session and cannot be removed"
+        if self.battery and self.battery.session_boosts and "battery" not in config:
+            return "the battery boosts active sessions and cannot be removed"
+        return None
+
+    def apply_config(self, config):
+        """Apply a new config to the live station, keeping its active sessions: add or remove chargers,
+        change their capacity and connectors, the grid capacity, the allocation strategy and the battery.
+
+        The station is rebalanced once, after all the changes. Return the list of the changes.
+        """
+        with self.lock:
+            error = self.check_config(config)
+            if error:
+                raise ValueError(error)
+            strategy = create_allocation_strategy(config.get("allocationStrategy", "uniform"))
+            changes = []
+            chargers = {}
+            for chargerConfig in config["chargers"]:
+                chargerId = chargerConfig["id"]
+                charger = self.chargers.get(chargerId)
+                if charger is None:
+                    charger = self.charger_class(chargerId, chargerConfig["maxPower"], chargerConfig["connectors"], self)
+                    changes.append(f"added charger {chargerId}")
+                elif (charger.max_power_capacity, charger.nb_connectors) != (chargerConfig["maxPower"], chargerConfig["connectors"]):
+                    charger.max_power_capacity = chargerConfig["maxPower"]
+                    charger.nb_connectors = chargerConfig["connectors"]
+                    changes.append(f"updated charger {chargerId}")
+                chargers[chargerId] = charger
+            changes.extend(f"removed charger {chargerId}" for chargerId in self.chargers if chargerId not in chargers)
+            if list(chargers) != list(self.chargers) or changes:
+                self.chargers = chargers
+                self.rebuild_chargers()
+                self.availability.rebuild(chargers)
+
+            if config["gridCapacity"] != self.grid_capacity:
+                self.grid_capacity = config["gridCapacity"]
+                changes.append("updated grid capacity")
+            if type(strategy) is not type(self.allocation_strategy):
+                self.allocation_strategy = strategy
+                changes.append("updated allocation strategy")
+            scheduler = create_boost_scheduler(config.get("boostScheduler", "greedy"), self.clock)
+            if type(scheduler) is not type(self.boost_scheduler):
+                self.boost_scheduler = scheduler
+                changes.append("updated boost scheduler")
+            admission = (config.get("minSessionPower", 0), config.get("admissionPolicy", "reject"))
+            if admission != (self.min_session_power, self.admission_policy):
+                self.min_session_power, self.admission_policy = admission
+                changes.append("updated admission control")
+
+            batteryConfig = config.get("battery")
+            if batteryConfig is None and self.battery is not None:
+                self.battery = None
+                changes.append("removed battery")
+            elif batteryConfig is not None and self.battery is None:
+                self.battery = self.addBattery(batteryConfig)
+                changes.append("added battery")
+            elif batteryConfig is not None and self.battery.reconfigure(
+                batteryConfig["initialCapacity"],
+                batteryConfig["power"],
+                batteryConfig.get("chargePower"),
+                batteryConfig.get("efficiency", 1.0),
+            ):
+                changes.append("updated battery")
+
+            if changes:
+                self.set_all_non_boosted_sessions_to_uniform_power()
+                self.recharge_battery_if_possible()
+                self.version += 1
+                self.notify({"type": "config", "changes": changes})
+                self.admit_waiting_sessions()
+            return changes
+
+    def rebuild_chargers(self):
+        """Called after the chargers of the station changed with a new config."""
+
+    def has_active_sessions(self):
+        """Checks if a session is active on any charger of the station."""
+        return any(charger.sessions for charger in self.chargers.values())
+
     def get_charger(self, chargerId):
         """Return the charger with a specific Id."""
         if chargerId in self.chargers:
@@ -55,71 +195,405 @@ class Station:
             battery=self.battery.get_status() if self.battery else None,
         )
 
-    def start_session_on_charger(self, chargerId, connectorId, maxVehiclePower):
-        """Start a session on the charger, from HTTP call."""
+    @timed("start_session")
+    def start_session_on_charger(self, chargerId, connectorId, maxVehiclePower, boost=None):
+        """Start a session on the charger, from HTTP call. "boost" is a boost decision taken before, as
+        the deficit boosted or 0, which the journal replays instead of asking the boost scheduler again."""
         self.max_asked_power += maxVehiclePower
         charger = self.get_charger(chargerId)
-        if self.max_asked_power <= self.grid_capacity:
+        deficit = self.max_asked_power - self.grid_capacity
+        if boost is None:
+            isBoosted = self.boost_scheduler.should_boost(self, maxVehiclePower, deficit)
+        else:
+            isBoosted = boost > 0 and self.battery is not None
+            deficit = boost if isBoosted else deficit
+        if isBoosted:
+            charger.start_boosted_session(connectorId, maxVehiclePower, deficit)
+            self.battery.allocate_boost(chargerId, connectorId, maxVehiclePower)
+            BOOSTS_GRANTED.inc()
+        else:
             charger.start_non_boosted_session(connectorId, maxVehiclePower)
-        if self.max_asked_power > self.grid_capacity:
-            deficit = self.max_asked_power - self.grid_capacity
-            if self.can_use_total_battery_boost(deficit):
-                charger.start_boosted_session(connectorId, maxVehiclePower, deficit)
-                self.battery.allocate_boost(chargerId, connectorId, maxVehiclePower)
-            else:
-                charger.start_non_boosted_session(connectorId, maxVehiclePower)
-                self.set_all_non_boosted_sessions_to_uniform_power()
+            self.non_boosted_sessions_count += 1
+            if deficit > 0 and self.can_use_total_battery_boost(maxVehiclePower):
+                BOOSTS_RESERVED.inc()
+            elif deficit > 0 and self.battery:
+                BOOSTS_DENIED.inc()
 
+        self.set_all_non_boosted_sessions_to_uniform_power()
+        if not self.rebalance_deferred:
+            self.count_if_capped(charger.get_session(connectorId))
         self.recharge_battery_if_possible()
+        self.availability.update(charger)
+        self.version += 1
+        self.notify(
+            {
+                "type": "start",
+                "chargerId": chargerId,
+                "connectorId": connectorId,
+                "power": maxVehiclePower,
+                "boosted": bool(isBoosted),
+                "boost": deficit if isBoosted else 0,
+            }
+        )
 
+    @timed("stop_session")
     def stop_session_on_charger(self, chargerId, connectorId):
         """Stop a session on a charger, from HTTP Call."""
         charger = self.get_charger(chargerId)
         session = charger.get_session(connectorId)
         if session.is_battery_boosted:
             self.battery.remove_battery_boost(chargerId, connectorId)
+        else:
+            self.non_boosted_sessions_count -= 1
         self.max_asked_power -= session.max_vehicle_power
         charger.remove_session(connectorId)
-        if self.max_asked_power > self.grid_capacity:
-            self.set_all_non_boosted_sessions_to_uniform_power()
-        else:
-            [
-                self.chargers[c].reallocate_session_optimally_from_charger()
-                for c in self.chargers
-            ]
+
+        self.set_all_non_boosted_sessions_to_uniform_power()
+        self.recharge_battery_if_possible()
+        self.availability.update(charger)
+        self.version += 1
+        self.notify({"type": "stop", "chargerId": chargerId, "connectorId": connectorId})
+        self.admit_waiting_sessions()
+
+    def change_vehicle_power(self, chargerId, connectorId, maxVehiclePower):
+        """Change the max power demanded by the vehicle of an active session, following its charging curve."""
+        charger = self.get_charger(chargerId)
+        session = charger.get_session(connectorId)
+        delta = maxVehiclePower - session.max_vehicle_power
+        session.max_vehicle_power = maxVehiclePower
+        charger.max_asked_power += delta
+        self.max_asked_power += delta
+        if session.is_battery_boosted:
+            self.battery.remove_battery_boost(chargerId, connectorId)
+            self.battery.allocate_boost(chargerId, connectorId, maxVehiclePower)
+
+        self.set_all_non_boosted_sessions_to_uniform_power()
         self.recharge_battery_if_possible()
+        self.availability.update(charger)
+        self.version += 1
+        self.notify(
+            {"type": "power", "chargerId": chargerId, "connectorId": connectorId, "power": maxVehiclePower}
+        )
+        if delta < 0:
+            self.admit_waiting_sessions()
+
+    def count_if_capped(self, session):
+        """Count a new session in the metrics if it gets less power than its vehicle asks for."""
+        if not session.is_battery_boosted and session.get_power() < session.max_vehicle_power:
+            SESSIONS_CAPPED.inc()
+
+    def add_listener(self, listener):
+        """Register a callback, called with the station and the event after each session start or stop."""
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Unregister a callback registered by add_listener."""
+        self.listeners.remove(listener)
+
+    def notify(self, event):
+        """Send an event to the listeners of the station, synchronously from the mutation.
+        The boost scheduler learns from the event first. The boosted sessions moved back to
+        the grid by the event are given in its "released_boosts"."""
+        if self.released_boosts:
+            event = {**event, "released_boosts": self.released_boosts}
+            self.released_boosts = []
+        self.boost_scheduler.observe(self, event)
+        for listener in self.listeners:
+            listener(self, event)
+
+    def find_available_connector(self, chargerId=None):
+        """Return the (chargerId, connectorId) where a new vehicle should plug in: the free connector
+        of the charger with the most headroom, or of the given charger. Return None if there is none."""
+        if chargerId is None:
+            chargerId = self.availability.get_best_charger()
+        connectorId = self.availability.get_free_connector(chargerId)
+        return (chargerId, connectorId) if connectorId else None
+
+    def get_available_connectors(self, limit=10):
+        """Return the chargers with a free connector, the most headroom first, with their free connectors."""
+        return [
+            {
+                "chargerId": chargerId,
+                "headroom": self.availability.headrooms[chargerId],
+                "connectors": self.availability.get_free_connectors(chargerId),
+            }
+            for chargerId in self.availability.get_available(limit)
+        ]
 
+    def check_operation(self, action, chargerId, connectorId):
+        """Return the reason why a start or stop operation cannot be applied, or None if it can."""
+        charger = self.get_charger(chargerId)
+        if not charger:
+            return f"there is no charger with id {chargerId} in the station"
+        if not charger.has_connector(connectorId):
+            return f"there is no connector {connectorId} on charger {chargerId}"
+        isWaiting = (chargerId, connectorId) in self.waiting_sessions
+        if action == "start" and isWaiting:
+            return f"Session {connectorId} on charger {chargerId} is already waiting for power"
+        if action == "start" and not charger.is_session_free(connectorId):
+            return f"Session {connectorId} on charger {chargerId} is already active with another vehicle !! "
+        if action in ("stop", "power") and charger.is_session_free(connectorId) and not (action == "stop" and isWaiting):
+            return f"Cannot stop session {connectorId} as it is already inactive"
+        return None
+
+    def check_admission(self, chargerId, maxVehiclePower):
+        """Return the reason why a new session would leave a non-boosted session under minSessionPower,
+        or None if it can be admitted. A session boosted by the battery takes nothing from the grid."""
+        if self.min_session_power <= 0:
+            return None
+        deficit = self.max_asked_power + maxVehiclePower - self.grid_capacity
+        if self.boost_scheduler.should_boost(self, maxVehiclePower, deficit):
+            return None
+        count = self.non_boosted_sessions_count + 1
+        if deficit > 0 and self.grid_capacity / count < self.min_session_power:
+            return f"the grid capacity of station {self.name} cannot guarantee {self.min_session_power} kW to {count} sessions"
+        charger = self.get_charger(chargerId)
+        count = charger.non_boosted_sessions_count + 1
+        if (
+            charger.max_asked_power + maxVehiclePower > charger.max_power_capacity
+            and charger.max_power_capacity / count < self.min_session_power
+        ):
+            return f"charger {chargerId} cannot guarantee {self.min_session_power} kW to {count} sessions"
+        return None
+
+    def queue_session(self, chargerId, connectorId, maxVehiclePower):
+        """Keep a start waiting until it can be admitted. Its connector is taken meanwhile."""
+        self.waiting_sessions[(chargerId, connectorId)] = maxVehiclePower
+        self.availability.reserve(chargerId, connectorId)
+        self.version += 1
+        SESSIONS_QUEUED.inc()
+        self.notify({"type": "queued", "chargerId": chargerId, "connectorId": connectorId, "power": maxVehiclePower})
+
+    def cancel_waiting_session(self, chargerId, connectorId):
+        """Drop a start waiting for power, when its vehicle leaves."""
+        del self.waiting_sessions[(chargerId, connectorId)]
+        self.availability.release(chargerId, connectorId)
+        self.version += 1
+        self.notify({"type": "cancelled", "chargerId": chargerId, "connectorId": connectorId})
+
+    def admit_waiting_sessions(self):
+        """Start the waiting sessions that can now be admitted, in their arrival order. The first one
+        that cannot be admitted stops the others, so a large vehicle is not starved by smaller ones."""
+        while self.waiting_sessions:
+            (chargerId, connectorId), maxVehiclePower = next(iter(self.waiting_sessions.items()))
+            charger = self.get_charger(chargerId)
+            if charger is None or not charger.has_connector(connectorId):
+                self.cancel_waiting_session(chargerId, connectorId)
+                continue
+            if self.check_admission(chargerId, maxVehiclePower):
+                return
+            del self.waiting_sessions[(chargerId, connectorId)]
+            self.availability.release(chargerId, connectorId)
+            self.start_session_on_charger(chargerId, connectorId, maxVehiclePower)
+
+    def apply_operations(self, operations):
+        """Apply a batch of operations, each one a dict with "action" ("start" or "stop"), 
+        "chargerId", "connectorId" and "powerCapacity" to start. A start without connectorId is
+        auto-assigned to a free connector of the charger, or of the best charger without chargerId.
+        A start breaking the minSessionPower of the station is rejected or queued, as told by "admission"
+        in its result, and a stop of a queued start cancels it.
+
+        The rebalancing is done once at the end of the batch. Return a result for each operation.
+        The lock of the station is held during the whole batch, so the check and the application
+        of an operation cannot be interleaved with another writer.
+        """
+        with self.lock:
+            results = []
+            self.rebalance_deferred = True
+            try:
+                for operation in operations:
+                    action = operation["action"]
+                    chargerId = operation.get("chargerId")
+                    connectorId = operation.get("connectorId")
+                    if action == "start" and connectorId is None:
+                        chargerId, connectorId = self.find_available_connector(chargerId) or (chargerId, None)
+                    if connectorId is None:
+                        error = "there is no free connector" + (f" on charger {chargerId}" if chargerId else " in the station")
+                    else:
+                        error = self.check_operation(action, chargerId, connectorId)
+                    admission = None
+                    if error is None and action == "start":
+                        admissionError = self.check_admission(chargerId, operation["powerCapacity"])
+                        if admissionError and self.admission_policy == "reject":
+                            error, admission = admissionError, "rejected"
+                            SESSIONS_REJECTED.inc()
+                        elif admissionError or self.waiting_sessions:
+                            # The sessions already waiting are admitted first.
+                            self.queue_session(chargerId, connectorId, operation["powerCapacity"])
+                            admission = "queued"
+                            reason = admissionError or "other sessions are waiting"
+                            message = f"Session queued on charger {chargerId} and connector {connectorId}: {reason}"
+                        else:
+                            self.start_session_on_charger(chargerId, connectorId, operation["powerCapacity"])
+                            message = f"Session started on charger {chargerId} and connector {connectorId}"
+                    elif error is None and (chargerId, connectorId) in self.waiting_sessions:
+                        self.cancel_waiting_session(chargerId, connectorId)
+                        message = f"Session {connectorId} waiting on charger {chargerId} has been cancelled"
+                    elif error is None:
+                        self.stop_session_on_charger(chargerId, connectorId)
+                        message = f"Session {connectorId} has been removed on charger {chargerId}"
+                    results.append(
+                        {
+                            "action": action,
+                            "chargerId": chargerId,
+                            "connectorId": connectorId,
+                            "success": error is None,
+                            "message": error or message,
+                            "admission": admission,
+                        }
+                    )
+            finally:
+                self.rebalance_deferred = False
+                self.set_all_non_boosted_sessions_to_uniform_power()
+
+            for result in results:
+                charger = self.get_charger(result["chargerId"])
+                session = (
+                    charger.get_session(result["connectorId"])
+                    if charger and not charger.is_session_free(result["connectorId"])
+                    else None
+                )
+                result["allocated_power"] = session.get_power() if session else None
+                if session and result["action"] == "start" and result["success"]:
+                    self.count_if_capped(session)
+            return results
+
+    @timed("uniformization")
     def set_all_non_boosted_sessions_to_uniform_power(self):
-        """When the grid capacity is reached, the station applies, if possible, the 
-        same uniform power to all non-boosted sessions."""
-        activeSessions = self.get_number_non_boosted_sessions()
-        
-        uniform_power = self.grid_capacity / activeSessions
-        for c in self.chargers:
-            charger = self.chargers[c]
-            charger.set_all_non_boosted_sessions_to(uniform_power)
+        """When the grid capacity is reached, the station applies the same uniform power 
+        to all non-boosted sessions. Otherwise, each charger allocates its own capacity.
+
+        The rebalancing is delegated to the allocation strategy of the station (uniform by default,
+        which only updates the shared uniform power), and the sessions read their power lazily through
+        their charger. It is skipped while a batch of operations is applied, and done once at its end.
+        """
+        if self.rebalance_deferred:
+            return
+        REBALANCES.inc()
+        self.allocation_strategy.rebalance(self)
+
+    def is_power_shared(self):
+        """Checks if the power of a session depends on the sessions of the other chargers."""
+        return self.allocation_strategy.is_shared(self)
+
+    def get_event_charger_ids(self, event):
+        """Return the ids of the chargers operated by an event: the charger of a session event and the
+        chargers of the boosts it released, or None for the other events, which may change any charger."""
+        if event["type"] not in ("start", "stop", "power"):
+            return None
+        return [event["chargerId"], *(chargerId for chargerId, _ in event.get("released_boosts", ()))]
+
+    def get_affected_charger_ids(self, chargerIds, wasShared):
+        """Return the ids of the chargers whose sessions may have changed of power after operations on
+        "chargerIds": only them, unless the power is shared between the chargers before (wasShared) or
+        after the operations. Return None for all the chargers."""
+        if chargerIds is None or wasShared or self.is_power_shared():
+            return None
+        return list(dict.fromkeys(chargerIds))
+
+    def get_allocations(self, chargerIds=None):
+        """Return the power allocated to each active session of the given chargers, or of all of them."""
+        chargers = self.chargers.values() if chargerIds is None else (self.chargers[c] for c in chargerIds if c in self.chargers)
+        return [
+            {
+                "chargerId": charger.label_id,
+                "connectorId": session.label_id,
+                "allocated_power": session.get_power(),
+                "vehicle_max_power": session.max_vehicle_power,
+                "is_boosted": session.is_battery_boosted,
+                "boosted_power": session.boosted_power,
+            }
+            for charger in chargers
+            for session in charger.sessions.values()
+        ]
 
     def get_number_non_boosted_sessions(self):
         """Return the number of non-boosted sessions across all-chargers."""
-        return sum(
-            [
-                self.chargers[charger].get_non_boosted_sessions_count()
-                for charger in self.chargers
+        return self.non_boosted_sessions_count
+
+    def export_state(self):
+        """Return the state of the station as plain data (active sessions and battery), 
+        to be shared with other processes or persisted."""
+        with self.lock:
+            sessions = [
+                [chargerId, session.label_id, session.max_vehicle_power, session.is_battery_boosted, session.boosted_power]
+                for chargerId, charger in self.chargers.items()
+                for session in charger.sessions.values()
             ]
+            return {
+                "sessions": sessions,
+                "battery": self.battery.export_state() if self.battery else None,
+            }
+
+    def restore_state(self, state):
+        """Replace the state of the station by an exported one. The sessions are restored 
+        as they were, without running the boost decisions again."""
+        with self.lock:
+            for charger in self.chargers.values():
+                for connectorId in list(charger.sessions):
+                    charger.remove_session(connectorId)
+            self.max_asked_power = 0
+            self.non_boosted_sessions_count = 0
+            for chargerId, connectorId, maxVehiclePower, isBoosted, boostedPower in state["sessions"]:
+                charger = self.get_charger(chargerId)
+                self.max_asked_power += maxVehiclePower
+                if isBoosted:
+                    charger.start_boosted_session(connectorId, maxVehiclePower, boostedPower)
+                else:
+                    charger.start_non_boosted_session(connectorId, maxVehiclePower)
+                    self.non_boosted_sessions_count += 1
+            if self.battery and state["battery"]:
+                self.battery.restore_state(state["battery"])
+            self.availability.rebuild(self.chargers)
+            self.set_all_non_boosted_sessions_to_uniform_power()
+            self.version += 1
+            self.restore_waiting_sessions()
+
+    def restore_waiting_sessions(self):
+        """Keep the starts waiting in this process across a restored state, their connectors staying reserved.
+        The ones whose connector was taken or removed meanwhile are cancelled."""
+        for chargerId, connectorId in list(self.waiting_sessions):
+            charger = self.get_charger(chargerId)
+            if not (charger and charger.has_connector(connectorId) and charger.is_session_free(connectorId)):
+                self.cancel_waiting_session(chargerId, connectorId)
+
+    def get_total_allocated_power(self):
+        """Return the power drawn from the grid by all the sessions of the station."""
+        return sum(
+            session.get_power()
+            for charger in self.chargers.values()
+            for session in charger.sessions.values()
         )
 
     def get_whole_capacity(self):
         """Return the power capacity at a given moment, taking battery into account."""
         return self.grid_capacity + self.battery.get_power()
 
-    def can_use_total_battery_boost(self, deficit):
-        """Checks if a battery boost can be used to fully allocate for a deficit."""
-        return self.battery and self.battery.get_power() >= deficit
+    def can_use_total_battery_boost(self, power):
+        """Checks if the battery has enough free power to handle a whole session, next to its other boosts."""
+        return self.battery and self.battery.get_power() >= power
+
+    def release_depleted_boosts(self):
+        """Move the boosted sessions back to the grid once the battery is empty. Return True if any was moved."""
+        if not self.battery.session_boosts or self.battery.state_of_charge > 0:
+            return False
+        for chargerId, connectorId in list(self.battery.session_boosts):
+            self.battery.remove_battery_boost(chargerId, connectorId)
+            self.get_charger(chargerId).set_session_non_boosted(connectorId)
+            self.non_boosted_sessions_count += 1
+            self.released_boosts.append((chargerId, connectorId))
+        return True
 
     def recharge_battery_if_possible(self):
-        """If the grid capacity is not saturated, recharge the battery."""
-        if (
-            self.battery
-            and (self.grid_capacity - self.max_asked_power) / self.grid_capacity >= 0.5
-        ):
-            self.battery.recharge()
+        """Charge the battery, from now on, with the grid capacity not asked by the non-boosted sessions.
+        The energy of the battery runs out over time: the boosts of an empty battery are released first."""
+        if self.battery:
+            if self.release_depleted_boosts():
+                self.set_all_non_boosted_sessions_to_uniform_power()
+            gridDemand = self.max_asked_power - self.battery.discharge_power
+            self.battery.set_charge_power(self.grid_capacity - gridDemand)
+
+    def get_status_key(self):
+        """Return what the status of the station depends on: its version, and the displayed
+        state of charge of its battery, which changes over time without any event."""
+        return self.version, self.battery.get_displayed_state_of_charge() if self.battery else None
@@ -0,0 +1,73 @@
+"""Module containing the pydantic classes used for the operations applied on sessions with a HTTP POST."""
+
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+class StartSessionRequest(BaseModel):
+    """Query parameters starting a session on a connector, with the max power of the vehicle.
+    Without connectorId, or without both ids, the connector is auto-assigned."""
+    chargerId: Optional[str] = None
+    connectorId: Optional[int] = Field(None, ge=1)
+    powerCapacity: float = Field(ge=0)
+    stationId: Optional[str] = None
+
+
+class StopSessionRequest(BaseModel):
+    """Query parameters stopping the session of a connector."""
+    chargerId: str
+    connectorId: int = Field(ge=1)
+    stationId: Optional[str] = None
+
+
+class SessionAllocation(BaseModel):
+    """Power allocated to an active session, once the caps of its vehicle, its charger and the grid are applied."""
+    chargerId: str
+    connectorId: int
+    allocated_power: float
+    vehicle_max_power: float
+    is_boosted: bool
+    boosted_power: float
+
+
+class SessionResponse(BaseModel):
+    """Result of a session start or stop, with the allocation of every session affected by it.
+    "admission" is "queued" for a start waiting until the station can guarantee its minimum power."""
+    action: Literal["start", "stop"]
+    chargerId: str
+    connectorId: int
+    allocated_power: Optional[float]
+    version: int
+    allocations: List[SessionAllocation]
+    admission: Optional[Literal["queued", "rejected"]] = None
+
+
+class SessionOperation(BaseModel):
+    """Start or stop of a session on a connector. powerCapacity is required to start a session."""
+    action: Literal["start", "stop"]
+    chargerId: str
+    connectorId: int
+    powerCapacity: Optional[float] = Field(None, ge=0)
+
+
+class SessionOperationResult(BaseModel):
+    """Result of an operation, with the power allocated to the session once the batch is applied."""
+    action: Literal["start", "stop"]
+    chargerId: str
+    connectorId: int
+    success: bool
+    message: str
+    allocated_power: Optional[float]
+    admission: Optional[Literal["queued", "rejected"]] = None
+
+
+class SessionBatch(BaseModel):
+    """Batch of operations, applied in order."""
+    operations: List[SessionOperation]
+
+
+class SessionBatchResult(BaseModel):
+    """Results of a batch of operations, in the order of the operations, with the allocation of every affected session."""
+    results: List[SessionOperationResult]
+    allocations: List[SessionAllocation] = []
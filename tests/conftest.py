@@ -0,0 +1,20 @@
+"""Fixtures shared by the tests."""
+import pytest
+
+
+class FakeClock:
+    """Clock returning a time in seconds set by the test, to pass as the clock of a component."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, hours):
+        self.now += hours * 3600
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
@@ -0,0 +1,106 @@
+"""Property tests of the allocation strategies, on random stations and sessions."""
+import math
+import random
+
+import pytest
+
+from src.station_components.allocation import create_allocation_strategy, get_water_level
+from src.station_components.station import Station
+
+EPSILON = 1e-6
+
+
+def random_station(rng, strategy):
+    config = {
+        "stationId": "Test Electra Station",
+        "gridCapacity": rng.choice([100, 300, 600, 1000]),
+        "allocationStrategy": strategy,
+        "chargers": [
+            {"id": f"CP{i:03d}", "maxPower": rng.choice([50, 150, 300]), "connectors": rng.randint(1, 4)}
+            for i in range(rng.randint(1, 8))
+        ],
+    }
+    station = Station(config)
+    for charger in station.chargers.values():
+        for connectorId in range(1, charger.nb_connectors + 1):
+            if rng.random() < 0.7:
+                station.start_session_on_charger(charger.label_id, connectorId, rng.randint(5, 350))
+    return station
+
+
+def get_powers(station):
+    """Return the (chargerId, vehicle max power, allocated power) of the non-boosted sessions."""
+    return [
+        (chargerId, session.max_vehicle_power, session.get_power())
+        for chargerId, charger in station.chargers.items()
+        for session in charger.sessions.values()
+        if not session.is_battery_boosted
+    ]
+
+
+def test_water_level_fills_the_capacity():
+    assert get_water_level([10, 20, 100], 60) == 30
+    assert get_water_level([10, 20], 60) == math.inf
+    assert get_water_level([], 60) == math.inf
+    assert get_water_level([10, 20], 0) == 0
+
+
+def test_unknown_strategy_is_rejected():
+    with pytest.raises(ValueError):
+        create_allocation_strategy("greedy")
+
+
+@pytest.mark.parametrize("seed", range(200))
+@pytest.mark.parametrize("strategy", ["uniform", "water_filling"])
+def test_allocation_respects_every_limit(seed, strategy):
+    station = random_station(random.Random(seed), strategy)
+    powers = get_powers(station)
+    assert all(0 <= allocated <= vehicleMax + EPSILON for _, vehicleMax, allocated in powers)
+    assert sum(allocated for _, _, allocated in powers) <= station.grid_capacity + EPSILON
+    for chargerId, charger in station.chargers.items():
+        chargerPower = sum(allocated for cId, _, allocated in powers if cId == chargerId)
+        assert chargerPower <= charger.max_power_capacity + EPSILON
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_water_filling_is_max_min_fair(seed):
+    """Each session below the max power of its vehicle is limited by a saturated charger or grid,
+    in which it already has the highest power : its power cannot grow without lowering a smaller one."""
+    station = random_station(random.Random(seed), "water_filling")
+    powers = get_powers(station)
+    total = sum(allocated for _, _, allocated in powers)
+    gridSaturated = total >= station.grid_capacity - EPSILON
+    highest = max((allocated for _, _, allocated in powers), default=0)
+    for chargerId, vehicleMax, allocated in powers:
+        if allocated >= vehicleMax - EPSILON:
+            continue
+        chargerPowers = [a for cId, _, a in powers if cId == chargerId]
+        chargerSaturated = sum(chargerPowers) >= station.get_charger(chargerId).max_power_capacity - EPSILON
+        assert (chargerSaturated and allocated >= max(chargerPowers) - EPSILON) or (
+            gridSaturated and allocated >= highest - EPSILON
+        )
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_water_filling_never_delivers_less_than_uniform(seed):
+    uniform = random_station(random.Random(seed), "uniform")
+    waterFilling = random_station(random.Random(seed), "water_filling")
+    assert waterFilling.get_total_allocated_power() >= uniform.get_total_allocated_power() - EPSILON
+
+
+def test_water_filling_gives_unused_power_to_other_sessions():
+    station = Station(
+        {
+            "stationId": "Test Electra Station",
+            "gridCapacity": 300,
+            "allocationStrategy": "water_filling",
+            "chargers": [{"id": "CP001", "maxPower": 300, "connectors": 3}],
+        }
+    )
+    station.start_session_on_charger("CP001", 1, 50)
+    station.start_session_on_charger("CP001", 2, 200)
+    station.start_session_on_charger("CP001", 3, 200)
+    assert [station.get_charger("CP001").get_session(i).get_power() for i in (1, 2, 3)] == [50, 125, 125]
+
+    station.stop_session_on_charger("CP001", 1)
+    assert station.get_charger("CP001").get_session(2).get_power() == 150
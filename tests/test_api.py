@@ -0,0 +1,305 @@
+"""Tests of the HTTP endpoints exposed in main.py."""
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from src.services.rate_limit import RateLimiter
+from src.services.session_history import SessionHistory
+from src.services.state_backends import SqliteStateBackend
+from src.station_components.fleet import Fleet
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fleet = Fleet(
+        [
+            {
+                "stationId": "Test Electra Station",
+                "gridCapacity": 400,
+                "chargers": [{"id": "CP001", "maxPower": 300, "connectors": 2}],
+            }
+        ]
+    )
+    monkeypatch.setattr(main, "fleet", fleet)
+    monkeypatch.setattr(main, "station", fleet.get_station())
+    return TestClient(main.app)
+
+
+def test_station_status_is_cached_with_etag(client):
+    response = client.get("/station/station_status")
+    assert response.status_code == 200
+    assert response.json()["station_id"] == "Test Electra Station"
+    etag = response.headers["etag"]
+
+    response = client.get("/station/station_status", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    client.post("/start_session/", params={"chargerId": "CP001", "connectorId": 1, "powerCapacity": 100})
+    response = client.get("/station/station_status", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["chargers"][0]["connectors"][0]["session"]["allocated_power"] == 100
+
+
+def test_unknown_station_is_not_found(client):
+    assert client.get("/station/station_status", params={"stationId": "UNKNOWN"}).status_code == 404
+
+
+def test_charger_and_connector_status_with_fields(client):
+    client.post("/start_session/", params={"chargerId": "CP001", "connectorId": 2, "powerCapacity": 120})
+
+    response = client.get("/chargers/CP001", params={"fields": "charger_id,max_asked_power"})
+    assert response.json() == {"charger_id": "CP001", "max_asked_power": 120}
+
+    response = client.get("/chargers/CP001/connectors/2")
+    assert response.json()["session"]["allocated_power"] == 120
+    assert client.get("/chargers/CP001/connectors/1").json()["session"] is None
+
+    assert client.get("/chargers/CP001/connectors/3").status_code == 404
+    assert client.get("/chargers/CP009").status_code == 404
+    assert client.get("/chargers/CP001", params={"fields": "unknown"}).status_code == 400
+
+
+def test_battery_status(client):
+    assert client.get("/battery").status_code == 404
+
+    main.fleet.add_station(
+        {
+            "stationId": "With battery",
+            "gridCapacity": 400,
+            "chargers": [],
+            "battery": {"initialCapacity": 200, "power": 100},
+        }
+    )
+    response = client.get("/battery", params={"stationId": "With battery", "fields": "max_power"})
+    assert response.json() == {"max_power": 100}
+
+
+def test_start_and_stop_session_return_the_affected_allocations(client):
+    response = client.post("/start_session/", params={"chargerId": "CP001", "connectorId": 1, "powerCapacity": 250})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    body = response.json()
+    assert body["action"] == "start"
+    assert body["allocated_power"] == 250
+    assert body["allocations"] == [
+        {
+            "chargerId": "CP001",
+            "connectorId": 1,
+            "allocated_power": 250,
+            "vehicle_max_power": 250,
+            "is_boosted": False,
+            "boosted_power": 0,
+        }
+    ]
+
+    # The charger capacity is exceeded: both sessions are capped.
+    response = client.post("/start_session/", params={"chargerId": "CP001", "connectorId": 2, "powerCapacity": 100})
+    assert [allocation["allocated_power"] for allocation in response.json()["allocations"]] == [150, 100]
+
+    response = client.post("/stop_session/", params={"chargerId": "CP001", "connectorId": 2})
+    assert response.status_code == 200
+    assert response.json()["allocated_power"] is None
+    assert response.json()["allocations"][0]["allocated_power"] == 250
+    assert response.json()["version"] == main.station.version
+
+
+def test_allocations_cover_the_boosts_released_by_the_operations(client, monkeypatch):
+    fleet = Fleet(
+        [
+            {
+                "stationId": "Test Electra Station",
+                "gridCapacity": 300,
+                "chargers": [
+                    {"id": "CP001", "maxPower": 300, "connectors": 2},
+                    {"id": "CP002", "maxPower": 300, "connectors": 2},
+                ],
+                "battery": {"initialCapacity": 100, "power": 200, "initialStateOfCharge": 100},
+            }
+        ]
+    )
+    monkeypatch.setattr(main, "fleet", fleet)
+    client.post("/start_session/", params={"chargerId": "CP001", "connectorId": 1, "powerCapacity": 200})
+    client.post("/start_session/", params={"chargerId": "CP002", "connectorId": 1, "powerCapacity": 150})
+    client.post("/stop_session/", params={"chargerId": "CP001", "connectorId": 1})
+    station = fleet.get_station()
+    assert station.get_charger("CP002").get_session(1).is_battery_boosted
+    assert not station.is_power_shared()
+    # The battery is drained, without being charged meanwhile.
+    station.battery.state_of_charge = 0
+    station.battery.charge_power = 0
+
+    # The start on CP001 finds the battery empty: the boost of CP002 is moved back to the grid.
+    response = client.post("/start_session/", params={"chargerId": "CP001", "connectorId": 1, "powerCapacity": 10})
+    allocations = response.json()["allocations"]
+    assert [(allocation["chargerId"], allocation["allocated_power"]) for allocation in allocations] == [
+        ("CP001", 10),
+        ("CP002", 150),
+    ]
+
+
+def test_session_errors_have_status_codes(client):
+    params = {"chargerId": "CP001", "connectorId": 1, "powerCapacity": 100}
+    assert client.post("/start_session/", params=params).status_code == 200
+    assert client.post("/start_session/", params=params).status_code == 409
+    assert client.post("/stop_session/", params={"chargerId": "CP001", "connectorId": 2}).status_code == 409
+    assert client.post("/start_session/", params={**params, "chargerId": "CP009"}).status_code == 404
+    assert client.post("/start_session/", params={**params, "connectorId": 3}).status_code == 404
+    assert client.post("/start_session/", params={**params, "powerCapacity": "fast"}).status_code == 422
+    assert client.post("/stop_session/", params={"chargerId": "CP001"}).status_code == 422
+
+
+def test_admission_control_rejects_or_queues_starts(client, monkeypatch):
+    fleet = Fleet(
+        [
+            {
+                "stationId": "Test Electra Station",
+                "gridCapacity": 100,
+                "chargers": [{"id": "CP001", "maxPower": 300, "connectors": 3}],
+                "minSessionPower": 50,
+            }
+        ]
+    )
+    monkeypatch.setattr(main, "fleet", fleet)
+    for connectorId in (1, 2):
+        params = {"chargerId": "CP001", "connectorId": connectorId, "powerCapacity": 100}
+        assert client.post("/start_session/", params=params).status_code == 200
+    params = {"chargerId": "CP001", "connectorId": 3, "powerCapacity": 100}
+    response = client.post("/start_session/", params=params)
+    assert response.status_code == 503
+    assert "cannot guarantee 50 kW" in response.json()["detail"]
+
+    fleet.get_station().admission_policy = "queue"
+    response = client.post("/start_session/", params=params)
+    assert response.status_code == 202
+    assert response.json()["admission"] == "queued"
+    client.post("/stop_session/", params={"chargerId": "CP001", "connectorId": 1})
+    assert client.get("/chargers/CP001/connectors/3").json()["session"]["allocated_power"] == 50
+
+
+def test_rate_limits_answer_429(client, monkeypatch):
+    monkeypatch.setattr(main, "charger_limiter", RateLimiter(1, burst=2, clock=lambda: 0))
+    params = {"chargerId": "CP001", "connectorId": 1}
+    assert client.post("/start_session/", params={**params, "powerCapacity": 100}).status_code == 200
+    assert client.post("/stop_session/", params=params).status_code == 200
+    response = client.post("/start_session/", params={**params, "powerCapacity": 100})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1"
+
+    monkeypatch.setattr(main, "client_limiter", RateLimiter(1, burst=1, clock=lambda: 0))
+    assert client.get("/stations").status_code == 200
+    assert client.get("/stations").status_code == 429
+    assert client.get("/metrics").status_code == 200
+
+
+def test_busy_state_backend_answers_503_without_blocking_the_reads(client, monkeypatch, tmp_path):
+    path = str(tmp_path / "state.db")
+    monkeypatch.setattr(main, "state_backend", SqliteStateBackend(path, timeout=0.05))
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    params = {"chargerId": "CP001", "connectorId": 1, "powerCapacity": 100}
+
+    response = client.post("/start_session/", params=params)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert client.get("/chargers/CP001").status_code == 200
+    other.execute("ROLLBACK")
+    assert client.post("/start_session/", params=params).status_code == 200
+
+
+def test_sessions_batch(client):
+    response = client.post(
+        "/sessions/batch",
+        json={
+            "operations": [
+                {"action": "start", "chargerId": "CP001", "connectorId": 1, "powerCapacity": 200},
+                {"action": "start", "chargerId": "CP001", "connectorId": 2, "powerCapacity": 200},
+                {"action": "stop", "chargerId": "CP001", "connectorId": 1},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["success"] for result in results] == [True, True, True]
+    assert results[1]["allocated_power"] == 200
+    assert results[0]["allocated_power"] is None
+
+    response = client.post(
+        "/sessions/batch", json={"operations": [{"action": "start", "chargerId": "CP001", "connectorId": 1}]}
+    )
+    assert response.status_code == 422
+
+    response = client.post(
+        "/sessions/batch",
+        json={"operations": [{"action": "start", "chargerId": "CP001", "connectorId": 1, "powerCapacity": -500}]},
+    )
+    assert response.status_code == 422
+    assert main.fleet.get_station().max_asked_power == 200
+
+
+def test_metrics_expose_latency_per_endpoint(client):
+    client.get("/chargers/CP001")
+    client.post("/start_session/", params={"chargerId": "CP001", "connectorId": 1, "powerCapacity": 100})
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",path="/chargers/{chargerId}"}' in response.text
+    assert 'station_operation_duration_seconds_count{operation="start_session"}' in response.text
+    assert "station_rebalances_total" in response.text
+
+
+def test_websocket_streams_the_changes_of_the_station(client):
+    with client, client.websocket_connect("/station/ws") as websocket:
+        assert websocket.receive_json()["stationId"] == "Test Electra Station"
+        client.post("/start_session/", params={"chargerId": "CP001", "connectorId": 1, "powerCapacity": 100})
+        assert websocket.receive_json()["sessions"] == {"CP001": {"1": 100}}
+
+
+def test_reload_config_keeps_sessions(client, monkeypatch, tmp_path):
+    config_file = tmp_path / "station_config.json"
+    config_file.write_text(
+        '{"stationId": "Test Electra Station", "gridCapacity": 400, "chargers": [{"id": "CP001", "maxPower": 300, "connectors": 2}]}'
+    )
+    monkeypatch.setattr(main, "config_path", str(config_file))
+    client.post("/start_session/", params={"chargerId": "CP001", "connectorId": 1, "powerCapacity": 250})
+
+    config_file.write_text(
+        '{"stationId": "Test Electra Station", "gridCapacity": 400, "chargers": [{"id": "CP001", "maxPower": 200, "connectors": 2}]}'
+    )
+    response = client.post("/admin/reload_config")
+    assert response.json() == {"added": [], "removed": [], "updated": ["Test Electra Station"]}
+    assert client.get("/chargers/CP001/connectors/1").json()["session"]["allocated_power"] == 200
+
+    config_file.write_text('{"stationId": "Other", "gridCapacity": 400, "chargers": []}')
+    assert client.post("/admin/reload_config").status_code == 409
+
+
+def test_session_history(client, monkeypatch, tmp_path):
+    assert client.get("/history/sessions").status_code == 404
+
+    history = SessionHistory(str(tmp_path / "history.db"))
+    history.attach(main.fleet)
+    monkeypatch.setattr(main, "history", history)
+    client.post("/start_session/", params={"chargerId": "CP001", "connectorId": 1, "powerCapacity": 100})
+    client.post("/stop_session/", params={"chargerId": "CP001", "connectorId": 1})
+
+    (session,) = client.get("/history/sessions").json()["sessions"]
+    assert (session["charger_id"], session["connector_id"]) == ("CP001", 1)
+    assert client.get("/history/chargers").json()["chargers"][0]["sessions"] == 1
+    assert client.get("/history/days", params={"chargerId": "CP009"}).json() == {"days": []}
+
+
+def test_available_connectors_and_auto_assign(client):
+    response = client.get("/available")
+    assert response.json() == {"free_connectors": 2, "chargers": [{"chargerId": "CP001", "headroom": 300, "connectors": [1, 2]}]}
+
+    response = client.post("/start_session/", params={"powerCapacity": 100})
+    assert (response.json()["chargerId"], response.json()["connectorId"]) == ("CP001", 1)
+    response = client.post("/start_session/", params={"chargerId": "CP001", "powerCapacity": 100})
+    assert response.json()["connectorId"] == 2
+    assert client.get("/available").json() == {"free_connectors": 0, "chargers": []}
+    assert client.post("/start_session/", params={"powerCapacity": 100}).status_code == 409
+    assert client.post("/start_session/", params={"connectorId": 1, "powerCapacity": 100}).status_code == 422
@@ -0,0 +1,101 @@
+"""Parity tests between the array-backed station and the default station."""
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from src.station_components.array_station import ArrayStation
+from src.station_components.station import Station
+
+
+def random_config(rng, with_battery):
+    config = {
+        "stationId": "Test Electra Station",
+        "gridCapacity": rng.choice([150, 300, 600]),
+        "chargers": [
+            {"id": f"CP00{i}", "maxPower": rng.choice([150, 300]), "connectors": rng.randint(1, 4)}
+            for i in range(1, 5)
+        ],
+    }
+    if with_battery:
+        config["battery"] = {"initialCapacity": 200, "power": rng.choice([50, 200])}
+    return config
+
+
+def assert_same_status(expected, actual):
+    expected_status = expected.get_status().model_dump()
+    actual_status = actual.get_status().model_dump()
+    assert actual_status["max_asked_power"] == pytest.approx(expected_status["max_asked_power"])
+    for charger_expected, charger_actual in zip(expected_status["chargers"], actual_status["chargers"]):
+        assert charger_actual["max_asked_power"] == pytest.approx(charger_expected["max_asked_power"])
+        for connector_expected, connector_actual in zip(
+            charger_expected["connectors"], charger_actual["connectors"]
+        ):
+            if connector_expected["session"] is None:
+                assert connector_actual["session"] is None
+            else:
+                assert connector_actual["session"] == pytest.approx(connector_expected["session"])
+    assert actual_status["battery"] == expected_status["battery"]
+
+
+@pytest.mark.parametrize("seed", range(30))
+@pytest.mark.parametrize("with_battery", [False, True])
+@pytest.mark.parametrize("strategy", ["uniform", "water_filling"])
+def test_same_results_as_default_backend(seed, with_battery, strategy):
+    rng = random.Random(seed)
+    config = random_config(rng, with_battery)
+    config["allocationStrategy"] = strategy
+    expected, actual = Station(config, clock=lambda: 0.0), ArrayStation(config, clock=lambda: 0.0)
+    slots = [(c["id"], n) for c in config["chargers"] for n in range(1, c["connectors"] + 1)]
+
+    for _ in range(80):
+        chargerId, connectorId = rng.choice(slots)
+        if expected.get_charger(chargerId).is_session_free(connectorId):
+            power = rng.randint(10, 350)
+            expected.start_session_on_charger(chargerId, connectorId, power)
+            actual.start_session_on_charger(chargerId, connectorId, power)
+        else:
+            expected.stop_session_on_charger(chargerId, connectorId)
+            actual.stop_session_on_charger(chargerId, connectorId)
+
+        assert actual.max_asked_power == pytest.approx(expected.max_asked_power)
+        assert actual.get_total_allocated_power() == pytest.approx(expected.get_total_allocated_power())
+        assert_same_status(expected, actual)
+
+
+def test_session_api():
+    station = ArrayStation(
+        {
+            "stationId": "Test Electra Station",
+            "gridCapacity": 400,
+            "chargers": [{"id": "CP001", "maxPower": 300, "connectors": 2}],
+        }
+    )
+    station.start_session_on_charger("CP001", 1, 200)
+    station.start_session_on_charger("CP001", 2, 200)
+
+    charger = station.get_charger("CP001")
+    assert charger.get_session(1).get_power() == 150
+    assert charger.get_session(2).get_max_vehicle_power() == 200
+    assert not charger.is_session_free(2)
+
+    station.stop_session_on_charger("CP001", 2)
+    assert charger.is_session_free(2)
+    assert charger.get_session(1).get_power() == 200
+
+
+def test_apply_config_rebuilds_the_arrays():
+    config = random_config(random.Random(0), with_battery=True)
+    expected, actual = Station(config, clock=lambda: 0.0), ArrayStation(config, clock=lambda: 0.0)
+    for station in (expected, actual):
+        station.start_session_on_charger("CP002", 1, 120)
+        station.start_session_on_charger("CP003", 1, 200)
+    newConfig = {
+        **config,
+        "chargers": [{"id": "CP003", "maxPower": 150, "connectors": 6}, {"id": "CP002", "maxPower": 100, "connectors": 1}],
+    }
+    for station in (expected, actual):
+        station.apply_config(newConfig)
+        station.start_session_on_charger("CP003", 6, 80)
+    assert_same_status(expected, actual)
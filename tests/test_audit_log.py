@@ -0,0 +1,115 @@
+"""Tests of the audit log of the stations."""
+import json
+import os
+
+import pytest
+
+from src.services.audit_log import AUDIT_FILE, AuditLog
+from src.station_components.fleet import Fleet
+
+CONFIG = {
+    "stationId": "PARIS_15",
+    "gridCapacity": 300,
+    "chargers": [
+        {"id": "CP001", "maxPower": 200, "connectors": 2},
+        {"id": "CP002", "maxPower": 200, "connectors": 2},
+    ],
+}
+
+
+def read_events(folder):
+    with open(os.path.join(folder, AUDIT_FILE)) as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture
+def audited(tmp_path):
+    fleet = Fleet([CONFIG])
+    audit_log = AuditLog(str(tmp_path))
+    audit_log.attach(fleet)
+    return fleet.get_station(), audit_log
+
+
+def test_sessions_and_rebalancings_are_audited(audited, tmp_path):
+    station, audit_log = audited
+    station.start_session_on_charger("CP001", 1, 200)
+    # The grid is exceeded: the session of CP001 goes down to 150 kW.
+    station.start_session_on_charger("CP002", 1, 200)
+    station.stop_session_on_charger("CP002", 1)
+    audit_log.close()
+
+    events = read_events(tmp_path)
+    assert [event["type"] for event in events] == [
+        "session_start", "rebalance", "session_start", "rebalance", "session_stop", "rebalance"
+    ]
+    assert events[0]["boosted"] is False
+    assert events[3]["sessions"] == [
+        {"chargerId": "CP001", "connectorId": 1, "before": 200, "after": 150},
+        {"chargerId": "CP002", "connectorId": 1, "before": None, "after": 150},
+    ]
+    assert events[5]["sessions"] == [
+        {"chargerId": "CP001", "connectorId": 1, "before": 150, "after": 200},
+        {"chargerId": "CP002", "connectorId": 1, "before": 150, "after": None},
+    ]
+
+
+def test_battery_transitions_are_audited(tmp_path):
+    config = dict(CONFIG, gridCapacity=50, battery={"initialCapacity": 100, "power": 100, "initialStateOfCharge": 50})
+    fleet = Fleet([config])
+    audit_log = AuditLog(str(tmp_path))
+    audit_log.attach(fleet)
+    station = fleet.get_station()
+    station.start_session_on_charger("CP001", 1, 80)
+    station.stop_session_on_charger("CP001", 1)
+    audit_log.close()
+
+    transitions = [(event["before"], event["after"]) for event in read_events(tmp_path) if event["type"] == "battery"]
+    assert transitions == [("charging", "discharging"), ("discharging", "charging")]
+
+
+def test_boosted_session_is_audited_at_the_power_of_its_vehicle(tmp_path):
+    config = dict(CONFIG, battery={"initialCapacity": 1000, "power": 200, "initialStateOfCharge": 100})
+    fleet = Fleet([config])
+    audit_log = AuditLog(str(tmp_path))
+    audit_log.attach(fleet)
+    station = fleet.get_station()
+    station.start_session_on_charger("CP001", 1, 200)
+    # 50 kW beyond the grid: the session is boosted, and the battery gives it its 150 kW.
+    station.start_session_on_charger("CP002", 1, 150)
+    audit_log.close()
+
+    rebalance = [event for event in read_events(tmp_path) if event["type"] == "rebalance"][-1]
+    assert rebalance["sessions"] == [{"chargerId": "CP002", "connectorId": 1, "before": None, "after": 150}]
+
+
+def test_oldest_events_are_dropped_when_the_buffer_is_full(tmp_path):
+    audit_log = AuditLog(str(tmp_path), capacity=2)
+    for index in range(3):
+        audit_log.emit({"index": index})
+    assert audit_log.dropped == 1
+    audit_log.close()
+    assert [event["index"] for event in read_events(tmp_path)] == [1, 2]
+
+
+def test_block_policy_waits_for_the_writer(tmp_path):
+    audit_log = AuditLog(str(tmp_path), capacity=1, policy="block", flush_interval=0.01, block_timeout=5)
+    audit_log.start()
+    for index in range(20):
+        audit_log.emit({"index": index})
+    audit_log.close()
+    assert audit_log.dropped == 0
+    assert [event["index"] for event in read_events(tmp_path)] == list(range(20))
+
+
+def test_files_are_rotated(tmp_path):
+    audit_log = AuditLog(str(tmp_path), max_bytes=100, backup_count=2)
+    for index in range(10):
+        audit_log.emit({"index": index, "padding": "x" * 50})
+        audit_log.flush()
+    audit_log.close()
+    assert sorted(os.listdir(tmp_path)) == [AUDIT_FILE + ".1", AUDIT_FILE + ".2"]
+
+
+def test_unknown_policy_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        AuditLog(str(tmp_path), policy="wait")
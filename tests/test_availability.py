@@ -0,0 +1,80 @@
+"""Tests of the index of the free connectors of a station."""
+import random
+
+import pytest
+
+from src.station_components.station import Station
+
+CONFIG = {
+    "stationId": "Test Electra Station",
+    "gridCapacity": 1000,
+    "chargers": [
+        {"id": "CP001", "maxPower": 300, "connectors": 2},
+        {"id": "CP002", "maxPower": 150, "connectors": 3},
+        {"id": "CP003", "maxPower": 200, "connectors": 1},
+    ],
+}
+
+
+def get_free_connectors(station):
+    """Free connectors found by probing every connector of every charger."""
+    return {
+        chargerId: [c for c in range(1, charger.nb_connectors + 1) if charger.is_session_free(c)]
+        for chargerId, charger in station.chargers.items()
+    }
+
+
+def assert_index_is_consistent(station):
+    free = get_free_connectors(station)
+    index = station.availability
+    assert {chargerId: index.get_free_connectors(chargerId) for chargerId in station.chargers} == free
+    assert index.free_connectors_count == sum(map(len, free.values()))
+    available = [c for c in station.chargers if free[c]]
+    headroom = {c: charger.max_power_capacity - charger.max_asked_power for c, charger in station.chargers.items()}
+    best = max(available, key=lambda c: (headroom[c], [-ord(x) for x in c])) if available else None
+    assert index.get_best_charger() == best
+    assert [charger["chargerId"] for charger in station.get_available_connectors(10)] == sorted(
+        available, key=lambda c: (-headroom[c], c)
+    )
+
+
+def test_best_charger_has_the_most_headroom():
+    station = Station(CONFIG)
+    assert station.find_available_connector() == ("CP001", 1)
+    station.start_session_on_charger("CP001", 1, 200)
+    # CP003 has 200 kW of headroom, CP002 150 kW and CP001 100 kW.
+    assert station.find_available_connector() == ("CP003", 1)
+    station.start_session_on_charger("CP003", 1, 50)
+    assert station.find_available_connector() == ("CP002", 1)
+    assert station.find_available_connector("CP001") == ("CP001", 2)
+    assert station.find_available_connector("CP003") is None
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_index_follows_random_operations(seed):
+    rng = random.Random(seed)
+    station = Station(CONFIG)
+    for i in range(300):
+        chargerId = rng.choice(list(station.chargers))
+        connectorId = rng.randint(1, station.chargers[chargerId].nb_connectors)
+        if station.get_charger(chargerId).is_session_free(connectorId):
+            station.start_session_on_charger(chargerId, connectorId, rng.randint(10, 250))
+        elif rng.random() < 0.3:
+            station.change_vehicle_power(chargerId, connectorId, rng.randint(10, 250))
+        else:
+            station.stop_session_on_charger(chargerId, connectorId)
+        assert_index_is_consistent(station)
+    assert len(station.availability.heap) <= 2 * len(station.chargers) + 16
+
+
+def test_index_is_rebuilt_after_a_restore_and_a_new_config():
+    station = Station(CONFIG)
+    station.start_session_on_charger("CP002", 3, 100)
+    state = station.export_state()
+    restored = Station(CONFIG)
+    restored.restore_state(state)
+    assert_index_is_consistent(restored)
+
+    station.apply_config({**CONFIG, "chargers": CONFIG["chargers"][1:] + [{"id": "CP004", "maxPower": 400, "connectors": 2}]})
+    assert_index_is_consistent(station)
+    assert station.find_available_connector() == ("CP004", 1)
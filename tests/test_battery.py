@@ -0,0 +1,77 @@
+"""Unit tests covering the energy model of the Battery component."""
+import pytest
+
+from src.station_components.battery import Battery
+from src.station_components.station import Station
+
+
+def test_charge_is_integrated_lazily_with_limits_and_efficiency(clock):
+    battery = Battery(100, 50, charge_power=20, efficiency=0.9, clock=clock)
+    battery.set_charge_power(80)
+    clock.advance(2)
+    # Limited to 20 kW of charge, 90 % of it is stored.
+    assert battery.energy == 0
+    assert battery.state_of_charge == pytest.approx(36)
+    clock.advance(10)
+    assert battery.state_of_charge == 100
+
+
+def test_reading_the_state_of_charge_does_not_change_the_battery(clock):
+    battery = Battery(100, 50, clock=clock)
+    battery.set_charge_power(50)
+    clock.advance(1)
+    assert [battery.state_of_charge for _ in range(3)] == [pytest.approx(50)] * 3
+    assert (battery.energy, battery.updated_at) == (0, 0)
+    battery.update()
+    assert battery.energy == pytest.approx(50)
+
+
+def test_boosts_share_the_max_power_and_discharge_the_battery(clock):
+    battery = Battery(200, 100, initial_state_of_charge=50, clock=clock)
+    assert battery.get_power() == 100
+    battery.allocate_boost("CP001", 1, 60)
+    assert battery.get_power() == 40
+    clock.advance(0.5)
+    assert battery.state_of_charge == pytest.approx(35)
+
+    battery.remove_battery_boost("CP001", 1)
+    assert battery.get_power() == 100
+    clock.advance(1)
+    assert battery.state_of_charge == pytest.approx(35)
+
+
+def test_no_boost_below_the_min_state_of_charge(clock):
+    battery = Battery(200, 100, initial_state_of_charge=19, clock=clock)
+    assert battery.get_power() == 0
+
+
+def test_restore_state_exported_before_the_energy_model(clock):
+    battery = Battery(200, 100, clock=clock)
+    battery.restore_state({"state_of_charge": 40, "session_boosts": [["CP001", 2, 30]]})
+    assert battery.energy == 80
+    assert battery.discharge_power == 30
+
+
+def test_station_charges_its_battery_with_the_free_grid_power(clock):
+    station = Station(
+        {
+            "stationId": "Test Electra Station",
+            "gridCapacity": 300,
+            "chargers": [{"id": "CP001", "maxPower": 300, "connectors": 3}],
+            "battery": {"initialCapacity": 200, "power": 200, "initialStateOfCharge": 20},
+        },
+        clock=clock,
+    )
+    station.start_session_on_charger("CP001", 1, 250)
+    clock.advance(1)
+    assert station.battery.state_of_charge == pytest.approx(45)
+
+    # 100 kW from the battery, the grid demand stays at 250 kW.
+    station.start_session_on_charger("CP001", 2, 100)
+    assert station.get_charger("CP001").get_session(2).is_battery_boosted
+    clock.advance(0.5)
+    assert station.battery.state_of_charge == pytest.approx(45 + (50 - 100) * 0.5 / 2)
+
+    # The battery only has 100 kW left for new boosts.
+    station.start_session_on_charger("CP001", 3, 150)
+    assert not station.get_charger("CP001").get_session(3).is_battery_boosted
@@ -0,0 +1,85 @@
+"""Tests of the boost schedulers and of the forecast of the deficit of a station."""
+import pytest
+
+from src.station_components.boost_scheduler import DemandForecaster, GreedyBoostScheduler, PredictiveBoostScheduler
+from src.station_components.station import Station
+
+HOUR = 3600
+
+
+def station_config(scheduler):
+    return {
+        "stationId": "Test Electra Station",
+        "gridCapacity": 100,
+        "boostScheduler": scheduler,
+        "chargers": [{"id": f"CP00{i}", "maxPower": 200, "connectors": 2} for i in range(1, 5)],
+        "battery": {"initialCapacity": 200, "power": 150, "initialStateOfCharge": 100},
+    }
+
+
+def test_forecast_is_an_ewma_of_the_peak_of_each_bucket():
+    forecaster = DemandForecaster(bucket_seconds=HOUR, alpha=0.5)
+    forecaster.observe_deficit(18 * HOUR, 100)
+    forecaster.observe_deficit(18.5 * HOUR, 0)
+    # The deficit stays at 0 until the next day: 18h is folded with its peak, and the buckets between at 0.
+    forecaster.observe_deficit(24 * HOUR + 18 * HOUR, 40)
+    assert forecaster.forecasts[18] == 100
+    assert forecaster.forecasts[19] == 0
+    forecaster.observe_deficit(24 * HOUR + 19 * HOUR, 0)
+    assert forecaster.forecasts[18] == 70
+    assert forecaster.predict_peak(24 * HOUR + 16 * HOUR, 2 * HOUR) == 70
+    assert forecaster.predict_peak(24 * HOUR + 16 * HOUR, HOUR) == 0
+
+
+def test_duration_of_the_sessions_is_learned():
+    forecaster = DemandForecaster(alpha=0.5)
+    assert forecaster.get_session_hours() == 0.5
+    forecaster.observe_start(("CP001", 1), 0)
+    forecaster.observe_stop(("CP001", 1), 2 * HOUR)
+    forecaster.observe_start(("CP001", 1), 3 * HOUR)
+    forecaster.observe_stop(("CP001", 1), 4 * HOUR)
+    assert forecaster.get_session_hours() == pytest.approx(1.5)
+
+
+def test_greedy_scheduler_is_the_default():
+    config = station_config("greedy")
+    del config["boostScheduler"]
+    station = Station(config)
+    assert isinstance(station.boost_scheduler, GreedyBoostScheduler)
+    station.start_session_on_charger("CP001", 1, 150)
+    assert station.get_charger("CP001").get_session(1).is_battery_boosted
+
+
+def test_battery_is_kept_for_a_forecast_peak(clock):
+    station = Station(station_config("predictive"), clock=clock)
+    assert isinstance(station.boost_scheduler, PredictiveBoostScheduler)
+
+    # Day 1: a peak of 300 kW of deficit from 18h, with sessions of 1 hour, and an empty battery.
+    clock.now = 18 * HOUR
+    for chargerId in ("CP001", "CP002", "CP003"):
+        station.battery.state_of_charge = 0
+        station.start_session_on_charger(chargerId, 1, 133)
+    clock.now = 19 * HOUR - 60
+    for chargerId in ("CP001", "CP002", "CP003"):
+        station.stop_session_on_charger(chargerId, 1)
+    assert station.boost_scheduler.forecaster.forecasts[72] == pytest.approx(299)
+
+    # Day 2 at 17h: a small deficit now, the battery is kept for the peak coming.
+    clock.now = 24 * HOUR + 17 * HOUR
+    station.battery.state_of_charge = 100
+    station.start_session_on_charger("CP001", 1, 90)
+    station.start_session_on_charger("CP002", 1, 90)
+    assert not station.get_charger("CP002").get_session(1).is_battery_boosted
+
+    # At the peak, once the deficit reaches the forecast, the battery boosts.
+    clock.now = 24 * HOUR + 18 * HOUR
+    station.start_session_on_charger("CP004", 1, 120)
+    assert not station.get_charger("CP004").get_session(1).is_battery_boosted
+    station.start_session_on_charger("CP003", 1, 150)
+    assert station.get_charger("CP003").get_session(1).is_battery_boosted
+
+
+def test_boost_scheduler_is_changed_by_a_new_config():
+    station = Station(station_config("greedy"))
+    assert station.apply_config(station_config("predictive")) == ["updated boost scheduler"]
+    assert station.check_config(station_config("unknown")) == "unknown boost scheduler unknown"
@@ -0,0 +1,139 @@
+"""Load tests firing concurrent start/stop operations against a single station."""
+import asyncio
+import random
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+import main
+from src.services.status_cache import StatusCache
+from src.station_components.fleet import Fleet
+from src.station_components.station import Station
+
+CONFIG = {
+    "stationId": "Test Electra Station",
+    "gridCapacity": 500,
+    "chargers": [{"id": f"CP00{i}", "maxPower": 300, "connectors": 2} for i in range(1, 5)],
+    "battery": {"initialCapacity": 200, "power": 100},
+}
+
+
+def assert_station_invariants(station):
+    sessions = [s for c in station.chargers.values() for s in c.sessions.values()]
+    assert station.max_asked_power == pytest.approx(sum(s.max_vehicle_power for s in sessions))
+    assert station.get_number_non_boosted_sessions() == sum(not s.is_battery_boosted for s in sessions)
+    assert station.get_total_allocated_power() <= station.grid_capacity + 1e-9
+    for charger in station.chargers.values():
+        assert sum(s.get_power() for s in charger.sessions.values()) <= charger.max_power_capacity + 1e-9
+    if station.battery:
+        assert len(station.battery.session_boosts) == sum(s.is_battery_boosted for s in sessions)
+
+
+@pytest.fixture
+def fast_thread_switching():
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def test_concurrent_operations_keep_station_consistent(fast_thread_switching):
+    station = Station(CONFIG)
+    cache = StatusCache()
+    stop_reading = threading.Event()
+
+    def writer(seed):
+        rng = random.Random(seed)
+        for _ in range(300):
+            operation = {
+                "action": rng.choice(["start", "stop"]),
+                "chargerId": f"CP00{rng.randint(1, 4)}",
+                "connectorId": rng.randint(1, 2),
+                "powerCapacity": rng.randint(20, 250),
+            }
+            station.apply_operations([operation])
+            with station.lock:
+                assert_station_invariants(station)
+
+    def reader():
+        while not stop_reading.is_set():
+            assert cache.get_snapshot(station).body.startswith(b"{")
+
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        readers = [pool.submit(reader) for _ in range(2)]
+        writers = [pool.submit(writer, seed) for seed in range(8)]
+        for future in writers:
+            future.result()
+        stop_reading.set()
+        for future in readers:
+            future.result()
+
+    assert_station_invariants(station)
+    assert cache.get_snapshot(station).key[0] == station.version
+
+
+def test_reads_do_not_wait_for_a_writer():
+    station = Station(CONFIG)
+    cache = StatusCache()
+    station.start_session_on_charger("CP001", 1, 100)
+    assert cache.get_charger_status(station, "CP001").connectors[0].session is not None
+    assert cache.get_availability(station)[0] == 7
+    locked = threading.Event()
+    release = threading.Event()
+
+    def writer():
+        with station.lock:
+            station.stop_session_on_charger("CP001", 1)
+            locked.set()
+            release.wait()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    locked.wait()
+    # The writer holds the lock: the last published snapshots are served.
+    assert cache.get_charger_status(station, "CP001").connectors[0].session is not None
+    assert cache.get_availability(station)[0] == 7
+    release.set()
+    thread.join()
+    assert cache.get_charger_status(station, "CP001").connectors[0].session is None
+    assert cache.get_availability(station)[0] == 8
+
+
+def test_part_reads_render_only_their_part(monkeypatch):
+    station = Station(CONFIG)
+    cache = StatusCache()
+    monkeypatch.setattr(station, "get_status", lambda: pytest.fail("the whole station was rendered"))
+    station.start_session_on_charger("CP001", 1, 100)
+    assert cache.get_charger_status(station, "CP001").connectors[0].session.allocated_power == 100
+    assert cache.get_battery_status(station).state_of_charge == 0
+    assert cache.get_charger_status(station, "CP009") is None
+    assert ("charger", "CP009") not in {part for _, part in cache.parts}
+
+
+def test_concurrent_http_requests(monkeypatch):
+    fleet = Fleet([CONFIG])
+    monkeypatch.setattr(main, "fleet", fleet)
+    monkeypatch.setattr(main, "station", fleet.get_station())
+    rng = random.Random(0)
+
+    async def fire_requests():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            calls = []
+            for _ in range(400):
+                params = {"chargerId": f"CP00{rng.randint(1, 4)}", "connectorId": rng.randint(1, 2)}
+                if rng.random() < 0.5:
+                    calls.append(client.post("/start_session/", params={**params, "powerCapacity": rng.randint(20, 250)}))
+                else:
+                    calls.append(client.post("/stop_session/", params=params))
+                calls.append(client.get("/station/station_status"))
+            return await asyncio.gather(*calls)
+
+    responses = asyncio.run(fire_requests())
+
+    # A start on a busy connector, or a stop on an idle one, is a conflict.
+    assert all(response.status_code in (200, 409) for response in responses)
+    assert_station_invariants(fleet.get_station())
@@ -0,0 +1,138 @@
+"""Unit tests covering features of the Fleet registry."""
+import json
+import pickle
+
+import pytest
+
+from src.station_components.fleet import Fleet, load_station_configs
+
+
+def station_config(stationId, gridCapacity=400):
+    return {
+        "stationId": stationId,
+        "gridCapacity": gridCapacity,
+        "chargers": [{"id": "CP001", "maxPower": 300, "connectors": 2}],
+    }
+
+
+@pytest.fixture
+def simple_fleet():
+    return Fleet([station_config("PARIS_15"), station_config("LYON_01", 200)])
+
+
+def test_stations_are_routed_by_id(simple_fleet):
+    assert len(simple_fleet) == 2
+    assert simple_fleet.get_station("LYON_01").grid_capacity == 200
+    assert simple_fleet.get_station("UNKNOWN") is None
+    assert simple_fleet.get_station().name == "PARIS_15"
+
+
+def test_sessions_are_isolated_between_stations(simple_fleet):
+    simple_fleet.get_station("PARIS_15").start_session_on_charger("CP001", 1, 100)
+
+    assert simple_fleet.get_station("PARIS_15").max_asked_power == 100
+    assert simple_fleet.get_station("LYON_01").max_asked_power == 0
+
+
+def test_duplicate_station_id_is_refused(simple_fleet):
+    with pytest.raises(ValueError):
+        simple_fleet.add_station(station_config("PARIS_15"))
+
+
+def test_remove_default_station(simple_fleet):
+    simple_fleet.remove_station("PARIS_15")
+    assert simple_fleet.get_station().name == "LYON_01"
+
+
+def test_load_configs_from_file_and_folder(tmp_path):
+    (tmp_path / "single.json").write_text(json.dumps(station_config("A")))
+    (tmp_path / "many.json").write_text(
+        json.dumps({"stations": [station_config("B"), station_config("C")]})
+    )
+
+    assert [c["stationId"] for c in load_station_configs(tmp_path / "single.json")] == ["A"]
+    assert sorted(c["stationId"] for c in load_station_configs(str(tmp_path))) == ["A", "B", "C"]
+
+
+def test_reload_is_incremental(simple_fleet):
+    paris = simple_fleet.get_station("PARIS_15")
+    lyon = simple_fleet.get_station("LYON_01")
+    lyon.start_session_on_charger("CP001", 1, 150)
+
+    summary = simple_fleet.reload([station_config("PARIS_15"), station_config("LYON_01", 100), station_config("NANTES_02")])
+
+    assert summary == {"added": ["NANTES_02"], "removed": [], "updated": ["LYON_01"]}
+    assert simple_fleet.get_station("PARIS_15") is paris
+    assert simple_fleet.get_station("LYON_01") is lyon
+    assert lyon.grid_capacity == 100
+    assert lyon.get_charger("CP001").get_session(1).get_power() == 100
+
+
+def test_reload_checks_every_config_before_applying(simple_fleet):
+    simple_fleet.get_station("LYON_01").start_session_on_charger("CP001", 1, 150)
+
+    with pytest.raises(ValueError):
+        simple_fleet.reload([station_config("PARIS_15", 100), station_config("NANTES_02")])
+
+    assert simple_fleet.get_station_ids() == ["PARIS_15", "LYON_01"]
+    assert simple_fleet.get_station("PARIS_15").grid_capacity == 400
+    assert simple_fleet.reload([station_config("LYON_01", 200)]) == {"added": [], "removed": ["PARIS_15"], "updated": []}
+    assert simple_fleet.get_station().name == "LYON_01"
+
+
+def test_stations_are_built_on_first_use(simple_fleet):
+    built = []
+    simple_fleet.on_station(built.append)
+    assert simple_fleet.stations == {}
+
+    lyon = simple_fleet.get_station("LYON_01")
+    assert simple_fleet.get_station("LYON_01") is lyon
+    assert list(simple_fleet.stations) == ["LYON_01"]
+    assert built == [lyon]
+    assert simple_fleet.get_station_ids() == ["PARIS_15", "LYON_01"]
+
+    # A station not built yet only gets its new config.
+    summary = simple_fleet.reload([station_config("PARIS_15", 100), station_config("LYON_01", 200)])
+    assert summary == {"added": [], "removed": [], "updated": ["PARIS_15"]}
+    assert simple_fleet.get_station("PARIS_15").grid_capacity == 100
+    assert built[-1].name == "PARIS_15"
+
+
+@pytest.mark.parametrize(
+    "config, error",
+    [
+        ({"stationId": "A", "chargers": []}, "station A needs a positive gridCapacity"),
+        ({**station_config("A"), "chargers": [{"id": "CP001", "maxPower": 300}]}, "needs at least one connector"),
+        ({**station_config("A"), "chargers": [{"id": "CP001", "maxPower": "300", "connectors": 2}]}, "needs a positive maxPower"),
+        ({**station_config("A"), "chargers": station_config("A")["chargers"] * 2}, "charger CP001 is configured twice"),
+        ({**station_config("A"), "battery": {"power": 100}}, "needs a positive initialCapacity"),
+        ({**station_config("A"), "allocationStrategy": "random"}, "unknown allocation strategy random"),
+        ({**station_config("A"), "minSessionPower": -1}, "needs a positive minSessionPower"),
+        ({**station_config("A"), "admissionPolicy": "wait"}, "unknown admission policy wait"),
+    ],
+)
+def test_invalid_configs_are_refused(config, error):
+    with pytest.raises(ValueError, match=error):
+        Fleet([config])
+
+
+def test_duplicate_station_in_configs_is_refused():
+    with pytest.raises(ValueError, match="station A is configured twice"):
+        Fleet([station_config("A"), station_config("A")])
+
+
+def test_configs_are_read_from_the_cache_while_unchanged(tmp_path):
+    configFile = tmp_path / "config.json"
+    cachePath = str(tmp_path / "config.cache")
+    configFile.write_text(json.dumps([station_config("A")]))
+
+    assert load_station_configs(str(configFile), cachePath) == [station_config("A")]
+    with open(cachePath, "rb") as f:
+        assert pickle.load(f)["configs"] == [station_config("A")]
+
+    configFile.write_text(json.dumps([station_config("A"), station_config("B", 200)]))
+    assert [c["stationId"] for c in load_station_configs(str(configFile), cachePath)] == ["A", "B"]
+    # A corrupted cache is ignored and written again.
+    with open(cachePath, "wb") as f:
+        f.write(b"garbage")
+    assert len(load_station_configs(str(configFile), cachePath)) == 2
@@ -0,0 +1,113 @@
+"""Tests of the durable journal of the stations."""
+import time
+
+import pytest
+
+from src.services.journal import EventJournal
+from src.station_components.fleet import Fleet
+
+CONFIGS = [
+    {
+        "stationId": "PARIS_15",
+        "gridCapacity": 300,
+        "chargers": [{"id": "CP001", "maxPower": 300, "connectors": 2}],
+        "battery": {"initialCapacity": 200, "power": 200, "initialStateOfCharge": 40},
+    },
+    {
+        "stationId": "LYON_01",
+        "gridCapacity": 400,
+        "chargers": [{"id": "CP001", "maxPower": 300, "connectors": 2}],
+    },
+]
+
+
+def restart(folder):
+    """Build a new fleet from the configs, and recover it from the journal."""
+    fleet = Fleet(CONFIGS)
+    journal = EventJournal(str(folder))
+    replayed = journal.recover(fleet)
+    journal.attach(fleet)
+    return fleet, journal, replayed
+
+
+def statuses(fleet):
+    return {stationId: fleet.get_station(stationId).get_status() for stationId in fleet.get_station_ids()}
+
+
+@pytest.fixture
+def journaled_fleet(tmp_path):
+    fleet, journal, _ = restart(tmp_path)
+    return fleet, journal
+
+
+def test_recover_from_log_only(tmp_path, journaled_fleet):
+    fleet, journal = journaled_fleet
+    paris = fleet.get_station("PARIS_15")
+    for _ in range(4):
+        paris.start_session_on_charger("CP001", 1, 20)
+        paris.stop_session_on_charger("CP001", 1)
+    paris.start_session_on_charger("CP001", 1, 200)
+    paris.start_session_on_charger("CP001", 2, 150)
+    fleet.get_station("LYON_01").start_session_on_charger("CP001", 2, 100)
+    journal.close()
+
+    recovered, _, replayed = restart(tmp_path)
+    assert replayed == 11
+    assert statuses(recovered) == statuses(fleet)
+    assert recovered.get_station("PARIS_15").get_charger("CP001").get_session(2).is_battery_boosted
+
+
+def test_recover_from_snapshot_and_tail(tmp_path, journaled_fleet):
+    fleet, journal = journaled_fleet
+    lyon = fleet.get_station("LYON_01")
+    lyon.start_session_on_charger("CP001", 1, 200)
+    lyon.start_session_on_charger("CP001", 2, 200)
+    journal.snapshot(fleet)
+    lyon.stop_session_on_charger("CP001", 1)
+    journal.close()
+
+    assert len(journal.list_files("journal-", ".log")) == 1
+    recovered, _, replayed = restart(tmp_path)
+    assert replayed == 1
+    assert statuses(recovered) == statuses(fleet)
+
+    recovered.get_station("LYON_01").start_session_on_charger("CP001", 1, 50)
+    recovered_twice, _, _ = restart(tmp_path)
+    assert recovered_twice.get_station("LYON_01").max_asked_power == 250
+
+
+def test_replay_applies_the_logged_boost_decisions(tmp_path):
+    battery = {"initialCapacity": 200, "power": 200, "initialStateOfCharge": 100}
+    configs = [{**CONFIGS[0], "battery": battery, "boostScheduler": "predictive"}]
+    fleet = Fleet(configs)
+    journal = EventJournal(str(tmp_path))
+    journal.attach(fleet)
+    paris = fleet.get_station("PARIS_15")
+    # A peak is forecast all day long: the battery is kept for it.
+    paris.boost_scheduler.forecaster.forecasts = [500] * paris.boost_scheduler.forecaster.nb_buckets
+    paris.start_session_on_charger("CP001", 1, 200)
+    paris.start_session_on_charger("CP001", 2, 150)
+    assert not paris.get_charger("CP001").get_session(2).is_battery_boosted
+    journal.close()
+
+    recovered = Fleet(configs)
+    EventJournal(str(tmp_path)).recover(recovered)
+    scheduler = recovered.get_station("PARIS_15").boost_scheduler
+    assert statuses(recovered) == statuses(fleet)
+    # The scheduler learnt the sessions at the time they were logged, and got its clock back.
+    firstEvent = next(journal.read_log(journal.list_files("journal-", ".log")[-1][1]))
+    assert scheduler.forecaster.started_at[("CP001", 1)] == firstEvent["time"]
+    assert scheduler.clock is time.time
+
+
+def test_torn_last_line_is_ignored(tmp_path, journaled_fleet):
+    fleet, journal = journaled_fleet
+    fleet.get_station("LYON_01").start_session_on_charger("CP001", 1, 200)
+    journal.close()
+    (_, path) = journal.list_files("journal-", ".log")[-1]
+    with open(path, "ab") as f:
+        f.write(b'{"seq":2,"stationId":"LYON_01","type":"st')
+
+    recovered, _, replayed = restart(tmp_path)
+    assert replayed == 1
+    assert recovered.get_station("LYON_01").max_asked_power == 200
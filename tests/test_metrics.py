@@ -0,0 +1,68 @@
+"""Tests of the metrics and of the instrumentation of the station."""
+import threading
+
+from src.services.metrics import (
+    BOOSTS_DENIED,
+    BOOSTS_GRANTED,
+    OPERATION_DURATION,
+    REBALANCES,
+    SESSIONS_CAPPED,
+    Counter,
+    Histogram,
+    Registry,
+)
+from src.station_components.station import Station
+
+
+def test_counter_sums_the_shards_of_all_threads():
+    counter = Counter("test_total", "Test counter.")
+
+    def increment():
+        for _ in range(1000):
+            counter.inc()
+
+    threads = [threading.Thread(target=increment) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.get() == 8000
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.register(Histogram("test_seconds", "Test histogram.", ("path",), buckets=(0.1, 1.0)))
+    for value in (0.05, 0.5, 0.5, 2.0):
+        histogram.labels("/a").observe(value)
+
+    text = registry.render()
+    assert "# TYPE test_seconds histogram" in text
+    assert 'test_seconds_bucket{path="/a",le="0.1"} 1' in text
+    assert 'test_seconds_bucket{path="/a",le="1"} 3' in text
+    assert 'test_seconds_bucket{path="/a",le="+Inf"} 4' in text
+    assert 'test_seconds_count{path="/a"} 4' in text
+    assert 'test_seconds_sum{path="/a"} 3.05' in text
+
+
+def test_station_counts_boosts_capped_sessions_and_rebalances():
+    station = Station(
+        {
+            "stationId": "Test Electra Station",
+            "gridCapacity": 100,
+            "battery": {"initialCapacity": 100, "power": 50},
+            "chargers": [{"id": "CP001", "maxPower": 200, "connectors": 3}],
+        }
+    )
+    station.battery.state_of_charge = 100
+    granted, denied, capped, rebalances = BOOSTS_GRANTED.get(), BOOSTS_DENIED.get(), SESSIONS_CAPPED.get(), REBALANCES.get()
+    starts = OPERATION_DURATION.labels("start_session").get()[1]
+
+    station.start_session_on_charger("CP001", 1, 80)
+    station.start_session_on_charger("CP001", 2, 50)   # deficit of 30, boosted by the battery
+    station.start_session_on_charger("CP001", 3, 60)   # the power of the battery is used, capped to the grid
+
+    assert BOOSTS_GRANTED.get() - granted == 1
+    assert BOOSTS_DENIED.get() - denied == 1
+    assert SESSIONS_CAPPED.get() - capped == 1
+    assert REBALANCES.get() - rebalances == 3
+    assert OPERATION_DURATION.labels("start_session").get()[1] - starts == 3
@@ -0,0 +1,42 @@
+"""Tests of the token-bucket rate limits."""
+import pytest
+
+from src.services.rate_limit import RateLimiter, create_rate_limiter
+
+
+def test_bucket_allows_a_burst_then_the_rate(clock):
+    limiter = RateLimiter(2, burst=3, clock=clock)
+    assert [limiter.acquire({"client": 1}) for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire({"client": 1}) == pytest.approx(0.5)
+    # Another key has its own bucket.
+    assert limiter.acquire({"other": 1}) == 0
+
+    clock.now = 0.5
+    assert limiter.acquire({"client": 1}) == 0
+    assert limiter.acquire({"client": 1}) > 0
+
+
+def test_tokens_are_taken_from_all_the_buckets_or_none(clock):
+    limiter = RateLimiter(1, burst=2, clock=clock)
+    assert limiter.acquire({"CP001": 2}) == 0
+    assert limiter.acquire({"CP001": 1, "CP002": 1}) > 0
+    assert limiter.acquire({"CP002": 2}) == 0
+    # A cost over the size of the buckets takes a full bucket.
+    assert limiter.acquire({"CP003": 10}) == 0
+
+
+def test_full_buckets_are_pruned(clock):
+    limiter = RateLimiter(1, burst=1, max_keys=2, clock=clock)
+    limiter.acquire({"a": 1})
+    limiter.acquire({"b": 1})
+    clock.now = 10
+    limiter.acquire({"c": 1})
+    assert list(limiter.buckets) == ["c"]
+
+
+def test_rate_limiter_from_setting():
+    assert create_rate_limiter(None) is None
+    assert create_rate_limiter("0") is None
+    limiter = create_rate_limiter("50/100")
+    assert (limiter.rate, limiter.burst) == (50, 100)
+    assert create_rate_limiter("5").burst == 5
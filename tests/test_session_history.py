@@ -0,0 +1,123 @@
+"""Tests of the history of the sessions and of the energy queries."""
+import pytest
+
+from src.services.session_history import SessionHistory
+from src.station_components.fleet import Fleet
+
+CONFIG = {
+    "stationId": "PARIS_15",
+    "gridCapacity": 300,
+    "chargers": [
+        {"id": "CP001", "maxPower": 200, "connectors": 2},
+        {"id": "CP002", "maxPower": 200, "connectors": 2},
+    ],
+}
+# 2026-01-01T22:00:00Z
+START = 1767304800.0
+
+
+@pytest.fixture
+def clock(clock):
+    clock.now = START
+    return clock
+
+
+@pytest.fixture
+def recorded(tmp_path, clock):
+    fleet = Fleet([CONFIG])
+    history = SessionHistory(str(tmp_path / "history.db"), clock=clock)
+    history.attach(fleet)
+    return fleet.get_station(), history
+
+
+def test_energy_of_a_session(recorded, clock):
+    station, history = recorded
+    station.start_session_on_charger("CP001", 1, 100)
+    clock.advance(2)
+    station.stop_session_on_charger("CP001", 1)
+    clock.advance(1)
+
+    (session,) = history.get_session_energy()
+    assert session["charger_id"] == "CP001"
+    assert session["stopped_at"] - session["started_at"] == 2 * 3600
+    assert session["energy"] == pytest.approx(200)
+
+
+def test_sharing_of_the_grid_is_recorded_for_every_session(recorded, clock):
+    station, history = recorded
+    station.start_session_on_charger("CP001", 1, 200)
+    clock.advance(1)
+    # The grid is exceeded: the session of CP001 goes down to 150 kW.
+    station.start_session_on_charger("CP002", 1, 200)
+    clock.advance(1)
+
+    energies = [session["energy"] for session in history.get_session_energy()]
+    assert energies == pytest.approx([200 + 150, 150])
+    assert history.get_charger_energy() == [
+        {"station_id": "PARIS_15", "charger_id": "CP001", "energy": pytest.approx(350), "sessions": 1},
+        {"station_id": "PARIS_15", "charger_id": "CP002", "energy": pytest.approx(150), "sessions": 1},
+    ]
+    assert len(history.get_session_energy(chargerId="CP002")) == 1
+
+
+def test_boosted_session_is_billed_the_power_of_its_vehicle(tmp_path, clock):
+    fleet = Fleet([{**CONFIG, "battery": {"initialCapacity": 1000, "power": 200, "initialStateOfCharge": 100}}])
+    history = SessionHistory(str(tmp_path / "history.db"), clock=clock)
+    history.attach(fleet)
+    station = fleet.get_station()
+    station.start_session_on_charger("CP001", 1, 200)
+    # 50 kW beyond the grid: the session is boosted, and the battery gives it its 150 kW.
+    station.start_session_on_charger("CP002", 1, 150)
+    assert station.get_charger("CP002").get_session(1).is_battery_boosted
+    clock.advance(1)
+
+    assert history.get_session_energy(chargerId="CP002")[0]["energy"] == pytest.approx(150)
+
+
+def test_energy_is_split_between_days(recorded, clock):
+    station, history = recorded
+    station.start_session_on_charger("CP001", 1, 100)
+    clock.advance(5)
+    station.stop_session_on_charger("CP001", 1)
+
+    assert history.get_daily_energy() == [
+        {"day": "2026-01-01", "energy": pytest.approx(200)},
+        {"day": "2026-01-02", "energy": pytest.approx(300)},
+    ]
+    (session,) = history.get_session_energy(since=START + 3600, until=START + 3 * 3600)
+    assert session["energy"] == pytest.approx(200)
+
+
+def test_records_are_written_by_batches_in_the_background(recorded, clock):
+    station, history = recorded
+    history.flush_interval = 0.01
+    history.start()
+    station.start_session_on_charger("CP001", 1, 100)
+    station.stop_session_on_charger("CP001", 1)
+    history.close()
+    assert not history.pending
+    assert history.get_connection().execute("SELECT COUNT(*) FROM sessions").fetchone() == (1,)
+
+
+def test_open_sessions_go_on_after_a_restart(tmp_path, clock):
+    path = str(tmp_path / "history.db")
+    fleet = Fleet([CONFIG])
+    history = SessionHistory(path, clock=clock)
+    history.attach(fleet)
+    station = fleet.get_station()
+    station.start_session_on_charger("CP001", 1, 100)
+    station.start_session_on_charger("CP002", 1, 100)
+    clock.advance(1)
+    history.close()
+
+    # Only the session of CP001 is recovered by the restarted station.
+    restarted = Fleet([CONFIG])
+    restarted.get_station().start_session_on_charger("CP001", 1, 100)
+    history = SessionHistory(path, clock=clock)
+    history.attach(restarted)
+    clock.advance(1)
+
+    sessions = history.get_session_energy()
+    assert [session["energy"] for session in sessions] == pytest.approx([200, 100])
+    assert sessions[0]["stopped_at"] is None
+    assert sessions[1]["stopped_at"] == START + 3600
@@ -0,0 +1,109 @@
+"""Tests of the discrete-event simulator."""
+import pytest
+
+from src.simulation.simulator import Simulator, generate_arrivals
+
+CONFIG = {
+    "stationId": "Test Electra Station",
+    "gridCapacity": 300,
+    "chargers": [{"id": "CP001", "maxPower": 300, "connectors": 2}],
+}
+
+
+def test_energy_and_capped_time():
+    simulator = Simulator(CONFIG)
+    simulator.load_trace(
+        [
+            {"time": 0, "duration": 2, "power": 200},
+            {"time": 1, "duration": 2, "power": 200},
+            {"time": 1.5, "duration": 1, "power": 100},
+        ]
+    )
+    kpis = simulator.run()
+
+    assert kpis["sessions"] == 2
+    assert kpis["rejected_arrivals"] == 1
+    # 200 kW alone during 1 h, 150 + 150 kW during 1 h, then 200 kW alone during 1 h.
+    assert kpis["energy_delivered_kwh"] == pytest.approx(200 + 300 + 200)
+    assert kpis["capped_hours"] == pytest.approx(1)
+    assert kpis["peak_grid_power"] == 300
+    assert kpis["hours"] == 3
+
+
+def test_power_curve_and_until():
+    simulator = Simulator(CONFIG)
+    simulator.load_trace([{"time": 0, "duration": 4, "powerCurve": [[0, 100], [1, 50]]}])
+    kpis = simulator.run(until=2)
+
+    assert kpis["energy_delivered_kwh"] == pytest.approx(100 + 50)
+    assert simulator.station.max_asked_power == 50
+
+
+def test_battery_is_charged_over_time():
+    simulator = Simulator({**CONFIG, "battery": {"initialCapacity": 200, "power": 100}})
+    simulator.load_trace([{"time": 0, "duration": 1, "power": 250}])
+    kpis = simulator.run(until=2)
+
+    # 50 kW of headroom during 1 h, then 100 kW (the battery power) during 1 h.
+    assert kpis["state_of_charge"] == pytest.approx(75)
+
+
+def test_boosts_drain_the_battery_while_it_charges():
+    config = {**CONFIG, "battery": {"initialCapacity": 100, "power": 200, "initialStateOfCharge": 100}}
+    simulator = Simulator(config)
+    simulator.load_trace(
+        [
+            {"time": 0, "duration": 10, "power": 200, "chargerId": "CP001", "connectorId": 1},
+            {"time": 0.01, "duration": 10, "power": 150, "chargerId": "CP001", "connectorId": 2},
+        ]
+    )
+    kpis = simulator.run(until=5)
+
+    # Charged at 100 kW and discharged at 150 kW, the battery runs empty after 2 h: the boost is moved
+    # back to the grid, and both sessions are capped to 150 kW.
+    assert not simulator.station.get_charger("CP001").get_session(2).is_battery_boosted
+    assert kpis["battery_energy_kwh"] == pytest.approx(150 * 2)
+    assert kpis["energy_delivered_kwh"] == pytest.approx(200 * 0.01 + 350 * 2 + 300 * (5 - 2.01))
+    assert kpis["state_of_charge"] == 0
+    assert kpis["capped_hours"] == pytest.approx(5 - 0.01 - 2)
+
+
+def test_boosts_of_an_empty_battery_are_moved_back_to_the_grid():
+    config = {
+        **CONFIG,
+        "chargers": [{"id": "CP001", "maxPower": 300, "connectors": 1}, {"id": "CP002", "maxPower": 300, "connectors": 1}],
+        "battery": {"initialCapacity": 100, "power": 200, "initialStateOfCharge": 100},
+    }
+    simulator = Simulator(config)
+    simulator.load_trace(
+        [
+            {"time": 0, "duration": 10, "power": 300, "chargerId": "CP001", "connectorId": 1},
+            {"time": 0, "duration": 10, "power": 150, "chargerId": "CP002", "connectorId": 1},
+        ]
+    )
+    kpis = simulator.run(until=9)
+
+    # The grid is saturated: the battery is not charged, and runs empty after 100 / 150 h.
+    assert not simulator.station.get_charger("CP002").get_session(1).is_battery_boosted
+    assert simulator.station.get_charger("CP002").get_session(1).get_power() == 150
+    assert kpis["capped_hours"] == pytest.approx(9 - 100 / 150)
+    assert kpis["events"] == 2
+
+
+def test_generated_trace_runs():
+    simulator = Simulator(CONFIG)
+    simulator.load_trace(generate_arrivals(hours=24, arrivals_per_hour=10, seed=1))
+    kpis = simulator.run(until=24)
+    assert kpis["events"] > 0
+    assert kpis["energy_delivered_kwh"] <= 300 * 24
+
+
+def test_predictive_boost_scheduler_learns_on_the_simulated_time():
+    config = {**CONFIG, "battery": {"initialCapacity": 1000, "power": 300}, "boostScheduler": "predictive"}
+    simulator = Simulator(config)
+    simulator.load_trace(generate_arrivals(hours=72, arrivals_per_hour=4, seed=1))
+    simulator.run(until=72)
+
+    forecaster = simulator.station.boost_scheduler.forecaster
+    assert sum(forecast is not None for forecast in forecaster.forecasts) == forecaster.nb_buckets
+    assert 0.1 < forecaster.get_session_hours() < 10
@@ -0,0 +1,115 @@
+"""Tests of the state backends sharing the state of a station between workers."""
+import sqlite3
+
+import pytest
+
+from src.services.state_backends import InProcessStateBackend, SqliteStateBackend, create_state_backend
+from src.station_components.station import Station
+
+CONFIG = {
+    "stationId": "Test Electra Station",
+    "gridCapacity": 300,
+    "chargers": [{"id": "CP001", "maxPower": 300, "connectors": 2}],
+    "battery": {"initialCapacity": 200, "power": 200},
+}
+
+
+def test_export_and_restore_state():
+    station = Station(CONFIG)
+    station.battery.state_of_charge = 40
+    station.start_session_on_charger("CP001", 1, 200)
+    station.start_session_on_charger("CP001", 2, 150)
+
+    copy = Station(CONFIG)
+    copy.restore_state(station.export_state())
+
+    assert copy.get_status() == station.get_status()
+    assert copy.get_number_non_boosted_sessions() == 1
+    copy.stop_session_on_charger("CP001", 2)
+    assert copy.max_asked_power == 200
+    assert copy.battery.session_boosts == {}
+
+
+def test_workers_share_station_state(tmp_path):
+    path = str(tmp_path / "state.db")
+    worker1, worker2 = Station(CONFIG), Station(CONFIG)
+    backend1, backend2 = SqliteStateBackend(path), SqliteStateBackend(path)
+
+    with backend1.write(worker1):
+        worker1.start_session_on_charger("CP001", 1, 200)
+
+    backend2.read(worker2)
+    assert worker2.max_asked_power == 200
+    assert worker2.get_charger("CP001").get_session(1).get_power() == 200
+
+    with backend2.write(worker2):
+        worker2.start_session_on_charger("CP001", 2, 200)
+
+    backend1.read(worker1)
+    assert worker1.max_asked_power == 400
+    assert worker1.get_charger("CP001").get_session(1).get_power() == 150
+
+    with backend1.write(worker1):
+        worker1.stop_session_on_charger("CP001", 1)
+    with backend2.write(worker2):
+        assert worker2.get_charger("CP001").is_session_free(1)
+
+
+def test_write_times_out_while_another_worker_holds_the_database(tmp_path):
+    path = str(tmp_path / "state.db")
+    backend = SqliteStateBackend(path, timeout=0.05)
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    station = Station(CONFIG)
+
+    with pytest.raises(TimeoutError):
+        with backend.write(station):
+            station.start_session_on_charger("CP001", 1, 100)
+    assert station.get_charger("CP001").is_session_free(1)
+    other.execute("ROLLBACK")
+    with backend.write(station):
+        station.start_session_on_charger("CP001", 1, 100)
+
+
+def test_create_state_backend(tmp_path):
+    assert isinstance(create_state_backend("memory"), InProcessStateBackend)
+    assert isinstance(create_state_backend(f"sqlite:///{tmp_path}/state.db"), SqliteStateBackend)
+    with pytest.raises(ValueError):
+        create_state_backend("redis://localhost")
+
+
+def test_queued_starts_survive_the_writes_of_another_worker(tmp_path):
+    config = {
+        "stationId": "Test Electra Station",
+        "gridCapacity": 300,
+        "chargers": [{"id": "CP001", "maxPower": 300, "connectors": 4}],
+        "minSessionPower": 100,
+        "admissionPolicy": "queue",
+    }
+    path = str(tmp_path / "state.db")
+    worker1, worker2 = Station(config), Station(config)
+    backend1, backend2 = SqliteStateBackend(path), SqliteStateBackend(path)
+    cancelled = []
+    worker1.add_listener(lambda station, event: event["type"] == "cancelled" and cancelled.append(event))
+
+    with backend1.write(worker1):
+        worker1.apply_operations(
+            [
+                {"action": "start", "chargerId": "CP001", "connectorId": connectorId, "powerCapacity": 200}
+                for connectorId in (1, 2, 3, 4)
+            ]
+        )
+    assert worker1.waiting_sessions == {("CP001", 4): 200}
+
+    with backend2.write(worker2):
+        worker2.stop_session_on_charger("CP001", 2)
+    backend1.read(worker1)
+    assert worker1.waiting_sessions == {("CP001", 4): 200}
+    assert worker1.find_available_connector() == ("CP001", 2)
+
+    # The connector of the waiting start is taken by the other worker: the start is cancelled.
+    with backend2.write(worker2):
+        worker2.start_session_on_charger("CP001", 4, 50)
+    backend1.read(worker1)
+    assert worker1.waiting_sessions == {}
+    assert [(event["chargerId"], event["connectorId"]) for event in cancelled] == [("CP001", 4)]
@@ -71,6 +71,8 @@ def test_simple_cannot_use_battery(simple_station_with_battery):
 
 
 def test_simple_can_use_battery(simple_station_with_battery):
+    now = [0.0]
+    simple_station_with_battery.battery.clock = lambda: now[0]
     simple_station_with_battery.start_session_on_charger("CP001", 1, 20)
     assert simple_station_with_battery.max_asked_power == 20
 
@@ -83,7 +85,9 @@ def test_simple_can_use_battery(simple_station_with_battery):
     simple_station_with_battery.stop_session_on_charger("CP001", 2)
     assert simple_station_with_battery.max_asked_power == 0
 
-    assert simple_station_with_battery.battery.state_of_charge == 40
+    # The station is idle : the battery is charged at its max power, 200 kW, during 24 minutes.
+    now[0] += 0.4 * 3600
+    assert simple_station_with_battery.battery.state_of_charge == pytest.approx(40)
 
     simple_station_with_battery.start_session_on_charger("CP001", 1, 200)
     assert simple_station_with_battery.max_asked_power == 200
@@ -108,3 +112,191 @@ def test_simple_can_use_battery(simple_station_with_battery):
     assert session2.allocated_power == 0
     assert session2.is_battery_boosted == True
     assert session2.max_vehicle_power == 150
+
+
+def test_stop_session_gives_power_back(simple_station_no_battery):
+    simple_station_no_battery.start_session_on_charger("CP001", 1, 200)
+    simple_station_no_battery.start_session_on_charger("CP001", 2, 200)
+    simple_station_no_battery.stop_session_on_charger("CP001", 2)
+
+    charger = simple_station_no_battery.get_charger("CP001")
+    assert simple_station_no_battery.get_number_non_boosted_sessions() == 1
+    assert charger.get_session(1).get_power() == 200
+
+
+def test_uniform_power_shared_across_chargers():
+    station = Station(
+        {
+            "stationId": "Test Electra Station",
+            "gridCapacity": 300,
+            "chargers": [
+                {"id": "CP001", "maxPower": 300, "connectors": 2},
+                {"id": "CP002", "maxPower": 300, "connectors": 2},
+            ],
+        }
+    )
+    station.start_session_on_charger("CP001", 1, 200)
+    station.start_session_on_charger("CP002", 1, 200)
+    station.start_session_on_charger("CP002", 2, 50)
+
+    assert station.uniform_power == 100
+    assert station.get_charger("CP001").get_session(1).get_power() == 100
+    assert station.get_charger("CP002").get_session(1).get_power() == 100
+    assert station.get_charger("CP002").get_session(2).get_power() == 50
+
+    station.stop_session_on_charger("CP002", 1)
+    assert station.uniform_power is None
+    assert station.get_charger("CP001").get_session(1).get_power() == 200
+
+
+def test_apply_operations_in_batch(simple_station_no_battery):
+    results = simple_station_no_battery.apply_operations(
+        [
+            {"action": "start", "chargerId": "CP001", "connectorId": 1, "powerCapacity": 200},
+            {"action": "start", "chargerId": "CP001", "connectorId": 2, "powerCapacity": 200},
+            {"action": "start", "chargerId": "CP001", "connectorId": 2, "powerCapacity": 100},
+            {"action": "stop", "chargerId": "CP002", "connectorId": 1},
+        ]
+    )
+
+    assert [result["success"] for result in results] == [True, True, False, False]
+    assert results[0]["allocated_power"] == 150
+    assert results[1]["allocated_power"] == 150
+    assert simple_station_no_battery.max_asked_power == 400
+
+
+def test_connector_out_of_range_is_refused(simple_station_no_battery):
+    results = simple_station_no_battery.apply_operations(
+        [
+            {"action": "start", "chargerId": "CP001", "connectorId": 3, "powerCapacity": 100},
+            {"action": "start", "chargerId": "CP001", "connectorId": 0, "powerCapacity": 100},
+        ]
+    )
+    assert [result["success"] for result in results] == [False, False]
+    assert results[0]["message"] == "there is no connector 3 on charger CP001"
+
+
+def test_start_without_connector_is_auto_assigned(simple_station_no_battery):
+    results = simple_station_no_battery.apply_operations(
+        [
+            {"action": "start", "chargerId": "CP001", "connectorId": None, "powerCapacity": 100},
+            {"action": "start", "connectorId": None, "powerCapacity": 100},
+            {"action": "start", "connectorId": None, "powerCapacity": 100},
+        ]
+    )
+    assert [(result["chargerId"], result["connectorId"]) for result in results[:2]] == [("CP001", 1), ("CP001", 2)]
+    assert results[2]["success"] is False
+    assert results[2]["message"] == "there is no free connector in the station"
+
+
+def test_apply_config_keeps_sessions_and_rebalances():
+    config = {
+        "stationId": "Test Electra Station",
+        "gridCapacity": 400,
+        "chargers": [{"id": "CP001", "maxPower": 300, "connectors": 2}, {"id": "CP002", "maxPower": 300, "connectors": 2}],
+    }
+    newConfig = {
+        **config,
+        "gridCapacity": 300,
+        "chargers": [{"id": "CP001", "maxPower": 400, "connectors": 2}, {"id": "CP003", "maxPower": 100, "connectors": 1}],
+    }
+    station = Station(config)
+    station.start_session_on_charger("CP001", 1, 200)
+    station.start_session_on_charger("CP001", 2, 200)
+    version = station.version
+
+    changes = station.apply_config(newConfig)
+
+    assert changes == ["updated charger CP001", "added charger CP003", "removed charger CP002", "updated grid capacity"]
+    assert list(station.chargers) == ["CP001", "CP003"]
+    assert station.version == version + 1
+    assert [station.get_charger("CP001").get_session(i).get_power() for i in (1, 2)] == [150, 150]
+    assert station.apply_config(newConfig) == []
+
+    with pytest.raises(ValueError):
+        station.apply_config({**newConfig, "chargers": [{"id": "CP001", "maxPower": 400, "connectors": 1}]})
+    assert station.get_charger("CP001").nb_connectors == 2
+
+
+ADMISSION_CONFIG = {
+    "stationId": "Test Electra Station",
+    "gridCapacity": 300,
+    "chargers": [{"id": "CP001", "maxPower": 200, "connectors": 2}, {"id": "CP002", "maxPower": 200, "connectors": 2}],
+    "minSessionPower": 100,
+}
+
+
+def start_operations(*connectors):
+    return [
+        {"action": "start", "chargerId": chargerId, "connectorId": connectorId, "powerCapacity": 200}
+        for chargerId, connectorId in connectors
+    ]
+
+
+def test_start_breaking_the_min_session_power_is_rejected():
+    station = Station(ADMISSION_CONFIG)
+    results = station.apply_operations(start_operations(("CP001", 1), ("CP002", 1), ("CP002", 2), ("CP001", 2)))
+
+    assert [result["admission"] for result in results] == [None, None, None, "rejected"]
+    assert results[3]["success"] is False
+    assert "cannot guarantee 100 kW to 4 sessions" in results[3]["message"]
+    assert station.get_charger("CP001").is_session_free(2)
+    assert all(result["allocated_power"] == 100 for result in results[:3])
+
+
+def test_queued_start_is_admitted_when_power_is_freed():
+    station = Station({**ADMISSION_CONFIG, "admissionPolicy": "queue"})
+    station.apply_operations(start_operations(("CP001", 1), ("CP002", 1), ("CP002", 2)))
+    (result,) = station.apply_operations(start_operations(("CP001", 2)))
+
+    assert (result["success"], result["admission"], result["allocated_power"]) == (True, "queued", None)
+    # The connector of the waiting vehicle is not offered to another one.
+    assert station.find_available_connector() is None
+    assert station.check_operation("start", "CP001", 2) is not None
+
+    station.stop_session_on_charger("CP002", 1)
+    assert station.waiting_sessions == {}
+    assert station.get_charger("CP001").get_session(2).get_power() == 100
+
+
+def test_stop_cancels_a_queued_start():
+    station = Station({**ADMISSION_CONFIG, "admissionPolicy": "queue"})
+    station.apply_operations(start_operations(("CP001", 1), ("CP002", 1), ("CP002", 2)))
+    version = station.version
+    station.apply_operations(start_operations(("CP001", 2)))
+    # The snapshots keyed on the version see the connector taken by the queued start.
+    assert station.version > version
+
+    version = station.version
+    (result,) = station.apply_operations([{"action": "stop", "chargerId": "CP001", "connectorId": 2}])
+    assert result["success"] is True
+    assert station.waiting_sessions == {}
+    assert station.find_available_connector() == ("CP001", 2)
+    assert station.version > version
+
+
+def test_boosts_of_an_empty_battery_go_back_to_the_grid():
+    now = {"time": 0.0}
+    config = {
+        "stationId": "Test Electra Station",
+        "gridCapacity": 300,
+        "chargers": [{"id": "CP001", "maxPower": 300, "connectors": 2}, {"id": "CP002", "maxPower": 300, "connectors": 2}],
+        "battery": {"initialCapacity": 100, "power": 200, "initialStateOfCharge": 100},
+    }
+    station = Station(config, clock=lambda: now["time"])
+    events = []
+    station.add_listener(lambda station, event: events.append(event))
+    station.start_session_on_charger("CP001", 1, 200)
+    station.start_session_on_charger("CP002", 1, 150)
+    session = station.get_charger("CP002").get_session(1)
+    assert session.is_battery_boosted
+
+    # The battery gives 150 kW and gets the 100 kW left on the grid: its 100 kWh are gone in 2 hours.
+    now["time"] = 3 * 3600
+    station.start_session_on_charger("CP001", 2, 50)
+
+    assert not session.is_battery_boosted
+    assert station.battery.session_boosts == {}
+    assert station.non_boosted_sessions_count == 3
+    assert [session.get_power() for session in (station.get_charger("CP001").get_session(1), session)] == [100, 100]
+    assert events[-1]["released_boosts"] == [("CP002", 1)]
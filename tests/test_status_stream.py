@@ -0,0 +1,86 @@
+"""Tests of the push of the changes of the stations to subscribers."""
+import asyncio
+
+import pytest
+
+from src.services.status_stream import StatusStream
+from src.station_components.station import Station
+
+
+@pytest.fixture
+def station():
+    return Station(
+        {
+            "stationId": "Test Electra Station",
+            "gridCapacity": 200,
+            "battery": {"initialCapacity": 100, "power": 100},
+            "chargers": [{"id": "CP001", "maxPower": 200, "connectors": 3}],
+        }
+    )
+
+
+def run_with_stream(scenario):
+    """Run a scenario with a StatusStream published by its background task."""
+
+    async def main():
+        stream = StatusStream(min_interval=0.01)
+        task = asyncio.create_task(stream.run())
+        await asyncio.sleep(0)
+        try:
+            return await scenario(stream)
+        finally:
+            task.cancel()
+
+    return asyncio.run(main())
+
+
+def test_first_message_is_the_whole_state_then_only_changes(station):
+    station.start_session_on_charger("CP001", 1, 100)
+
+    async def scenario(stream):
+        messages = stream.messages(station)
+        first = await messages.__anext__()
+        station.start_session_on_charger("CP001", 2, 150)
+        second = await asyncio.wait_for(messages.__anext__(), 1)
+        await messages.aclose()
+        return first, second
+
+    first, second = run_with_stream(scenario)
+    assert first["sessions"] == {"CP001": {"1": 100}}
+    assert first["battery"] == {"state_of_charge": 0}
+    # The new session is capped to the uniform power, the power of the first one did not change.
+    assert second["sessions"] == {"CP001": {"2": 100.0}}
+    assert "battery" not in second
+    assert second["version"] == station.version
+
+
+def test_slow_subscriber_gets_coalesced_changes(station):
+    async def scenario(stream):
+        messages = stream.messages(station)
+        await messages.__anext__()
+        for _ in range(10):
+            station.start_session_on_charger("CP001", 1, 50)
+            station.stop_session_on_charger("CP001", 1)
+        station.start_session_on_charger("CP001", 3, 80)
+        await asyncio.sleep(0.05)
+        message = await asyncio.wait_for(messages.__anext__(), 1)
+        await messages.aclose()
+        return stream, message
+
+    stream, message = run_with_stream(scenario)
+    assert message["sessions"] == {"CP001": {"3": 80}}
+    assert stream.subscribers == {}
+
+
+def test_stopped_session_is_sent_as_null(station):
+    station.start_session_on_charger("CP001", 1, 100)
+
+    async def scenario(stream):
+        messages = stream.messages(station)
+        await messages.__anext__()
+        station.stop_session_on_charger("CP001", 1)
+        message = await asyncio.wait_for(messages.__anext__(), 1)
+        await messages.aclose()
+        return message
+
+    assert run_with_stream(scenario)["sessions"] == {"CP001": {"1": None}}
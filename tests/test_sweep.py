@@ -0,0 +1,69 @@
+"""Tests of the parallel scenario sweep."""
+import pytest
+
+from src.simulation.simulator import Simulator, generate_arrivals
+from src.simulation.sweep import build_config, decode_trace, encode_trace, expand_grid, sweep
+
+BASE_CONFIG = {
+    "stationId": "Test Electra Station",
+    "gridCapacity": 300,
+    "chargers": [{"id": "CP001", "maxPower": 300, "connectors": 2}],
+    "battery": {"initialCapacity": 200, "power": 200},
+}
+
+
+def test_expand_grid_and_build_config():
+    scenarios = expand_grid({"gridCapacity": [300, 400], "batteryPower": [0, 100]})
+    assert len(scenarios) == 4
+
+    config = build_config(BASE_CONFIG, {"gridCapacity": 400, "batteryPower": 0, "connectors": 3})
+    assert config["gridCapacity"] == 400
+    assert "battery" not in config
+    assert config["chargers"][0]["connectors"] == 3
+    assert BASE_CONFIG["chargers"][0]["connectors"] == 2
+
+    with pytest.raises(ValueError):
+        build_config(BASE_CONFIG, {"unknown": 1})
+
+
+def test_trace_round_trip():
+    arrivals = [
+        {"time": 0.5, "duration": 1.0, "power": 100},
+        {"time": 1.0, "duration": 2.0, "powerCurve": [[0, 150], [1.5, 75]]},
+    ]
+    assert decode_trace(encode_trace(arrivals).tobytes()) == [
+        {"time": 0.5, "duration": 1.0, "powerCurve": [[0, 100]]},
+        {"time": 1.0, "duration": 2.0, "powerCurve": [[0, 150], [1.5, 75]]},
+    ]
+
+
+def test_pinned_arrivals_keep_their_connector():
+    chargers = [{"id": "A", "maxPower": 300, "connectors": 1}, {"id": "B", "maxPower": 100, "connectors": 1}]
+    config = {**BASE_CONFIG, "chargers": chargers}
+    arrivals = [
+        {"time": 0.0, "duration": 1.0, "power": 100, "chargerId": "B", "connectorId": 1},
+        {"time": 0.1, "duration": 1.0, "power": 200},
+    ]
+    decoded = decode_trace(encode_trace(arrivals, ["A", "B"]).tobytes(), ["A", "B"])
+    assert [(arrival.get("chargerId"), arrival.get("connectorId")) for arrival in decoded] == [("B", 1), (None, None)]
+    with pytest.raises(ValueError):
+        encode_trace(arrivals, ["A"])
+
+    ((_, kpis),) = sweep(config, {"gridCapacity": [300]}, arrivals, until=2, processes=1)
+    simulator = Simulator(config)
+    simulator.load_trace(arrivals)
+    assert kpis == pytest.approx(simulator.run(until=2))
+    assert kpis["capped_hours"] == 0
+
+
+def test_sweep_matches_serial_simulations():
+    arrivals = generate_arrivals(hours=48, arrivals_per_hour=8, seed=3)
+    grid = {"gridCapacity": [200, 400], "batteryPower": [0, 200]}
+
+    results = list(sweep(BASE_CONFIG, grid, arrivals, until=48, processes=2))
+
+    assert len(results) == 4
+    for params, kpis in results:
+        simulator = Simulator(build_config(BASE_CONFIG, params))
+        simulator.load_trace(decode_trace(encode_trace(arrivals).tobytes()))
+        assert kpis == pytest.approx(simulator.run(until=48))